@@ -45,7 +45,7 @@ def my_bookings(request):
     bookings = (
         Booking.objects.select_related("chef")
         .filter(customer=request.user)
-        .order_by("-date", "-time")
+        .order_by("-scheduled_at")
     )
     return render(request, "booking/my_bookings.html", {"bookings": bookings})
 
@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.db.models import Q, Value
+
+from .models import Booking, BookingArchive
+
+ARCHIVE_LIST_FIELDS = ("pk", "scheduled_at", "status", "source")
+
+
+def archive_bookings(deleted_before, batch_size=1000):
+    """
+    Move soft-deleted bookings deleted before ``deleted_before`` into
+    BookingArchive, one batch per transaction. Yields the size of each batch.
+    """
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Booking.all_objects.filter(is_deleted=True, deleted_at__lt=deleted_before).order_by("pk")[:batch_size]
+            )
+            if not rows:
+                return
+            BookingArchive.objects.bulk_create(
+                [BookingArchive.from_booking(booking) for booking in rows],
+                ignore_conflicts=True,
+            )
+            Booking.all_objects.filter(pk__in=[booking.pk for booking in rows]).delete()
+        yield len(rows)
+
+
+def _search_q(q):
+    return Q(customer__username__icontains=q) | Q(chef__name__icontains=q) | Q(status__icontains=q)
+
+
+def archived_bookings(q="", fields=ARCHIVE_LIST_FIELDS, condition=None):
+    """
+    Rows for the admin "archived" scope: soft-deleted bookings still in the
+    hot table plus everything already moved to the archive, as one UNION of
+    ``fields`` tuples (by default (pk, scheduled_at, status, source)) that can
+    be ordered and sliced. ``condition`` is applied to both sides, since the
+    union itself cannot be filtered.
+    """
+    hot = Booking.all_objects.filter(is_deleted=True)
+    archived = BookingArchive.objects.all()
+    if q:
+        hot = hot.filter(_search_q(q))
+        archived = archived.filter(_search_q(q))
+    if condition is not None:
+        hot = hot.filter(condition)
+        archived = archived.filter(condition)
+    hot = hot.annotate(source=Value("hot")).values_list(*fields)
+    archived = archived.annotate(source=Value("archive")).values_list(*fields)
+    return hot.union(archived, all=True)
+
+
+def hydrate(rows):
+    """Turn UNION tuples from archived_bookings() back into model instances, in order."""
+    rows = list(rows)
+    hot_ids = [row[0] for row in rows if row[3] == "hot"]
+    archive_ids = [row[0] for row in rows if row[3] == "archive"]
+    objects = {}
+    if hot_ids:
+        for booking in Booking.all_objects.select_related("customer", "chef").filter(pk__in=hot_ids):
+            objects[("hot", booking.pk)] = booking
+    if archive_ids:
+        for booking in BookingArchive.objects.select_related("customer", "chef").filter(pk__in=archive_ids):
+            objects[("archive", booking.pk)] = booking
+    return [objects[(row[3], row[0])] for row in rows if (row[3], row[0]) in objects]
+
+
+def get_any_booking(pk):
+    """Look a booking up in the hot table first, then in the archive."""
+    booking = Booking.all_objects.select_related("customer", "chef").filter(pk=pk).first()
+    if booking is None:
+        booking = BookingArchive.objects.select_related("customer", "chef").filter(pk=pk).first()
+    return booking
@@ -0,0 +1,68 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from .models import BookingEvent
+
+SOURCE_CUSTOMER = "customer"
+SOURCE_CHEF = "chef"
+SOURCE_ADMIN = "admin"
+SOURCE_CLEANUP = "cleanup"
+
+_state = threading.local()
+
+
+@contextmanager
+def batch():
+    """
+    Run the block in a transaction and insert every event recorded inside it
+    with one bulk_create just before that transaction commits, so the audit
+    log adds no commits of its own. Nested blocks join the outer batch.
+    """
+    events = getattr(_state, "events", None)
+    if events is not None:
+        mark = len(events)
+        try:
+            with transaction.atomic():
+                yield
+        except Exception:
+            # The savepoint was rolled back, so were its events.
+            del events[mark:]
+            raise
+        return
+
+    _state.events = events = []
+    try:
+        with transaction.atomic():
+            yield
+            if events:
+                BookingEvent.objects.bulk_create(events)
+    finally:
+        _state.events = None
+
+
+def record(booking_id, kind, source, actor=None, from_status="", to_status=""):
+    event = BookingEvent(
+        booking_id=booking_id,
+        kind=kind,
+        source=source,
+        actor=actor,
+        from_status=from_status,
+        to_status=to_status,
+    )
+    events = getattr(_state, "events", None)
+    if events is None:
+        event.save()
+    else:
+        events.append(event)
+    return event
+
+
+def record_deleted(booking_ids, source, actor=None):
+    for booking_id in booking_ids:
+        record(booking_id, BookingEvent.KIND_DELETED, source, actor=actor)
+
+
+def timeline(booking_id):
+    return BookingEvent.objects.filter(booking_id=booking_id).select_related("actor").order_by("created_at", "pk")
@@ -0,0 +1,182 @@
+import time as time_module
+from calendar import monthrange
+from datetime import date as dt_date, time as dt_time, timedelta
+
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousOperation
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Count, F
+
+from . import audit, outbox, routers
+from .models import MAX_SLOT_MINUTES, Booking, BookingEvent, Chef
+
+# Rejected requests free their slot; everything else keeps it.
+BLOCKING_STATUSES = ("Pending", "Accepted")
+LOCK_RETRIES = 5
+LOCK_RETRY_DELAY = 0.05
+CALENDAR_CACHE_TIMEOUT = 60 * 15
+# Months the calendar endpoint serves; far-off years would overflow datetime.
+CALENDAR_YEARS = range(2000, 2101)
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+def slot_bounds(chef, date, time):
+    start = Booking.combine_schedule(date, time)
+    return start, start + chef.slot_duration
+
+
+def overlapping_bookings(chef, start, end):
+    """
+    Bookings of ``chef`` that intersect [start, end). No booking is longer
+    than MAX_SLOT_MINUTES, so bounding scheduled_at from below turns this into
+    a single range scan of the (chef, scheduled_at) index.
+    """
+    return Booking.objects.filter(
+        chef=chef,
+        status__in=BLOCKING_STATUSES,
+        scheduled_at__gt=start - timedelta(minutes=MAX_SLOT_MINUTES),
+        scheduled_at__lt=end,
+        ends_at__gt=start,
+    )
+
+
+def _replayed_booking(customer, idempotency_key):
+    if idempotency_key is None:
+        return None
+    booking = Booking.all_objects.filter(idempotency_key=idempotency_key).first()
+    if booking is not None and booking.customer_id != customer.pk:
+        raise SuspiciousOperation("Idempotency key belongs to another customer.")
+    return booking
+
+
+def _book_once(chef, customer, start, end, idempotency_key=None, **fields):
+    with audit.batch():
+        # Writing first takes SQLite's write lock (and the row lock elsewhere)
+        # before the overlap check, so two requests for the same chef can never
+        # both see the slot as free.
+        Chef.objects.filter(pk=chef.pk).update(schedule_version=F("schedule_version") + 1)
+        replayed = _replayed_booking(customer, idempotency_key)
+        if replayed is not None:
+            return replayed, False
+        if overlapping_bookings(chef, start, end).exists():
+            raise SlotUnavailable
+        booking = Booking.objects.create(
+            customer=customer,
+            chef=chef,
+            date=start.date(),
+            time=start.time(),
+            ends_at=end,
+            idempotency_key=idempotency_key,
+            **fields,
+        )
+        audit.record(
+            booking.pk, BookingEvent.KIND_CREATED, audit.SOURCE_CUSTOMER, customer, to_status=booking.status
+        )
+        outbox.booking_requested(booking)
+        return booking, True
+
+
+def book_slot(chef, customer, date, time, idempotency_key=None, **fields):
+    """
+    Book the slot starting at date/time and return ``(booking, created)``.
+    Raises SlotUnavailable when it overlaps another booking. A request
+    repeating an ``idempotency_key`` gets the original booking back.
+    """
+    start, end = slot_bounds(chef, date, time)
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return _book_once(chef, customer, start, end, idempotency_key, **fields)
+        except IntegrityError:
+            # The key was already used for a booking with another chef, which
+            # the per-chef lock does not cover.
+            replayed = _replayed_booking(customer, idempotency_key)
+            if replayed is None:
+                raise
+            return replayed, False
+        except OperationalError as exc:
+            if "locked" not in str(exc) or attempt == LOCK_RETRIES - 1:
+                raise
+            time_module.sleep(LOCK_RETRY_DELAY * (attempt + 1))
+
+
+def calendar_cache_key(chef_id, year, month):
+    return f"booking:availability:{chef_id}:{year:04d}-{month:02d}"
+
+
+def invalidate_calendar(chef_id, day):
+    """
+    Drop the cached month once the current transaction commits (at once
+    outside one). Dropping it earlier would let a concurrent request cache
+    the month again from the snapshot without this change.
+    """
+    key = calendar_cache_key(chef_id, day.year, day.month)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def invalidate_calendars(bookings):
+    """Drop the cached months touched by ``bookings`` with one cache call, after commit."""
+    keys = {calendar_cache_key(b.chef_id, b.date.year, b.date.month) for b in bookings}
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def booked_days(chef_id, year, month):
+    """
+    ``{"slot_minutes": n, "days": {"YYYY-MM-DD": bookings}}`` for one chef
+    and month, or None when the chef does not exist. Computed with a single
+    grouped query over the (chef, scheduled_at) index and cached until a
+    booking of that chef and month changes.
+    """
+    key = calendar_cache_key(chef_id, year, month)
+    data = cache.get(key)
+    if data is None:
+        # Cached, so read from the primary: a lagging replica's snapshot
+        # would outlive the invalidation that follows the booking's commit.
+        with routers.reads_from_primary():
+            slot_minutes = Chef.objects.filter(pk=chef_id).values_list("slot_minutes", flat=True).first()
+            if slot_minutes is None:
+                return None
+            start = Booking.combine_schedule(dt_date(year, month, 1), dt_time.min)
+            end = start + timedelta(days=monthrange(year, month)[1])
+            rows = (
+                Booking.objects.filter(
+                    chef_id=chef_id,
+                    status__in=BLOCKING_STATUSES,
+                    scheduled_at__gte=start,
+                    scheduled_at__lt=end,
+                )
+                .values("date")
+                .annotate(bookings=Count("id"))
+                .order_by()
+            )
+            data = {
+                "slot_minutes": slot_minutes,
+                "days": {row["date"].isoformat(): row["bookings"] for row in rows},
+            }
+        cache.set(key, data, CALENDAR_CACHE_TIMEOUT)
+    return data
+
+
+def month_calendar(chef_id, year, month, today=None):
+    """Busy/free status for every day of the month, for the calendar endpoint."""
+    data = booked_days(chef_id, year, month)
+    if data is None:
+        return None
+    today = today or dt_date.today()
+    days = []
+    for number in range(1, monthrange(year, month)[1] + 1):
+        day = dt_date(year, month, number)
+        bookings = data["days"].get(day.isoformat(), 0)
+        if day < today:
+            status = "past"
+        else:
+            status = "busy" if bookings else "free"
+        days.append({"date": day.isoformat(), "status": status, "bookings": bookings})
+    return {
+        "chef": chef_id,
+        "month": f"{year:04d}-{month:02d}",
+        "slot_minutes": data["slot_minutes"],
+        "days": days,
+    }
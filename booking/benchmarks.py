@@ -0,0 +1,598 @@
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.db import OperationalError, connection, connections
+from django.test import Client, RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Profile
+
+from . import archive, availability, caching, contact_search, search, views
+from .archive import archive_bookings
+from .dashboard import build_dashboard
+from .models import BlogPost, Booking, BookingArchive, Chef, ContactQuery
+from .pagination import KeysetPaginator, RankedPaginator, UnionKeysetPaginator, encode_cursor
+from .test_runner import LOCMEM_CACHE, scratch_caches
+
+SCENARIOS = {}
+
+SPECIALTIES = ["North Indian", "South Indian", "Italian", "Chinese", "Mughlai", "Continental", "Bengali", "Thai"]
+DISHES = ["biryani", "paneer tikka", "dosa", "risotto", "dim sum", "kebab", "pad thai", "fish curry"]
+CITIES = ["Mumbai", "Delhi", "Pune", "Jaipur", "Kolkata", "Chennai", "Indore", "Bengaluru"]
+
+
+def scenario(name, file_backed=False):
+    def register(func):
+        func.file_backed = file_backed
+        SCENARIOS[name] = func
+        return func
+
+    return register
+
+
+@contextmanager
+def scratch_database(file_backed=False):
+    """
+    Run against a freshly migrated test database instead of the real one.
+    Scenarios that need several connections to contend for real locks ask for
+    a file-backed database instead of SQLite's shared in-memory one.
+    """
+    old_name = connection.settings_dict["NAME"]
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    old_test_name = test_settings.get("NAME")
+    if file_backed:
+        test_settings["NAME"] = os.path.join(tempfile.mkdtemp(prefix="chef_booking_bench_"), "bench.sqlite3")
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        # In-process, so cache timings reflect a server cache like Redis
+        # rather than the file-based development fallback's directory scans.
+        with scratch_caches(LOCMEM_CACHE):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings["NAME"] = old_test_name
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def seed_chefs(total, batch_size=5000, rng=None):
+    """Grow the chef table to ``total`` rows, each with a user and profile."""
+    rng = rng or random.Random(42)
+    User = get_user_model()
+    start = Chef.objects.count()
+    for offset in range(start, total, batch_size):
+        stop = min(offset + batch_size, total)
+        users = User.objects.bulk_create(
+            [User(username=f"bench_chef_{i}", password="!") for i in range(offset, stop)]
+        )
+        Profile.objects.bulk_create(
+            [
+                Profile(
+                    user=user,
+                    name=user.username,
+                    location=rng.choice(CITIES),
+                    speciality=rng.choice(SPECIALTIES),
+                    dishes=", ".join(rng.sample(DISHES, 2)),
+                )
+                for user in users
+            ]
+        )
+        Chef.objects.bulk_create(
+            [
+                Chef(
+                    user=user,
+                    name=f"Chef {rng.choice(['Aman', 'Priya', 'Ravi', 'Neha', 'Kabir', 'Isha'])} {i}",
+                    specialty=rng.choice(SPECIALTIES),
+                    experience=rng.randint(0, 30),
+                    team_members=rng.randint(2, 12),
+                    price_per_person=Decimal(rng.randint(300, 3000)),
+                )
+                for i, user in zip(range(offset, stop), users)
+            ]
+        )
+
+
+def seed_bookings(total, past_fraction=0.5, batch_size=20_000, rng=None):
+    """Add ``total`` bookings spread over a few chefs and customers."""
+    rng = rng or random.Random(7)
+    seed_chefs(20)
+    chefs = list(Chef.objects.all()[:20])
+    customers = [chef.user for chef in chefs]
+    now = timezone.now().replace(microsecond=0)
+    for offset in range(0, total, batch_size):
+        rows = []
+        for _ in range(min(batch_size, total - offset)):
+            days = rng.randint(31, 720) if rng.random() < past_fraction else -rng.randint(1, 180)
+            when = now - timedelta(days=days, minutes=rng.randint(0, 1440))
+            chef = rng.choice(chefs)
+            rows.append(
+                Booking(
+                    customer=rng.choice([c for c in customers if c.pk != chef.user_id]),
+                    chef=chef,
+                    date=when.date(),
+                    time=when.time(),
+                    scheduled_at=when,
+                    ends_at=when + chef.slot_duration,
+                    person=rng.randint(1, 20),
+                    total_price=Decimal("1000.00"),
+                )
+            )
+        Booking.objects.bulk_create(rows)
+
+
+def seed_contact_queries(total, batch_size=10_000, rng=None):
+    """Grow the contact query table to ``total`` rows with a few sentences each."""
+    rng = rng or random.Random(3)
+    words = ["dinner", "party", "guests", "birthday", "wedding", "menu", "vegetarian", "spicy", "weekend", "family"]
+    start = ContactQuery.objects.count()
+    for offset in range(start, total, batch_size):
+        ContactQuery.objects.bulk_create(
+            [
+                ContactQuery(
+                    name=f"Guest {i}",
+                    email=f"guest{i}@example.com",
+                    phone_number=f"98{i:08d}",
+                    city=rng.choice(CITIES),
+                    message=" ".join(
+                        f"Looking for {rng.choice(DISHES)} for a {rng.choice(words)} of {rng.randint(2, 40)} "
+                        f"{rng.choice(words)} in {rng.choice(CITIES)}."
+                        for _ in range(rng.randint(2, 8))
+                    ),
+                )
+                for i in range(offset, min(offset + batch_size, total))
+            ]
+        )
+
+
+class WriteProbe(threading.Thread):
+    """Keep inserting bookings from another connection and record latency."""
+
+    def __init__(self, interval=0.01):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.latencies = []
+        self.failures = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        chef = Chef.objects.order_by("pk").first()
+        customer = Chef.objects.order_by("-pk").first().user
+        when = timezone.now() + timedelta(days=30)
+        try:
+            while not self.stopped.is_set():
+                start = time.perf_counter()
+                try:
+                    Booking.objects.create(
+                        customer=customer, chef=chef, date=when.date(), time=when.time(),
+                        person=2, total_price=Decimal("100.00"),
+                    )
+                    self.latencies.append((time.perf_counter() - start) * 1000)
+                except OperationalError:
+                    self.failures += 1
+                time.sleep(self.interval)
+        finally:
+            connections.close_all()
+
+    def report(self):
+        ordered = sorted(self.latencies) or [0.0]
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return f"writes={len(self.latencies)} failed={self.failures} p99={p99:.1f}ms max={ordered[-1]:.1f}ms"
+
+
+def _with_write_probe(func):
+    probe = WriteProbe()
+    probe.start()
+    start = time.perf_counter()
+    try:
+        func()
+    finally:
+        elapsed = time.perf_counter() - start
+        probe.stopped.set()
+        probe.join()
+    return elapsed, probe
+
+
+@scenario("cleanup_availability", file_backed=True)
+def cleanup_availability(stdout, sizes=(1_000_000,), repeat=1):
+    for size in sizes:
+        seed_bookings(size - Booking.all_objects.count())
+        cutoff = timezone.now() - timedelta(days=30)
+        eligible = Booking.all_objects.filter(is_deleted=False).past(cutoff)
+        stdout.write(f"{size} bookings, {eligible.count()} eligible for cleanup")
+
+        elapsed, probe = _with_write_probe(lambda: eligible.update(is_deleted=True, deleted_at=timezone.now()))
+        stdout.write(f"  single UPDATE:  {elapsed:7.2f}s  {probe.report()}")
+
+        Booking.all_objects.update(is_deleted=False, deleted_at=None)
+        elapsed, probe = _with_write_probe(
+            lambda: call_command(
+                "cleanup_past_bookings", batch_size=1000, sleep_between_batches=0.05, stdout=StringIO()
+            )
+        )
+        stdout.write(f"  batched (1000): {elapsed:7.2f}s  {probe.report()}")
+        Booking.all_objects.update(is_deleted=False, deleted_at=None)
+
+
+@scenario("archive_hot_path")
+def archive_hot_path(stdout, sizes=(200_000,), repeat=5):
+    def hot_queries():
+        customer = Chef.objects.order_by("pk").first().user
+        return {
+            "dashboard": lambda: build_dashboard(customer, {}),
+            "admin upcoming": lambda: (
+                Booking.objects.upcoming().count(),
+                list(Booking.objects.upcoming().select_related("customer", "chef").order_by("-scheduled_at")[:15]),
+            ),
+            "admin all active": lambda: (
+                Booking.objects.count(),
+                list(Booking.objects.select_related("customer", "chef").order_by("status", "-scheduled_at")[:15]),
+            ),
+        }
+
+    for size in sizes:
+        seed_bookings(size - Booking.all_objects.count() - BookingArchive.objects.count())
+        # Soft-delete most of the history, as years of cleanup runs would.
+        Booking.all_objects.filter(pk__in=Booking.all_objects.past().values("pk")).update(
+            is_deleted=True, deleted_at=timezone.now() - timedelta(days=60)
+        )
+        before = {name: timed(func, repeat) for name, func in hot_queries().items()}
+        moved = sum(archive_bookings(timezone.now() - timedelta(days=30), batch_size=5000))
+        after = {name: timed(func, repeat) for name, func in hot_queries().items()}
+
+        stdout.write(f"{size} bookings, {moved} archived")
+        stdout.write(f"  {'query':<18} {'before ms':>10} {'after ms':>10}")
+        for name in before:
+            stdout.write(f"  {name:<18} {before[name]:>10.2f} {after[name]:>10.2f}")
+
+
+@scenario("chef_search")
+def chef_search(stdout, sizes=(10_000, 100_000), repeat=5):
+    # The first page of chef_list each way: the LIKE fallback, the rank-ordered
+    # "Recommended" view and a listing sorted by price.
+    queries = ["biryani", "ital", "pune mughlai", "1234"]
+    base = Chef.objects.select_related("user", "user__profile")
+    page_size = views.CHEF_PAGE_SIZE
+
+    def like_page(query):
+        return KeysetPaginator(search.like_filter(base, query), views.CHEF_SORTS["newest"], page_size).get_page()
+
+    def ranked_page(query):
+        return RankedPaginator(base, search.search_chef_ids(query), page_size).get_page()
+
+    def sorted_page(query):
+        return KeysetPaginator(search.filter_matching(base, query), views.CHEF_SORTS["price_low"], page_size).get_page()
+
+    stdout.write(f"{'chefs':>8} {'query':<14} {'LIKE ms':>9} {'FTS ms':>9} {'sorted ms':>10}")
+    for size in sizes:
+        seed_chefs(size)
+        search.chef_index.rebuild()
+        for query in queries:
+            like_ms = timed(lambda: list(like_page(query)), repeat)
+            fts_ms = timed(lambda: list(ranked_page(query)), repeat)
+            sorted_ms = timed(lambda: list(sorted_page(query)), repeat)
+            stdout.write(f"{size:>8} {query:<14} {like_ms:>9.2f} {fts_ms:>9.2f} {sorted_ms:>10.2f}")
+
+
+@scenario("chef_calendar")
+def chef_calendar(stdout, sizes=(1_000, 10_000), repeat=20):
+    seed_chefs(2)
+    chef, other = Chef.objects.order_by("pk")[:2]
+    customer = other.user
+    first_day = (timezone.now() + timedelta(days=31)).date().replace(day=1)
+    year, month = first_day.year, first_day.month
+    request_factory = RequestFactory()
+    url = f"/chefs/{chef.pk}/availability/?month={year:04d}-{month:02d}"
+    rng = random.Random(11)
+
+    def per_row():
+        # What a straightforward view would do: load the month and count in Python.
+        days = {}
+        for booking in Booking.objects.filter(chef=chef, date__year=year, date__month=month):
+            days[booking.date] = days.get(booking.date, 0) + 1
+        return days
+
+    def cold():
+        cache.clear()
+        return availability.month_calendar(chef.pk, year, month)
+
+    def calendar_request(**headers):
+        request = request_factory.get(url, **headers)
+        request.user = customer
+        return views.chef_availability(request, chef.pk)
+
+    def conditional():
+        return calendar_request(HTTP_IF_NONE_MATCH=etag)
+
+    stdout.write(f"{'bookings':>9} {'per-row ms':>11} {'aggregate ms':>13} {'cached ms':>10} {'304 ms':>8}")
+    for size in sizes:
+        rows = []
+        for _ in range(size - Booking.objects.filter(chef=chef).count()):
+            when = timezone.now().replace(microsecond=0) + timedelta(days=rng.randint(1, 365), minutes=rng.randint(0, 1440))
+            rows.append(
+                Booking(
+                    customer=customer,
+                    chef=chef,
+                    date=when.date(),
+                    time=when.time(),
+                    scheduled_at=when,
+                    ends_at=when + chef.slot_duration,
+                    person=2,
+                    total_price=Decimal("1000.00"),
+                )
+            )
+        Booking.objects.bulk_create(rows, batch_size=5000)
+
+        per_row_ms = timed(per_row, repeat)
+        cold_ms = timed(cold, repeat)
+        cached_ms = timed(lambda: availability.month_calendar(chef.pk, year, month), repeat)
+        etag = calendar_request()["ETag"]
+        assert conditional().status_code == 304
+        conditional_ms = timed(conditional, repeat)
+        stdout.write(f"{size:>9} {per_row_ms:>11.2f} {cold_ms:>13.2f} {cached_ms:>10.2f} {conditional_ms:>8.2f}")
+
+
+@scenario("admin_pagination")
+def admin_pagination(stdout, sizes=(100_000,), repeat=5, per_page=15, deep_page=5000):
+    """Page 1 vs a deep page of the admin booking list: COUNT + OFFSET vs keyset."""
+    ordering = ("-scheduled_at", "-pk")
+
+    def listings():
+        active = Booking.all_objects.filter(is_deleted=False).select_related("customer", "chef")
+        return {
+            "all active": (
+                lambda: active.order_by(*ordering),
+                KeysetPaginator(active, ordering, per_page, count="estimate"),
+                list,
+            ),
+            "archived": (
+                lambda: archive.archived_bookings().order_by(*ordering),
+                UnionKeysetPaginator(
+                    lambda condition: archive.archived_bookings(condition=condition),
+                    Booking,
+                    archive.ARCHIVE_LIST_FIELDS,
+                    ordering,
+                    per_page,
+                    count="estimate",
+                ),
+                archive.hydrate,
+            ),
+        }
+
+    def offset_page(queryset, hydrate, number):
+        page = Paginator(queryset(), per_page).get_page(number)
+        return page.paginator.num_pages, hydrate(page.object_list)
+
+    def keyset_page(paginator, hydrate, cursor):
+        page = paginator.get_page(cursor)
+        return page.total, hydrate(page.object_list)
+
+    stdout.write(
+        f"{'bookings':>9} {'listing':<11} {'offset p1':>10} {'offset deep':>12} {'keyset p1':>10} {'keyset deep':>12}"
+    )
+    for size in sizes:
+        seed_bookings(size - Booking.all_objects.count() - BookingArchive.objects.count())
+        # Half the history soft-deleted and a third of that already archived.
+        Booking.all_objects.filter(pk__in=Booking.all_objects.past().values("pk")).update(
+            is_deleted=True, deleted_at=timezone.now() - timedelta(days=60)
+        )
+        sum(archive_bookings(timezone.now() - timedelta(days=30), batch_size=5000))
+        Booking.all_objects.filter(is_deleted=True).update(deleted_at=timezone.now())
+
+        for name, (queryset, paginator, hydrate) in listings().items():
+            number = min(deep_page, Paginator(queryset(), per_page).num_pages)
+            # The cursor a user would hold after clicking "Next" number - 1 times.
+            last_row = queryset()[(number - 1) * per_page - 1]
+            cursor = encode_cursor({"k": paginator._key(last_row), "d": "n"})
+            stdout.write(
+                f"{size:>9} {name:<11} "
+                f"{timed(lambda: offset_page(queryset, hydrate, 1), repeat):>10.2f} "
+                f"{timed(lambda: offset_page(queryset, hydrate, number), repeat):>12.2f} "
+                f"{timed(lambda: keyset_page(paginator, hydrate, None), repeat):>10.2f} "
+                f"{timed(lambda: keyset_page(paginator, hydrate, cursor), repeat):>12.2f}"
+                f"  (deep = page {number})"
+            )
+
+
+@scenario("contact_search")
+def contact_search_latency(stdout, sizes=(10_000, 100_000), repeat=5, per_page=20):
+    """First page of the admin contact query search: five LIKE scans vs FTS."""
+    queries = ["biryani", "pune", "guest4242", "wedding vegetarian", "zzz"]
+    active = ContactQuery.objects.filter(is_deleted=False)
+
+    def like_page(query):
+        page = KeysetPaginator(contact_search.like_filter(active, query), ("-created_at", "-id"), per_page)
+        return list(page.get_page())
+
+    def fts_page(query):
+        page = RankedPaginator(active, contact_search.search_query_ids(query), per_page).get_page()
+        return [contact_search.snippet(item.message, query) for item in page]
+
+    stdout.write(f"{'queries':>8} {'query':<20} {'LIKE ms':>9} {'FTS ms':>9}")
+    for size in sizes:
+        seed_contact_queries(size)
+        contact_search.chef_index.rebuild()
+        for query in queries:
+            like_ms = timed(lambda: like_page(query), repeat)
+            fts_ms = timed(lambda: fts_page(query), repeat)
+            stdout.write(f"{size:>8} {query:<20} {like_ms:>9.2f} {fts_ms:>9.2f}")
+
+
+@scenario("blog_pages")
+def blog_pages(stdout, sizes=(50, 500), repeat=300):
+    """Anonymous requests/sec for the blog pages through the full middleware stack."""
+    client = Client(HTTP_HOST="localhost")
+    author = get_user_model().objects.create_user(username="bench_author")
+    no_cache = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+    def requests_per_second(url, **headers):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            client.get(url, **headers)
+        return repeat / (time.perf_counter() - start)
+
+    stdout.write(f"{'posts':>6} {'page':<7} {'uncached r/s':>13} {'cached r/s':>11} {'304 r/s':>9}")
+    for size in sizes:
+        BlogPost.objects.bulk_create(
+            [
+                BlogPost(title=f"Post {i}", image="", content="Slow-cooked stories. " * 200, author=author)
+                for i in range(BlogPost.objects.count(), size)
+            ]
+        )
+        cache.clear()
+        pages = {"list": "/blog/", "detail": f"/{BlogPost.objects.order_by('pk').first().pk}/"}
+        for name, url in pages.items():
+            with override_settings(CACHES=no_cache):
+                uncached = requests_per_second(url)
+            etag = client.get(url)["ETag"]
+            cached = requests_per_second(url)
+            conditional = requests_per_second(url, HTTP_IF_NONE_MATCH=etag)
+            stdout.write(f"{size:>6} {name:<7} {uncached:>13.0f} {cached:>11.0f} {conditional:>9.0f}")
+
+
+@scenario("chef_cards")
+def chef_cards(stdout, sizes=(500,), repeat=10):
+    """Render one chef directory page of ``size`` cards with and without fragment caching."""
+    request_factory = RequestFactory()
+    no_cache = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    page_size = views.CHEF_PAGE_SIZE
+
+    def render_page():
+        request = request_factory.get("/chefs/")
+        request.user = viewer
+        response = views.chef_list(request)
+        assert response.status_code == 200
+        return response
+
+    stdout.write(f"{'chefs':>6} {'uncached ms':>12} {'cold ms':>9} {'warm ms':>9} {'one stale ms':>13}")
+    try:
+        for size in sizes:
+            seed_chefs(size + 1)
+            for chef in Chef.objects.select_related("user__profile").filter(image__isnull=True):
+                Chef.objects.filter(pk=chef.pk).update(image=f"chef_dishes/bench_{chef.pk}.jpg")
+                Profile.objects.filter(pk=chef.user.profile.pk).update(profile_image=f"profile_images/bench_{chef.pk}.jpg")
+            viewer = Chef.objects.order_by("pk").first().user
+            views.CHEF_PAGE_SIZE = size
+            some_chef = Chef.objects.order_by("-pk").first()
+
+            with override_settings(CACHES=no_cache):
+                uncached_ms = timed(render_page, repeat)
+
+            def cold():
+                cache.clear()
+                render_page()
+
+            def one_stale():
+                caching.invalidate_chef_cards([some_chef.pk])
+                render_page()
+
+            cold_ms = timed(cold, repeat)
+            render_page()
+            warm_ms = timed(render_page, repeat)
+            stale_ms = timed(one_stale, repeat)
+            stdout.write(f"{size:>6} {uncached_ms:>12.1f} {cold_ms:>9.1f} {warm_ms:>9.1f} {stale_ms:>13.1f}")
+    finally:
+        views.CHEF_PAGE_SIZE = page_size
+
+
+def _contention_worker(worker, per_worker, chef_ids, customer_id, ready, results):
+    client = Client(HTTP_HOST="localhost")
+    client.force_login(get_user_model().objects.get(pk=customer_id))
+    first_day = timezone.localdate() + timedelta(days=1 + worker * per_worker)
+    latencies = []
+    failures = 0
+    ready.wait()
+    try:
+        for i in range(per_worker):
+            chef_id = chef_ids[(worker + i) % len(chef_ids)]
+            data = {"date": (first_day + timedelta(days=i)).isoformat(), "time": "19:00", "person": "2"}
+            start = time.perf_counter()
+            try:
+                response = client.post(reverse("book_chef", args=[chef_id]), data)
+            except OperationalError:
+                failures += 1
+                continue
+            if response.headers.get("Location") == reverse("dashboard"):
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                failures += 1
+    finally:
+        connections.close_all()
+        results.put((latencies, failures))
+
+
+@scenario("book_contention", file_backed=True)
+def book_contention(stdout, sizes=(2, 4, 8), repeat=50):
+    """
+    ``size`` processes submit ``repeat`` bookings each through book_chef at
+    once, first with SQLite's stock journal and deferred transactions, then
+    with SQLITE_PRAGMAS and BEGIN IMMEDIATE.
+    """
+    context = multiprocessing.get_context("fork")
+    seed_chefs(8)
+    chef_ids = list(Chef.objects.order_by("pk").values_list("pk", flat=True))
+    customer = get_user_model().objects.create_user(username="bench_customer")
+    configs = {
+        "stock": ({"journal_mode": "delete", "synchronous": "full"}, None),
+        "tuned": (settings.SQLITE_PRAGMAS, "IMMEDIATE"),
+    }
+    options = connection.settings_dict["OPTIONS"]
+    old_mode = options.get("transaction_mode")
+
+    stdout.write(f"{'procs':>6} {'config':<6} {'bookings/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'failed':>7}")
+    try:
+        for size in sizes:
+            for label, (pragmas, mode) in configs.items():
+                Booking.all_objects.all().delete()
+                options["transaction_mode"] = mode
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    # Switch the journal mode here, before the workers connect.
+                    connections.close_all()
+                    connection.ensure_connection()
+                    connections.close_all()
+                    ready = context.Barrier(size + 1)
+                    results = context.Queue()
+                    workers = [
+                        context.Process(
+                            target=_contention_worker, args=(worker, repeat, chef_ids, customer.pk, ready, results)
+                        )
+                        for worker in range(size)
+                    ]
+                    for process in workers:
+                        process.start()
+                    ready.wait()
+                    start = time.perf_counter()
+                    outcomes = [results.get() for _ in workers]
+                    elapsed = time.perf_counter() - start
+                    for process in workers:
+                        process.join()
+                latencies = sorted(latency for worker_latencies, _ in outcomes for latency in worker_latencies) or [0.0]
+                failures = sum(failed for _, failed in outcomes)
+                p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+                stdout.write(
+                    f"{size:>6} {label:<6} {(size * repeat - failures) / elapsed:>11.0f} "
+                    f"{statistics.median(latencies):>8.1f} {p99:>8.1f} {failures:>7}"
+                )
+    finally:
+        options["transaction_mode"] = old_mode
@@ -0,0 +1,185 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.utils.safestring import mark_safe
+
+from . import routers
+from .models import Chef
+
+CHEF_CACHE_TIMEOUT = 60 * 15
+BLOG_CACHE_TIMEOUT = 60 * 10
+BLOG_VERSION_KEY = "booking:blog:version"
+CHEF_CARD_TIMEOUT = 60 * 60
+CHEF_CARD_TEMPLATE = "booking/partials/chef_card.html"
+
+_blog_state = threading.local()
+
+# Cached in place of a Chef when the user has no chef profile, so that the
+# negative lookup is cached too (cache.get() returns None on a miss).
+_NO_CHEF = False
+
+
+def chef_cache_key(user_id):
+    return f"booking:chef_for_user:{user_id}"
+
+
+def get_chef_for_user(user):
+    key = chef_cache_key(user.pk)
+    chef = cache.get(key)
+    if chef is None:
+        with routers.reads_from_primary():
+            chef = Chef.objects.filter(user=user).first() or _NO_CHEF
+        cache.set(key, chef, CHEF_CACHE_TIMEOUT)
+    return chef or None
+
+
+def invalidate_chef_for_user(user_id):
+    cache.delete(chef_cache_key(user_id))
+
+
+def chef_card_version_key(chef_id):
+    return f"booking:chef_card:version:{chef_id}"
+
+
+def invalidate_chef_cards(chef_ids):
+    # Dropping the version (rather than incrementing it) means the next read
+    # picks a fresh random one, so an evicted version can never bring back a
+    # fragment cached under an older value.
+    cache.delete_many([chef_card_version_key(chef_id) for chef_id in chef_ids])
+
+
+def chef_cards(chefs):
+    """
+    ``{chef.pk: html}`` for the chef directory cards, stitched from per-chef
+    fragments: one get_many for the versions, one for the fragments, and a
+    render plus set_many only for cards that changed.
+    """
+    version_keys = {chef.pk: chef_card_version_key(chef.pk) for chef in chefs}
+    versions = cache.get_many(version_keys.values())
+    new_versions = {}
+    for key in version_keys.values():
+        if key not in versions:
+            new_versions[key] = versions[key] = uuid.uuid4().hex
+    if new_versions:
+        cache.set_many(new_versions, None)
+
+    fragment_keys = {chef.pk: f"booking:chef_card:{chef.pk}:{versions[version_keys[chef.pk]]}" for chef in chefs}
+    fragments = cache.get_many(fragment_keys.values())
+    missing = [chef.pk for chef in chefs if fragment_keys[chef.pk] not in fragments]
+    primary = None
+    if missing and routers.reading_from_replica():
+        # What gets cached is rendered from the primary's rows, never from
+        # the lagging replica's.
+        with routers.reads_from_primary():
+            primary = Chef.objects.select_related("user", "user__profile").in_bulk(missing)
+    cards, rendered = {}, {}
+    for chef in chefs:
+        key = fragment_keys[chef.pk]
+        if key not in fragments:
+            fresh = chef if primary is None else primary.get(chef.pk)
+            fragments[key] = render_to_string(CHEF_CARD_TEMPLATE, {"chef": fresh or chef})
+            # A chef already deleted on the primary is shown as the replica
+            # has it, but not cached.
+            if fresh is not None:
+                rendered[key] = fragments[key]
+        cards[chef.pk] = mark_safe(fragments[key])
+    if rendered:
+        cache.set_many(rendered, CHEF_CARD_TIMEOUT)
+    return cards
+
+
+def blog_version():
+    """
+    The blog content version: the time of the last blog change, in
+    milliseconds. It doubles as Last-Modified, and if the key is evicted the
+    next read starts a new version, which is always safe.
+    """
+    version = cache.get(BLOG_VERSION_KEY)
+    if version is None:
+        now = int(time.time() * 1000)
+        cache.add(BLOG_VERSION_KEY, now, None)
+        version = cache.get(BLOG_VERSION_KEY, now)
+    return version
+
+
+def bump_blog_version():
+    current = cache.get(BLOG_VERSION_KEY) or 0
+    cache.set(BLOG_VERSION_KEY, max(int(time.time() * 1000), current + 1), None)
+
+
+def bump_blog_version_on_commit():
+    # After commit, so a page rendered mid-transaction cannot be cached under
+    # the new version with the old content.
+    if getattr(_blog_state, "batched", None) is not None:
+        _blog_state.batched = True
+        return
+    transaction.on_commit(bump_blog_version)
+
+
+@contextmanager
+def blog_version_batch():
+    """
+    Collapse the blog version bumps requested inside the block (e.g. by
+    per-row delete signals) into a single one after commit.
+    """
+    if getattr(_blog_state, "batched", None) is not None:
+        yield
+        return
+    _blog_state.batched = False
+    try:
+        yield
+        bumped = _blog_state.batched
+    finally:
+        _blog_state.batched = None
+    if bumped:
+        bump_blog_version_on_commit()
+
+
+def cached_blog_page(view_func):
+    """
+    Serve anonymous GETs of a blog page from a cache keyed on the path and
+    the blog content version, with ETag/Last-Modified validators so repeat
+    visits get a 304. Signed-in users see a personalised navbar and bypass it.
+    """
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+            return view_func(request, *args, **kwargs)
+
+        version = blog_version()
+        etag = f'"blog-{version}"'
+        last_modified = version // 1000
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            key = f"booking:blog:page:{version}:{request.path}"
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                with routers.reads_from_primary():
+                    response = view_func(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                # A page that showed flash messages or set cookies belongs to
+                # this visitor alone.
+                if not response.cookies and not get_messages(request).used:
+                    cache.set(key, (response.content, response["Content-Type"]), BLOG_CACHE_TIMEOUT)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ["Cookie"])
+        return response
+
+    return wrapper
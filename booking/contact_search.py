@@ -0,0 +1,101 @@
+import unicodedata
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .fts import TOKEN_RE, FtsIndex, build_match_expression
+
+SEARCH_RESULT_LIMIT = 500
+# Common words match a large share of all queries; only the newest this many
+# matches are ranked, which keeps bm25() from scoring the whole table.
+RANK_WINDOW = 5000
+SNIPPET_TOKENS = 16
+
+contact_index = FtsIndex(
+    "booking_contactquery_fts",
+    ("name", "email", "phone_number", "city", "message"),
+    "SELECT id, name, email, phone_number, city, message FROM booking_contactquery",
+    # Only active queries are indexed; soft-deleting one removes its row.
+    source_filter="NOT is_deleted",
+    # Who wrote in ranks above where from, which ranks above the message body.
+    weights=(8.0, 8.0, 8.0, 3.0, 1.0),
+)
+
+
+def index_query(query_id, using=DEFAULT_DB_ALIAS):
+    contact_index.reindex("rowid = %s", "id = %s", [query_id], using=using)
+
+
+def remove_queries(query_ids, using=DEFAULT_DB_ALIAS):
+    contact_index.remove(query_ids, using=using)
+
+
+def search_query_ids(query, limit=SEARCH_RESULT_LIMIT, using=DEFAULT_DB_ALIAS):
+    """
+    Return contact query ids ranked by relevance, or None when the index is
+    unavailable. Only the newest RANK_WINDOW matches are ranked, so the hits
+    are marked incomplete when older matches were left out, or when there
+    were more than ``limit``.
+    """
+    if not contact_index.is_available(using):
+        return None
+    expression = build_match_expression(query)
+    if not expression:
+        return []
+    with connections[using].cursor() as cursor:
+        # Ids grow with created_at, and FTS5 walks a doclist backwards by
+        # rowid cheaply, so this finds where the newest window starts.
+        cursor.execute(
+            f"SELECT rowid FROM {contact_index.table} WHERE {contact_index.table} MATCH %s "
+            "ORDER BY rowid DESC LIMIT 2 OFFSET %s",
+            [expression, RANK_WINDOW - 1],
+        )
+        rows = cursor.fetchall()
+    hits = contact_index.ranked_ids(expression, limit, using=using, min_rowid=rows[0][0] if rows else 0)
+    # A second row means a match older than the window exists.
+    hits.complete = hits.complete and len(rows) < 2
+    return hits
+
+
+def _fold(text):
+    # Mirrors the index tokenizer: case-insensitive, diacritics removed.
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def snippet(text, query, size=SNIPPET_TOKENS):
+    """
+    HTML-safe excerpt of ``text`` around the first match of ``query``, with
+    every matching word in <mark>, or None when nothing matches. Built in
+    Python for the rows on screen: FTS5's snippet() would re-run the MATCH
+    over the whole doclist for each of them.
+    """
+    prefixes = tuple(_fold(token) for token in TOKEN_RE.findall(query))
+    if not prefixes:
+        return None
+    words = list(TOKEN_RE.finditer(text))
+    hits = {index for index, word in enumerate(words) if _fold(word.group()).startswith(prefixes)}
+    if not hits:
+        return None
+    start = max(0, min(min(hits) - size // 4, len(words) - size))
+    end = min(len(words), start + size)
+    parts = ["…" if start else escape(text[: words[0].start()])]
+    for index in range(start, end):
+        word = words[index]
+        if index > start:
+            parts.append(escape(text[words[index - 1].end() : word.start()]))
+        parts.append(f"<mark>{escape(word.group())}</mark>" if index in hits else escape(word.group()))
+    parts.append("…" if end < len(words) else escape(text[words[-1].end() :]))
+    return mark_safe("".join(parts))
+
+
+def like_filter(queryset, query):
+    return queryset.filter(
+        Q(name__icontains=query)
+        | Q(email__icontains=query)
+        | Q(phone_number__icontains=query)
+        | Q(city__icontains=query)
+        | Q(message__icontains=query)
+    )
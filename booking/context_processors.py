@@ -1,11 +1,16 @@
-from .models import Chef
+from django.utils.functional import SimpleLazyObject
+
+from .caching import get_chef_for_user
+
 
 def chef_context(request):
+    # Both values are resolved only if a template actually reads them.
     chef = None
     profile = None
     is_admin_user = False
     if request.user.is_authenticated:
-        chef = Chef.objects.filter(user=request.user).first()
-        profile = getattr(request.user, "profile", None)
-        is_admin_user = request.user.is_superuser
+        user = request.user
+        chef = SimpleLazyObject(lambda: get_chef_for_user(user))
+        profile = SimpleLazyObject(lambda: getattr(user, "profile", None))
+        is_admin_user = user.is_superuser
     return {"chef": chef, "user_profile": profile, "is_admin_user": is_admin_user}
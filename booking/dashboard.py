@@ -0,0 +1,56 @@
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Booking
+from .pagination import KeysetPaginator
+
+DASHBOARD_PAGE_SIZE = 10
+DASHBOARD_ORDERING = ("-scheduled_at", "-id")
+
+# Context key -> (role, is_past). The cursor for each section is read from
+# the "<key>_cursor" query parameter.
+SECTIONS = {
+    "bookings": ("chef", False),
+    "past_bookings": ("chef", True),
+    "cos_bookings": ("customer", False),
+    "past_cos_bookings": ("customer", True),
+}
+
+
+def section_bookings(user, role, is_past, now):
+    """
+    One dashboard section as a queryset. Each maps onto the (customer,
+    scheduled_at) or (chef, scheduled_at) index, so a page is a range scan.
+    """
+    bookings = Booking.objects.select_related("customer", "chef")
+    bookings = bookings.filter(chef__user=user) if role == "chef" else bookings.filter(customer=user)
+    return bookings.filter(scheduled_at__lt=now) if is_past else bookings.filter(scheduled_at__gte=now)
+
+
+def upcoming_counts(user, now):
+    """Headline numbers for the dashboard, counted over upcoming bookings only."""
+    as_chef = Q(chef__user=user)
+    return (
+        Booking.objects.filter(Q(customer=user) | as_chef, scheduled_at__gte=now)
+        .order_by()
+        .aggregate(
+            cos_count=Count("pk", filter=Q(customer=user)),
+            chef_count=Count("pk", filter=as_chef),
+            pending_count=Count("pk", filter=as_chef & Q(status="Pending")),
+        )
+    )
+
+
+def build_dashboard(user, params, now=None, per_page=DASHBOARD_PAGE_SIZE):
+    """
+    Each section fetches at most one page (LIMIT per_page + 1) past its
+    cursor, so the cost does not depend on how long the user's history is.
+    """
+    now = now or timezone.now()
+    context = upcoming_counts(user, now)
+    for key, (role, is_past) in SECTIONS.items():
+        paginator = KeysetPaginator(section_bookings(user, role, is_past, now), DASHBOARD_ORDERING, per_page)
+        page = paginator.get_page(params.get(f"{key}_cursor"))
+        page.page_param = f"{key}_cursor"
+        context[key] = page
+    return context
@@ -6,7 +6,7 @@ from .models import Chef, ContactQuery
 class ChefForm(forms.ModelForm):
     class Meta:
         model = Chef
-        fields = ["name", "specialty", "experience", "team_members", "price_per_person", "image"]
+        fields = ["name", "specialty", "experience", "team_members", "price_per_person", "slot_minutes", "image"]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -19,6 +19,77 @@ class ChefForm(forms.ModelForm):
         self.fields["experience"].widget.attrs.update({"min": 0})
         self.fields["team_members"].widget.attrs.update({"min": 2})
         self.fields["price_per_person"].widget.attrs.update({"min": 0, "step": "0.01"})
+        self.fields["slot_minutes"].widget.attrs.update({"min": 30, "step": 15})
+
+
+class ChefFilterForm(forms.Form):
+    SORT_CHOICES = [
+        ("", "Recommended"),
+        ("newest", "Newest"),
+        ("price_low", "Price: low to high"),
+        ("price_high", "Price: high to low"),
+        ("experience", "Most experienced"),
+    ]
+
+    q = forms.CharField(
+        required=False,
+        max_length=100,
+        widget=forms.SearchInput(
+            attrs={"class": "form-control", "placeholder": "Search chefs", "style": "min-width: 200px; flex: 1;"}
+        ),
+    )
+    min_price = forms.DecimalField(
+        required=False,
+        min_value=0,
+        max_digits=8,
+        decimal_places=2,
+        widget=forms.NumberInput(
+            attrs={"class": "form-control", "placeholder": "Min price", "style": "max-width: 120px;"}
+        ),
+    )
+    max_price = forms.DecimalField(
+        required=False,
+        min_value=0,
+        max_digits=8,
+        decimal_places=2,
+        widget=forms.NumberInput(
+            attrs={"class": "form-control", "placeholder": "Max price", "style": "max-width: 120px;"}
+        ),
+    )
+    min_experience = forms.IntegerField(
+        required=False,
+        min_value=0,
+        widget=forms.NumberInput(
+            attrs={"class": "form-control", "placeholder": "Min years", "style": "max-width: 110px;"}
+        ),
+    )
+    min_team = forms.IntegerField(
+        required=False,
+        min_value=0,
+        widget=forms.NumberInput(
+            attrs={"class": "form-control", "placeholder": "Min team", "style": "max-width: 110px;"}
+        ),
+    )
+    sort = forms.ChoiceField(
+        required=False,
+        choices=SORT_CHOICES,
+        widget=forms.Select(attrs={"class": "form-select", "style": "max-width: 190px;"}),
+    )
+
+    def filter_queryset(self, queryset):
+        # Filters whose input failed validation are skipped rather than
+        # rejecting the whole request.
+        self.is_valid()
+        data = self.cleaned_data
+        if data.get("min_price") is not None:
+            queryset = queryset.filter(price_per_person__gte=data["min_price"])
+        if data.get("max_price") is not None:
+            queryset = queryset.filter(price_per_person__lte=data["max_price"])
+        if data.get("min_experience") is not None:
+            queryset = queryset.filter(experience__gte=data["min_experience"])
+        if data.get("min_team") is not None:
+            queryset = queryset.filter(team_members__gte=data["min_team"])
+        return queryset
 
 
 class ContactQueryForm(forms.ModelForm):
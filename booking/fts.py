@@ -0,0 +1,139 @@
+import re
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db.models.expressions import RawSQL
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_expression(query):
+    # Quote every token so user input can never be parsed as FTS5 syntax, and
+    # turn each one into a prefix query for search-as-you-type.
+    tokens = TOKEN_RE.findall(query.lower())
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+class SearchHits(list):
+    """Ranked ids; ``complete`` is False when a cap or window may have dropped matches."""
+
+    def __init__(self, ids=(), complete=True):
+        super().__init__(ids)
+        self.complete = complete
+
+
+class FtsIndex:
+    """
+    An FTS5 shadow table over ``columns``, filled from ``source``: a SELECT
+    yielding the rowid followed by one value per column, optionally
+    restricted by the ``source_filter`` condition. ``weights`` gives each
+    column's bm25() weight. On databases other than SQLite, or SQLite built
+    without FTS5, the index is unavailable and callers fall back to LIKE.
+    """
+
+    def __init__(self, table, columns, source, source_filter=None, weights=None):
+        self.table = table
+        self.columns = tuple(columns)
+        self.source = source
+        self.source_filter = source_filter
+        self.weights = tuple(weights or (1.0,) * len(self.columns))
+        self._available_aliases = set()
+
+    @property
+    def create_sql(self):
+        return (
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+            f"{', '.join(self.columns)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+
+    @property
+    def drop_sql(self):
+        return f"DROP TABLE IF EXISTS {self.table}"
+
+    def insert_sql(self, condition=None):
+        conditions = [c for c in (self.source_filter, condition) if c]
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return f"INSERT INTO {self.table} (rowid, {', '.join(self.columns)}) {self.source}{where}"
+
+    def is_available(self, using=DEFAULT_DB_ALIAS):
+        if using in self._available_aliases:
+            return True
+        connection = connections[using]
+        if connection.vendor != "sqlite":
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.table])
+            found = cursor.fetchone() is not None
+        if found:
+            self._available_aliases.add(using)
+        return found
+
+    def create(self, connection):
+        """Create and populate the shadow table; returns False when FTS5 is missing."""
+        if connection.vendor != "sqlite":
+            return False
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(self.create_sql)
+            except OperationalError:
+                return False
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(self.insert_sql())
+        return True
+
+    def rebuild(self, using=DEFAULT_DB_ALIAS):
+        """Repopulate and optimize the index; returns its row count, or None when unavailable."""
+        connection = connections[using]
+        if not self.create(connection):
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {self.table}")
+            (count,) = cursor.fetchone()
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+        return count
+
+    def reindex(self, rowid_condition, source_condition, params, using=DEFAULT_DB_ALIAS):
+        """
+        Drop the index rows matching ``rowid_condition`` and re-read the
+        source rows matching ``source_condition``; both take ``params``.
+        """
+        if not self.is_available(using):
+            return
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE {rowid_condition}", params)
+            cursor.execute(self.insert_sql(source_condition), params)
+
+    def remove(self, rowids, using=DEFAULT_DB_ALIAS):
+        rowids = list(rowids)
+        if not rowids or not self.is_available(using):
+            return
+        placeholders = ", ".join(["%s"] * len(rowids))
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", rowids)
+
+    def matching(self, expression):
+        """An uncapped, unranked ``pk__in`` filter value for rows matching ``expression``."""
+        return RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [expression])
+
+    def ranked_ids(self, expression, limit, using=DEFAULT_DB_ALIAS, min_rowid=None, within=None):
+        """
+        Rowids matching the MATCH ``expression``, best bm25() rank first.
+        ``within`` is a queryset of the source model whose filters are applied
+        before the ``limit``, so a narrowed search still gets its best hits.
+        """
+        weights = ", ".join(str(weight) for weight in self.weights)
+        condition, params = "", [expression]
+        if min_rowid is not None:
+            condition += " AND rowid >= %s"
+            params.append(min_rowid)
+        if within is not None:
+            within_sql, within_params = within.values("pk").query.sql_with_params()
+            condition += f" AND rowid IN ({within_sql})"
+            params.extend(within_params)
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s{condition} "
+                f"ORDER BY bm25({self.table}, {weights}) LIMIT %s",
+                [*params, limit],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        return SearchHits(ids, complete=len(ids) < limit)
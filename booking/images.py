@@ -0,0 +1,124 @@
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.dispatch import Signal
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from . import jobs
+
+# name -> (width, height, crop). Non-cropped variants are fitted inside the
+# box and never upscaled.
+VARIANTS = {
+    "avatar": (96, 96, True),
+    "card": (640, 640, False),
+    "full": (1600, 1600, False),
+}
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+SRCSET_VARIANTS = ("card", "full")
+
+# Every uploaded image field that gets derivatives, as (model label, field).
+IMAGE_FIELDS = [
+    ("booking.Chef", "image"),
+    ("booking.BlogPost", "image"),
+    ("accounts.Profile", "profile_image"),
+    ("accounts.WorkImage", "image"),
+]
+IMAGE_JOB = "image_variants"
+
+# Sent with the original's ``name`` once its variants exist, so cached HTML
+# that fell back to the original URL can be refreshed.
+variants_generated = Signal()
+
+
+def variant_name(name, variant, fmt="webp"):
+    """``chef_dishes/paneer.png`` -> ``chef_dishes/paneer__card.webp``."""
+    root, _ = posixpath.splitext(name)
+    return f"{root}__{variant}.{fmt}"
+
+
+def _render(image, variant, fmt):
+    width, height, crop = VARIANTS[variant]
+    if crop:
+        image = ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    else:
+        image = image.copy()
+        image.thumbnail((width, height), Image.Resampling.LANCZOS)
+
+    pil_format, options = FORMATS[fmt]
+    if pil_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def generate_variants(name, storage=None, force=False):
+    """
+    Write every variant of the stored image ``name`` next to the original.
+    Returns the number of files written, or None when the original cannot be
+    read as an image.
+    """
+    storage = storage or default_storage
+    if not force and has_variants(name, storage):
+        return 0
+    try:
+        with storage.open(name, "rb") as source:
+            image = Image.open(source)
+            image.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError):
+        return None
+
+    image = ImageOps.exif_transpose(image)
+    written = 0
+    for variant in VARIANTS:
+        for fmt in FORMATS:
+            target = variant_name(name, variant, fmt)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(_render(image, variant, fmt)))
+            written += 1
+    return written
+
+
+def has_variants(name, storage=None):
+    return (storage or default_storage).exists(variant_name(name, "full"))
+
+
+def enqueue_variants(name):
+    """Queue variant generation for ``name``; ``run_worker`` picks it up once committed."""
+    return jobs.enqueue(IMAGE_JOB, {"name": name})
+
+
+@jobs.handler(IMAGE_JOB)
+def _run_variants_job(name):
+    if generate_variants(name):
+        variants_generated.send(sender=None, name=name)
+
+
+def variant_url(fieldfile, variant, fmt="webp"):
+    """URL of a variant, or of the original while the variant does not exist yet."""
+    if not fieldfile:
+        return ""
+    target = variant_name(fieldfile.name, variant, fmt)
+    if fieldfile.storage.exists(target):
+        return fieldfile.storage.url(target)
+    return fieldfile.url
+
+
+def srcset(fieldfile, fmt="webp", variants=SRCSET_VARIANTS):
+    if not fieldfile:
+        return ""
+    storage = fieldfile.storage
+    entries = []
+    for variant in variants:
+        target = variant_name(fieldfile.name, variant, fmt)
+        if storage.exists(target):
+            entries.append(f"{storage.url(target)} {VARIANTS[variant][0]}w")
+    return ", ".join(entries)
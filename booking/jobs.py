@@ -0,0 +1,119 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+# A job still marked running after this long is assumed to belong to a dead
+# worker and becomes claimable again.
+LOCK_TIMEOUT = timedelta(minutes=10)
+RETRY_BASE_DELAY = timedelta(seconds=30)
+
+
+def handler(kind):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def enqueue(kind, payload=None, run_after=None, max_attempts=5):
+    # Inserted in the caller's transaction, so workers only see the job once
+    # the change that produced it has been committed.
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        run_after=run_after or timezone.now(),
+        max_attempts=max_attempts,
+    )
+
+
+def _stale(now):
+    return Q(status=Job.STATUS_RUNNING, locked_at__lt=now - LOCK_TIMEOUT)
+
+
+def _claimable(now):
+    return Q(status=Job.STATUS_PENDING, run_after__lte=now) | (_stale(now) & Q(attempts__lt=F("max_attempts")))
+
+
+def _dead_letter_stale(now):
+    # A job whose worker keeps dying on it (OOM on a huge image, SIGKILL)
+    # never reaches run_job's failure path; once its attempts are used up it
+    # is dead-lettered here instead of being re-claimed forever.
+    buried = Job.objects.filter(_stale(now), attempts__gte=F("max_attempts")).update(
+        status=Job.STATUS_DEAD, locked_at=None, last_error="Worker lost while running the job."
+    )
+    if buried:
+        logger.error("%s job(s) moved to dead-letter state after their worker was lost.", buried)
+
+
+def claim_next(now=None):
+    """
+    Atomically take one due job. SQLite has no SELECT ... FOR UPDATE SKIP
+    LOCKED, so candidates are claimed with a conditional UPDATE and a worker
+    that loses the race simply tries the next one.
+    """
+    now = now or timezone.now()
+    _dead_letter_stale(now)
+    candidates = (
+        Job.objects.filter(_claimable(now)).order_by("run_after", "pk").values_list("pk", flat=True)[:10]
+    )
+    for pk in candidates:
+        claimed = Job.objects.filter(_claimable(now), pk=pk).update(
+            status=Job.STATUS_RUNNING, locked_at=now, attempts=F("attempts") + 1
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run_job(job):
+    """Run a claimed job; returns True on success. Successful jobs are deleted."""
+    try:
+        func = HANDLERS.get(job.kind)
+        if func is None:
+            raise LookupError(f"No handler registered for job kind {job.kind!r}.")
+        # Not wrapped in atomic(): with IMMEDIATE transactions that would hold
+        # SQLite's write lock for the whole handler, image resizing included.
+        # Handlers that write open their own short transaction.
+        func(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = Job.STATUS_DEAD
+            logger.error("Job %s moved to dead-letter state after %s attempts.", job, job.attempts)
+        else:
+            job.status = Job.STATUS_PENDING
+            job.run_after = timezone.now() + RETRY_BASE_DELAY * (2 ** (job.attempts - 1))
+            logger.warning("Job %s failed, retrying at %s.", job, job.run_after)
+        job.save(update_fields=["status", "run_after", "locked_at", "last_error"])
+        return False
+    job.delete()
+    return True
+
+
+def run_pending(limit=None):
+    """Run due jobs in the current thread until none are left; returns the count."""
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def retry_dead(kind=None):
+    jobs = Job.objects.filter(status=Job.STATUS_DEAD)
+    if kind:
+        jobs = jobs.filter(kind=kind)
+    return jobs.update(status=Job.STATUS_PENDING, attempts=0, run_after=timezone.now(), locked_at=None)
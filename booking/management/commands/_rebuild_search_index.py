@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+
+class RebuildSearchIndexCommand(BaseCommand):
+    """Base for the rebuild_*_search_index commands; set ``index`` and ``noun``."""
+
+    index = None
+    noun = "row(s)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default="default",
+            help="Database alias whose search index should be rebuilt.",
+        )
+
+    def handle(self, *args, **options):
+        count = self.index.rebuild(using=options["database"])
+        if count is None:
+            self.stdout.write(self.style.WARNING("Full-text search is not available on this database."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} {self.noun}."))
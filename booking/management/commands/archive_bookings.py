@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from booking.archive import archive_bookings
+from booking.models import Booking
+
+
+class Command(BaseCommand):
+    help = "Move soft-deleted bookings older than the archive threshold into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=getattr(settings, "BOOKING_ARCHIVE_AFTER_DAYS", 30),
+            help="Archive bookings soft-deleted at least this many days ago.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of bookings moved per transaction.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report how many bookings would be archived without moving them.",
+        )
+
+    def handle(self, *args, **options):
+        deleted_before = timezone.now() - timedelta(days=max(0, options["older_than_days"]))
+        if options["dry_run"]:
+            count = Booking.all_objects.filter(is_deleted=True, deleted_at__lt=deleted_before).count()
+            self.stdout.write(self.style.WARNING(f"Dry run: {count} booking(s) eligible for archiving."))
+            return
+
+        total = 0
+        for moved in archive_bookings(deleted_before, batch_size=max(1, options["batch_size"])):
+            total += moved
+            self.stdout.write(f"Archived {moved} booking(s), {total} total.")
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} booking(s)."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.benchmarks import SCENARIOS, scratch_database
+
+
+class Command(BaseCommand):
+    help = "Run a performance benchmark against a scratch database seeded with synthetic data."
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenario", help=f"One of: {', '.join(sorted(SCENARIOS))}.")
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            help="Dataset sizes to seed, in increasing order.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            help="Number of timed repetitions per measurement (median is reported).",
+        )
+
+    def handle(self, *args, **options):
+        func = SCENARIOS.get(options["scenario"])
+        if func is None:
+            raise CommandError(f"Unknown scenario {options['scenario']!r}. Choose from: {', '.join(sorted(SCENARIOS))}.")
+
+        kwargs = {}
+        if options["sizes"]:
+            kwargs["sizes"] = sorted(options["sizes"])
+        if options["repeat"]:
+            kwargs["repeat"] = max(1, options["repeat"])
+
+        with scratch_database(file_backed=func.file_backed):
+            func(self.stdout, **kwargs)
@@ -1,15 +1,19 @@
-from datetime import timedelta
+import time
+from datetime import datetime, timedelta
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.db.models import Q
 from django.utils import timezone
 
-from booking.models import Booking
+from booking import audit
+from booking.models import Booking, MaintenanceCheckpoint
+from booking.signals import bookings_archived
+
+CHECKPOINT_NAME = "cleanup_past_bookings"
 
 
 class Command(BaseCommand):
-    help = "Soft-delete past bookings older than retention policy."
+    help = "Soft-delete past bookings older than retention policy, in resumable batches."
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -23,27 +27,94 @@ class Command(BaseCommand):
             action="store_true",
             help="List eligible bookings without applying cleanup.",
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "BOOKING_CLEANUP_BATCH_SIZE", 500),
+            help="Number of bookings updated per transaction.",
+        )
+        parser.add_argument(
+            "--max-runtime",
+            type=float,
+            default=None,
+            help="Stop after this many seconds; the next run resumes from the checkpoint.",
+        )
+        parser.add_argument(
+            "--sleep-between-batches",
+            type=float,
+            default=0.0,
+            help="Seconds to pause between batches so other writers can take the database lock.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore any saved checkpoint and start a fresh pass.",
+        )
 
     def handle(self, *args, **options):
         enabled = getattr(settings, "BOOKING_CLEANUP_ENABLED", getattr(settings, "CLEANUP_ENABLED", True))
         retention_days = max(0, options["retention_days"])
+        batch_size = max(1, options["batch_size"])
 
         if not enabled:
             self.stdout.write(self.style.WARNING("Booking cleanup is disabled by configuration."))
             return
 
         cutoff = timezone.now() - timedelta(days=retention_days)
-        cutoff_date = cutoff.date()
-        cutoff_time = cutoff.time().replace(microsecond=0)
-
-        eligible_q = Q(date__lt=cutoff_date) | Q(date=cutoff_date, time__lt=cutoff_time)
-        queryset = Booking.all_objects.filter(is_deleted=False).filter(eligible_q)
-
-        count = queryset.count()
         if options["dry_run"]:
+            count = Booking.all_objects.filter(is_deleted=False).past(cutoff).count()
             self.stdout.write(self.style.WARNING(f"Dry run: {count} booking(s) eligible for cleanup."))
             return
 
-        now = timezone.now()
-        updated = queryset.update(is_deleted=True, deleted_at=now, deleted_by_id=None)
-        self.stdout.write(self.style.SUCCESS(f"Soft-deleted {updated} booking(s)."))
+        checkpoints = MaintenanceCheckpoint.objects.filter(name=CHECKPOINT_NAME)
+        if options["restart"]:
+            checkpoints.delete()
+        checkpoint = checkpoints.first()
+        last_id = checkpoint.state.get("last_id", 0) if checkpoint else 0
+        if last_id:
+            # Keep the original cutoff so a resumed pass selects the same rows.
+            cutoff = datetime.fromisoformat(checkpoint.state["cutoff"])
+            self.stdout.write(f"Resuming after booking #{last_id} (cutoff {cutoff.isoformat()}).")
+
+        started = time.monotonic()
+        total = 0
+        batches = 0
+        while True:
+            ids = list(
+                Booking.all_objects.filter(is_deleted=False, pk__gt=last_id)
+                .past(cutoff)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                checkpoints.delete()
+                break
+
+            with audit.batch():
+                updated = Booking.all_objects.filter(pk__in=ids, is_deleted=False).update(
+                    is_deleted=True, deleted_at=timezone.now(), deleted_by_id=None
+                )
+                audit.record_deleted(ids, audit.SOURCE_CLEANUP)
+                bookings_archived.send(sender=Booking, count=updated)
+                last_id = ids[-1]
+                MaintenanceCheckpoint.objects.update_or_create(
+                    name=CHECKPOINT_NAME,
+                    defaults={"state": {"last_id": last_id, "cutoff": cutoff.isoformat()}},
+                )
+
+            total += updated
+            batches += 1
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"Batch {batches}: {updated} booking(s), {total} total, {total / elapsed if elapsed else 0:.0f} rows/s"
+            )
+
+            if options["max_runtime"] is not None and elapsed >= options["max_runtime"]:
+                self.stdout.write(
+                    self.style.WARNING(f"Stopped after {elapsed:.1f}s; run again to resume after booking #{last_id}.")
+                )
+                break
+            if options["sleep_between_batches"]:
+                time.sleep(options["sleep_between_batches"])
+
+        self.stdout.write(self.style.SUCCESS(f"Soft-deleted {total} booking(s)."))
@@ -0,0 +1,57 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from booking import images
+
+
+def _process(name, force):
+    return name, images.generate_variants(name, force=force)
+
+
+class Command(BaseCommand):
+    help = "Generate resized WebP/JPEG variants for every stored upload, in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of worker processes.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate variants that already exist.",
+        )
+
+    def handle(self, *args, **options):
+        names = set()
+        for label, field_name in images.IMAGE_FIELDS:
+            model = apps.get_model(label)
+            names.update(
+                model._default_manager.exclude(**{field_name: ""})
+                .exclude(**{f"{field_name}__isnull": True})
+                .values_list(field_name, flat=True)
+            )
+
+        generated = skipped = failed = 0
+        workers = max(1, options["workers"])
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            for name, written in pool.map(_process, sorted(names), [options["force"]] * len(names)):
+                if written is None:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f"Could not read {name}"))
+                elif written:
+                    generated += 1
+                else:
+                    skipped += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {len(names)} image(s): {generated} generated, {skipped} up to date, {failed} unreadable."
+            )
+        )
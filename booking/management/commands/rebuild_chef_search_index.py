@@ -0,0 +1,9 @@
+from booking import search
+
+from ._rebuild_search_index import RebuildSearchIndexCommand
+
+
+class Command(RebuildSearchIndexCommand):
+    help = "Rebuild the full-text chef search index from Chef and Profile rows."
+    index = search.chef_index
+    noun = "chef(s)"
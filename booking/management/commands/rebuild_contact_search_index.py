@@ -0,0 +1,9 @@
+from booking import contact_search
+
+from ._rebuild_search_index import RebuildSearchIndexCommand
+
+
+class Command(RebuildSearchIndexCommand):
+    help = "Rebuild the full-text contact query search index from active ContactQuery rows."
+    index = contact_search.contact_index
+    noun = "contact query(s)"
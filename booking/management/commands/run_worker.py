@@ -0,0 +1,74 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from booking import jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued background jobs (image variants) from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=2,
+            help="Number of worker threads.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait before polling again when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no due jobs are left instead of polling forever.",
+        )
+        parser.add_argument(
+            "--retry-dead",
+            action="store_true",
+            help="Move dead-lettered jobs back to pending before starting.",
+        )
+
+    def handle(self, *args, **options):
+        if options["retry_dead"]:
+            self.stdout.write(f"Requeued {jobs.retry_dead()} dead job(s).")
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        totals = {"done": 0, "failed": 0}
+
+        def work():
+            try:
+                while not stop.is_set():
+                    close_old_connections()
+                    job = jobs.claim_next()
+                    if job is None:
+                        if options["once"]:
+                            return
+                        stop.wait(options["poll_interval"])
+                        continue
+                    ok = jobs.run_job(job)
+                    with lock:
+                        totals["done" if ok else "failed"] += 1
+                    if not ok:
+                        self.stdout.write(self.style.WARNING(f"Job {job} failed (attempt {job.attempts})."))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, daemon=True) for _ in range(max(1, options["threads"]))]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(0.2)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {totals['done']} job(s), {totals['failed']} failed."))
@@ -0,0 +1,67 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from booking import outbox
+
+
+class Command(BaseCommand):
+    help = "Send queued notification emails from the outbox over one reused connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of messages claimed per batch.",
+        )
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="Keep polling for new messages instead of exiting when the outbox is empty.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds between polls in --watch mode.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        sent = failed = 0
+        connection = get_connection()
+        try:
+            while True:
+                messages = outbox.claim_batch(batch_size)
+                if not messages:
+                    if not options["watch"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+                # Opening is a no-op once the connection is up, so every batch
+                # reuses the same SMTP session.
+                try:
+                    connection.open()
+                except Exception as exc:
+                    for message in messages:
+                        outbox.mark_failed(message, f"{type(exc).__name__}: {exc}")
+                    failed += len(messages)
+                    self.stdout.write(self.style.WARNING(f"Could not connect to the mail server: {exc}"))
+                    if not options["watch"]:
+                        break
+                    # A mail server outage should not end a long-running drainer;
+                    # the failed batch is retried on its backoff schedule.
+                    time.sleep(options["poll_interval"])
+                    continue
+                batch_sent, batch_failed = outbox.send_batch(messages, connection)
+                sent += batch_sent
+                failed += batch_failed
+                self.stdout.write(f"Batch: {batch_sent} sent, {batch_failed} failed.")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} message(s), {failed} failed."))
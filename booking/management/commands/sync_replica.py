@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from booking import routers
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database over a SQLite replica, once or on an interval."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default="replica",
+            help="Alias of the replica database to overwrite.",
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=0,
+            help="Keep syncing every this many seconds, which emulates replication lag.",
+        )
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        if alias == DEFAULT_DB_ALIAS or alias not in settings.DATABASES:
+            raise CommandError(f"{alias!r} is not a replica alias in settings.DATABASES.")
+        if connections[DEFAULT_DB_ALIAS].vendor != "sqlite" or connections[alias].vendor != "sqlite":
+            raise CommandError("Only SQLite databases can be synced this way.")
+
+        try:
+            while True:
+                start = time.perf_counter()
+                routers.sync_replica(target=alias)
+                self.stdout.write(f"Synced {alias} in {(time.perf_counter() - start) * 1000:.0f} ms.")
+                if not options["every"]:
+                    break
+                time.sleep(options["every"])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,111 @@
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import routers
+from .query_budget import QueryLog
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+STICKY_COOKIE = "primary_until"
+SLOW_SQL_HEADER_LENGTH = 200
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serve safe requests from the replica. A request that writes, and every
+    request from the same browser for REPLICA_STICKY_SECONDS after it, reads
+    from the primary instead, so users always see their own changes even
+    while the replica lags behind.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if routers.replica_alias() is None:
+            return self.get_response(request)
+
+        use_replica = request.method in SAFE_METHODS and not self.is_sticky(request)
+        with routers.reads_from_replica(use_replica) as state:
+            response = self.get_response(request)
+        if state.wrote or request.method not in SAFE_METHODS:
+            seconds = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                STICKY_COOKIE, f"{time.time() + seconds:.3f}", max_age=seconds, httponly=True, samesite="Lax"
+            )
+        return response
+
+    @staticmethod
+    def is_sticky(request):
+        # The expiry is checked here too: not every client honours max_age.
+        try:
+            return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+
+class QueryMetricsMiddleware:
+    """
+    Development aid: report each request's query count, total database time
+    and slowest statement as X-DB-* response headers and a log line, which
+    warns once a request passes QUERY_METRICS_WARN_COUNT queries. A streamed
+    body runs its queries after the headers are sent, so its headers carry
+    ``X-DB-Partial`` and the log line waits until the stream is closed.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        log = QueryLog()
+        with log:
+            response = self.get_response(request)
+        self.add_headers(response, log)
+        if response.streaming:
+            response["X-DB-Partial"] = "streamed"
+            response.streaming_content = self.log_stream(request, response.streaming_content, log)
+        else:
+            self.report(request, log)
+        return response
+
+    def log_stream(self, request, content, log):
+        try:
+            with log:
+                yield from content
+        finally:
+            self.report(request, log)
+
+    @staticmethod
+    def slowest(log):
+        slowest_sql, slowest_ms = log.slowest or ("", 0.0)
+        return _WHITESPACE_RE.sub(" ", slowest_sql).strip(), slowest_ms
+
+    def add_headers(self, response, log):
+        response["X-DB-Query-Count"] = str(log.count)
+        response["X-DB-Time-Ms"] = f"{log.total_ms:.1f}"
+        slowest_sql, slowest_ms = self.slowest(log)
+        if slowest_sql:
+            response["X-DB-Slowest-Ms"] = f"{slowest_ms:.1f}"
+            response["X-DB-Slowest-SQL"] = slowest_sql[:SLOW_SQL_HEADER_LENGTH]
+
+    def report(self, request, log):
+        slowest_sql, slowest_ms = self.slowest(log)
+        level = logging.WARNING if log.count > settings.QUERY_METRICS_WARN_COUNT else logging.INFO
+        logger.log(
+            level,
+            "%s %s: %d queries in %.1f ms, slowest %.1f ms: %s",
+            request.method,
+            request.path,
+            log.count,
+            log.total_ms,
+            slowest_ms,
+            slowest_sql,
+        )
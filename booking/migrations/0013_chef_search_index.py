@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:51
+
+from django.db import OperationalError, migrations
+
+# Frozen copy of the index definition at this point in history; later
+# changes to booking.search must not change what this migration does.
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS booking_chef_fts USING fts5("
+    "name, specialty, speciality, dishes, location, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+INSERT_SQL = (
+    "INSERT INTO booking_chef_fts (rowid, name, specialty, speciality, dishes, location) "
+    "SELECT c.id, c.name, c.specialty, "
+    "COALESCE(p.speciality, ''), COALESCE(p.dishes, ''), COALESCE(p.location, '') "
+    "FROM booking_chef c LEFT JOIN accounts_profile p ON p.user_id = c.user_id"
+)
+DROP_SQL = "DROP TABLE IF EXISTS booking_chef_fts"
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(CREATE_SQL)
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to LIKE.
+            return
+        cursor.execute("DELETE FROM booking_chef_fts")
+        cursor.execute(INSERT_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_remove_profile_work_images_profile_dishes_workimage'),
+        ('booking', '0012_contactquery'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
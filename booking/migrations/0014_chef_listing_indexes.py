@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0013_chef_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chef',
+            index=models.Index(fields=['price_per_person', 'id'], name='booking_che_price_p_e124c5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chef',
+            index=models.Index(fields=['experience', 'id'], name='booking_che_experie_e305fa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chef',
+            index=models.Index(fields=['team_members'], name='booking_che_team_me_01a804_idx'),
+        ),
+    ]
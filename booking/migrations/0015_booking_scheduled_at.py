@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:56
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_scheduled_at(apps, schema_editor):
+    Booking = apps.get_model("booking", "Booking")
+    db_alias = schema_editor.connection.alias
+    pending = Booking.objects.using(db_alias).filter(scheduled_at__isnull=True).only("id", "date", "time")
+    batch = []
+    for booking in pending.iterator(chunk_size=2000):
+        booking.scheduled_at = datetime.combine(booking.date, booking.time).replace(tzinfo=dt_timezone.utc)
+        batch.append(booking)
+        if len(batch) >= 2000:
+            Booking.objects.using(db_alias).bulk_update(batch, ["scheduled_at"])
+            batch = []
+    if batch:
+        Booking.objects.using(db_alias).bulk_update(batch, ["scheduled_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0014_chef_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_boo_date_f02e27_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_boo_is_dele_21c9c4_idx',
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='scheduled_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_scheduled_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booking',
+            name='scheduled_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['scheduled_at'], name='booking_active_sched_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['customer', 'scheduled_at'], name='booking_active_customer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['chef', 'scheduled_at'], name='booking_active_chef_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:11
+
+from datetime import timedelta
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_ends_at(apps, schema_editor):
+    # Every chef starts on the default 180 minute slot.
+    Booking = apps.get_model("booking", "Booking")
+    Booking.objects.using(schema_editor.connection.alias).filter(ends_at__isnull=True).update(
+        ends_at=F("scheduled_at") + timedelta(minutes=180)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0018_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='ends_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='chef',
+            name='schedule_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='chef',
+            name='slot_minutes',
+            field=models.PositiveIntegerField(default=180, help_text="How long one booking blocks the chef's calendar.", validators=[django.core.validators.MinValueValidator(30), django.core.validators.MaxValueValidator(720)]),
+        ),
+        migrations.RunPython(backfill_ends_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booking',
+            name='ends_at',
+            field=models.DateTimeField(editable=False),
+        ),
+    ]
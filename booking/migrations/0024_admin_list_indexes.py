@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0023_outboxmessage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bookingarchive',
+            name='booking_boo_schedul_60b333_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['scheduled_at'], name='booking_deleted_sched_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingarchive',
+            index=models.Index(fields=['scheduled_at', 'id'], name='booking_boo_schedul_8803af_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactquery',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['created_at'], name='contact_active_created_idx'),
+        ),
+    ]
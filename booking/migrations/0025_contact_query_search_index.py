@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:45
+
+from django.db import OperationalError, migrations
+
+# Frozen copy of the index definition at this point in history; later
+# changes to booking.contact_search must not change what this migration does.
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS booking_contactquery_fts USING fts5("
+    "name, email, phone_number, city, message, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+INSERT_SQL = (
+    "INSERT INTO booking_contactquery_fts (rowid, name, email, phone_number, city, message) "
+    "SELECT id, name, email, phone_number, city, message FROM booking_contactquery WHERE NOT is_deleted"
+)
+DROP_SQL = "DROP TABLE IF EXISTS booking_contactquery_fts"
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(CREATE_SQL)
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to LIKE.
+            return
+        cursor.execute("DELETE FROM booking_contactquery_fts")
+        cursor.execute(INSERT_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0024_admin_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
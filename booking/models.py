@@ -1,11 +1,14 @@
-from datetime import datetime, timezone as dt_timezone
+from datetime import datetime, timedelta, timezone as dt_timezone
 
 from django.conf import settings
-from django.core.validators import MinValueValidator
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.utils import timezone
 
 
+MAX_SLOT_MINUTES = 12 * 60
+
+
 class Chef(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
@@ -18,11 +21,30 @@ class Chef(models.Model):
     )
     price_per_person = models.DecimalField(max_digits=8, decimal_places=2)
     image = models.ImageField(upload_to='chef_dishes/', blank=True, null=True)
+    slot_minutes = models.PositiveIntegerField(
+        default=180,
+        validators=[MinValueValidator(30), MaxValueValidator(MAX_SLOT_MINUTES)],
+        help_text="How long one booking blocks the chef's calendar.",
+    )
+    # Bumped whenever a booking is inserted for this chef. The UPDATE doubles
+    # as a per-chef write lock that serialises concurrent booking attempts.
+    schedule_version = models.PositiveIntegerField(default=0, editable=False)
 
 
     def __str__(self):
         return self.name
 
+    @property
+    def slot_duration(self):
+        return timedelta(minutes=self.slot_minutes)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["price_per_person", "id"]),
+            models.Index(fields=["experience", "id"]),
+            models.Index(fields=["team_members"]),
+        ]
+
 
 class BookingQuerySet(models.QuerySet):
     def active(self):
@@ -31,10 +53,16 @@ class BookingQuerySet(models.QuerySet):
     def archived(self):
         return self.filter(is_deleted=True)
 
+    def past(self, now=None):
+        return self.filter(scheduled_at__lt=now or timezone.now())
+
+    def upcoming(self, now=None):
+        return self.filter(scheduled_at__gte=now or timezone.now())
+
 
-class ActiveBookingManager(models.Manager):
+class ActiveBookingManager(models.Manager.from_queryset(BookingQuerySet)):
     def get_queryset(self):
-        return BookingQuerySet(self.model, using=self._db).active()
+        return super().get_queryset().active()
 
 
 class Booking(models.Model):
@@ -47,6 +75,11 @@ class Booking(models.Model):
     chef = models.ForeignKey('Chef', on_delete=models.CASCADE)
     date = models.DateField()
     time = models.TimeField()
+    # Denormalised date + time (UTC) so past/upcoming checks are a single
+    # indexed range comparison. Maintained by save().
+    scheduled_at = models.DateTimeField(editable=False)
+    # End of the slot the booking occupies; defaults to the chef's slot length.
+    ends_at = models.DateTimeField(editable=False)
     person = models.PositiveIntegerField()
     total_price = models.DecimalField(max_digits=8, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending', db_index=True)
@@ -59,6 +92,11 @@ class Booking(models.Model):
         blank=True,
         related_name="deleted_bookings",
     )
+    # Token rendered into the booking form; a replayed POST with the same key
+    # returns the original booking instead of inserting a duplicate.
+    idempotency_key = models.UUIDField(blank=True, null=True, unique=True, editable=False)
+    # Incremented by every status transition; see booking.transitions.
+    version = models.PositiveIntegerField(default=0, editable=False)
 
     objects = ActiveBookingManager()
     all_objects = BookingQuerySet.as_manager()
@@ -66,9 +104,25 @@ class Booking(models.Model):
     def __str__(self):
         return f"{self.customer.username} booked {self.chef.name}"
 
-    @property
-    def scheduled_at(self):
-        return datetime.combine(self.date, self.time).replace(tzinfo=dt_timezone.utc)
+    @staticmethod
+    def combine_schedule(date, time):
+        return datetime.combine(date, time).replace(tzinfo=dt_timezone.utc)
+
+    def save(self, *args, **kwargs):
+        # Views pass raw POST strings for date/time, so normalise them first.
+        self.date = self._meta.get_field("date").to_python(self.date)
+        self.time = self._meta.get_field("time").to_python(self.time)
+        scheduled_at = self.combine_schedule(self.date, self.time)
+        if self.ends_at is None:
+            self.ends_at = scheduled_at + self.chef.slot_duration
+        elif self.scheduled_at is not None:
+            # Rescheduling keeps the slot length.
+            self.ends_at += scheduled_at - self.scheduled_at
+        self.scheduled_at = scheduled_at
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"date", "time"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "scheduled_at", "ends_at"}
+        super().save(*args, **kwargs)
 
     @property
     def is_past(self):
@@ -82,9 +136,88 @@ class Booking(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=["date"]),
             models.Index(fields=["status", "date"]),
-            models.Index(fields=["is_deleted", "date"]),
+            # Partial indexes: Django renders is_deleted=False as
+            # "NOT is_deleted", which SQLite can match against an index
+            # condition but never use as a key column.
+            models.Index(
+                fields=["scheduled_at"],
+                condition=models.Q(is_deleted=False),
+                name="booking_active_sched_idx",
+            ),
+            models.Index(
+                fields=["customer", "scheduled_at"],
+                condition=models.Q(is_deleted=False),
+                name="booking_active_customer_idx",
+            ),
+            models.Index(
+                fields=["chef", "scheduled_at"],
+                condition=models.Q(is_deleted=False),
+                name="booking_active_chef_idx",
+            ),
+            # Soft-deleted rows waiting to be archived, for the admin
+            # "archived" scope.
+            models.Index(
+                fields=["scheduled_at"],
+                condition=models.Q(is_deleted=True),
+                name="booking_deleted_sched_idx",
+            ),
+        ]
+
+
+class BookingArchive(models.Model):
+    # Keeps the original Booking primary key so admin URLs stay valid after
+    # a soft-deleted booking is moved out of the hot table.
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    chef = models.ForeignKey('Chef', on_delete=models.CASCADE, related_name="+")
+    date = models.DateField()
+    time = models.TimeField()
+    scheduled_at = models.DateTimeField()
+    person = models.PositiveIntegerField()
+    total_price = models.DecimalField(max_digits=8, decimal_places=2)
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    deleted_at = models.DateTimeField(blank=True, null=True)
+    deleted_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    # Lets templates treat archived rows like soft-deleted bookings.
+    is_deleted = True
+
+    def __str__(self):
+        return f"Archived booking #{self.pk}"
+
+    @property
+    def is_past(self):
+        return self.scheduled_at < timezone.now()
+
+    @classmethod
+    def from_booking(cls, booking):
+        return cls(
+            id=booking.pk,
+            customer_id=booking.customer_id,
+            chef_id=booking.chef_id,
+            date=booking.date,
+            time=booking.time,
+            scheduled_at=booking.scheduled_at,
+            person=booking.person,
+            total_price=booking.total_price,
+            status=booking.status,
+            deleted_at=booking.deleted_at,
+            deleted_by_id=booking.deleted_by_id,
+        )
+
+    class Meta:
+        indexes = [
+            # id is not a rowid alias here, so it has to be in the index for
+            # (scheduled_at, id) keyset pages to avoid a sort.
+            models.Index(fields=["scheduled_at", "id"]),
         ]
 
 
@@ -117,3 +250,117 @@ class ContactQuery(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(is_deleted=False),
+                name="contact_active_created_idx",
+            ),
+        ]
+
+
+class BookingEvent(models.Model):
+    KIND_CREATED = "created"
+    KIND_STATUS = "status"
+    KIND_DELETED = "deleted"
+    KIND_CHOICES = [
+        (KIND_CREATED, "Created"),
+        (KIND_STATUS, "Status changed"),
+        (KIND_DELETED, "Deleted"),
+    ]
+
+    # A plain id rather than a foreign key: the history must outlive the
+    # booking row when it is archived or permanently deleted.
+    booking_id = models.BigIntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    from_status = models.CharField(max_length=20, blank=True)
+    to_status = models.CharField(max_length=20, blank=True)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    source = models.CharField(max_length=20)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Booking #{self.booking_id} {self.kind} by {self.source}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["booking_id", "created_at"]),
+        ]
+
+
+class MaintenanceCheckpoint(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    state = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Job(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DEAD = "dead"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DEAD, "Dead"),
+    ]
+
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+        ]
+
+
+class OutboxMessage(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_DEAD = "dead"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENDING, "Sending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_DEAD, "Dead"),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim = models.UUIDField(blank=True, null=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.subject} ({self.status})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
@@ -0,0 +1,149 @@
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# A batch still marked sending after this long belongs to a dead worker.
+LOCK_TIMEOUT = timedelta(minutes=10)
+RETRY_BASE_DELAY = timedelta(minutes=1)
+STATUS_EMAILS = {"Accepted", "Rejected"}
+
+
+def _message(subject, template_name, context, recipients):
+    recipients = [address for address in recipients if address]
+    if not recipients:
+        return None
+    return OutboxMessage(subject=subject, body=render_to_string(template_name, context), recipients=recipients)
+
+
+def enqueue(subject, template_name, context, recipients):
+    """
+    Queue an email. Call it inside the transaction that makes the change so
+    the message exists exactly when the change does; send_outbox delivers it.
+    """
+    message = _message(subject, template_name, context, recipients)
+    if message is not None:
+        message.save()
+    return message
+
+
+def booking_requested(booking):
+    return enqueue(
+        f"New booking request from {booking.customer.username}",
+        "booking/emails/booking_requested.txt",
+        {"booking": booking},
+        [booking.chef.user.email],
+    )
+
+
+def _status_message(booking):
+    if booking.status not in STATUS_EMAILS:
+        return None
+    return _message(
+        f"Your booking with {booking.chef.name} was {booking.status.lower()}",
+        "booking/emails/booking_status.txt",
+        {"booking": booking},
+        [booking.customer.email],
+    )
+
+
+def booking_status_changed(booking):
+    message = _status_message(booking)
+    if message is not None:
+        message.save()
+    return message
+
+
+def bookings_status_changed(bookings):
+    """Queue status emails for many bookings with one INSERT."""
+    messages = [message for message in map(_status_message, bookings) if message is not None]
+    return OutboxMessage.objects.bulk_create(messages)
+
+
+def contact_query_received(query):
+    return enqueue(
+        f"New contact query from {query.name}",
+        "booking/emails/contact_query.txt",
+        {"query": query},
+        getattr(settings, "CONTACT_NOTIFICATION_EMAILS", []),
+    )
+
+
+def _stale(now):
+    return Q(status=OutboxMessage.STATUS_SENDING, locked_at__lt=now - LOCK_TIMEOUT)
+
+
+def _claimable(now):
+    return Q(status=OutboxMessage.STATUS_PENDING, next_attempt_at__lte=now) | (
+        _stale(now) & Q(attempts__lt=F("max_attempts"))
+    )
+
+
+def _dead_letter_stale(now):
+    # A message whose sender keeps dying mid-batch never reaches mark_failed;
+    # once its attempts are used up it is dead-lettered instead of re-claimed.
+    buried = OutboxMessage.objects.filter(_stale(now), attempts__gte=F("max_attempts")).update(
+        status=OutboxMessage.STATUS_DEAD, claim=None, locked_at=None, last_error="Sender lost while sending."
+    )
+    if buried:
+        logger.error("%s outbox message(s) dead after their sender was lost.", buried)
+
+
+def claim_batch(size, now=None):
+    """Mark up to ``size`` due messages as sending for this caller and return them."""
+    now = now or timezone.now()
+    _dead_letter_stale(now)
+    token = uuid.uuid4()
+    ids = list(
+        OutboxMessage.objects.filter(_claimable(now))
+        .order_by("next_attempt_at", "pk")
+        .values_list("pk", flat=True)[:size]
+    )
+    if not ids:
+        return []
+    OutboxMessage.objects.filter(_claimable(now), pk__in=ids).update(
+        status=OutboxMessage.STATUS_SENDING, claim=token, locked_at=now, attempts=F("attempts") + 1
+    )
+    return list(OutboxMessage.objects.filter(claim=token, status=OutboxMessage.STATUS_SENDING).order_by("pk"))
+
+
+def mark_failed(message, error):
+    message.last_error = error
+    message.claim = None
+    message.locked_at = None
+    if message.attempts >= message.max_attempts:
+        message.status = OutboxMessage.STATUS_DEAD
+        logger.error("Outbox message %s dead after %s attempts: %s", message.pk, message.attempts, error)
+    else:
+        message.status = OutboxMessage.STATUS_PENDING
+        message.next_attempt_at = timezone.now() + RETRY_BASE_DELAY * (2 ** (message.attempts - 1))
+        logger.warning("Outbox message %s failed, retrying at %s: %s", message.pk, message.next_attempt_at, error)
+    message.save(update_fields=["status", "next_attempt_at", "claim", "locked_at", "last_error"])
+
+
+def send_batch(messages, connection):
+    """Send claimed messages over an open ``connection``; returns (sent, failed)."""
+    sent_ids = []
+    failed = 0
+    for message in messages:
+        email = EmailMessage(message.subject, message.body, to=message.recipients, connection=connection)
+        try:
+            email.send()
+        except Exception as exc:
+            mark_failed(message, f"{type(exc).__name__}: {exc}")
+            failed += 1
+        else:
+            sent_ids.append(message.pk)
+    OutboxMessage.objects.filter(pk__in=sent_ids).update(
+        status=OutboxMessage.STATUS_SENT, sent_at=timezone.now(), claim=None, locked_at=None, last_error=""
+    )
+    return len(sent_ids), failed
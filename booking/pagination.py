@@ -0,0 +1,253 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+# Above this many rows an "estimate" count stops scanning and reports the cap.
+COUNT_LIMIT = 10_000
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds to milliseconds, which would make a cursor on
+    # a datetime column skip or repeat rows that differ only below that.
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(payload):
+    raw = json.dumps(payload, cls=CursorEncoder, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def limited_count(queryset, limit=COUNT_LIMIT):
+    """
+    ``(count, exact)``: the exact count while it is at most ``limit``,
+    otherwise ``(limit, False)``. The LIMIT stops SQLite scanning early, so
+    the cost is bounded however large the table grows.
+    """
+    count = queryset.order_by()[: limit + 1].count()
+    return (limit, False) if count > limit else (count, True)
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor if has_next else None
+        self.previous_cursor = previous_cursor if has_previous else None
+        self.total = None
+        self.total_is_exact = True
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    Page through ``queryset`` by seeking past the last row seen instead of
+    using OFFSET, so every page costs the same no matter how deep it is.
+
+    ``ordering`` lists non-null fields ("-field" for descending) and must end
+    with a unique column, normally the primary key, to keep the order total.
+
+    ``count`` attaches a total to each page: "exact" runs COUNT(*), "estimate"
+    uses limited_count() so large tables are never fully counted.
+    """
+
+    def __init__(self, queryset, ordering, per_page, count=None):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.count = count
+        self.fields = [self._resolve_field(name.lstrip("-")) for name in self.ordering]
+
+    def _resolve_field(self, path):
+        model = self.model
+        field = None
+        for part in path.split("__"):
+            if part == "pk":
+                field = model._meta.pk
+            else:
+                field = model._meta.get_field(part)
+            if field.is_relation:
+                model = field.related_model
+        if field is None:
+            raise FieldDoesNotExist(path)
+        return field
+
+    def _key(self, obj):
+        values = []
+        for name in self.ordering:
+            value = obj
+            for part in name.lstrip("-").split("__"):
+                value = getattr(value, part)
+            values.append(value)
+        return values
+
+    def _seek_q(self, values, forward):
+        # Row-value comparison (a, b) > (x, y) spelled out as nested ORs so it
+        # works with mixed sort directions on every backend.
+        condition = Q()
+        for index in reversed(range(len(self.ordering))):
+            name = self.ordering[index]
+            field = name.lstrip("-")
+            ascending = not name.startswith("-")
+            lookup = "gt" if ascending == forward else "lt"
+            step = Q(**{f"{field}__{lookup}": values[index]})
+            if index < len(self.ordering) - 1:
+                step |= Q(**{field: values[index]}) & condition
+            condition = step
+        # A leading inclusive bound on the first column lets the planner turn
+        # the seek into an index range scan.
+        first = self.ordering[0]
+        bound = "gte" if (not first.startswith("-")) == forward else "lte"
+        return Q(**{f"{first.lstrip('-')}__{bound}": values[0]}) & condition
+
+    def _decode_values(self, raw_values):
+        if not isinstance(raw_values, list) or len(raw_values) != len(self.fields):
+            return None
+        try:
+            return [field.to_python(value) for field, value in zip(self.fields, raw_values)]
+        except (ValidationError, TypeError, ValueError):
+            return None
+
+    def _fetch(self, condition, ordering, limit):
+        queryset = self.queryset
+        if condition is not None:
+            queryset = queryset.filter(condition)
+        return list(queryset.order_by(*ordering)[:limit])
+
+    def _total(self):
+        if self.count == "exact":
+            return self.queryset.count(), True
+        return limited_count(self.queryset)
+
+    def get_page(self, cursor=None):
+        page = self._page(cursor)
+        if self.count:
+            page.total, page.total_is_exact = self._total()
+        return page
+
+    def _page(self, cursor):
+        payload = decode_cursor(cursor) or {}
+        values = self._decode_values(payload.get("k"))
+        forward = payload.get("d") != "p"
+        if values is None:
+            forward = True
+
+        ordering = self.ordering
+        if not forward:
+            ordering = tuple(name[1:] if name.startswith("-") else f"-{name}" for name in ordering)
+
+        condition = self._seek_q(values, forward) if values is not None else None
+        rows = self._fetch(condition, ordering, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+
+        if forward:
+            has_next, has_previous = has_more, values is not None
+        else:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+
+        if not rows:
+            return KeysetPage(rows, False, False)
+        return KeysetPage(
+            rows,
+            has_next=has_next,
+            has_previous=has_previous,
+            next_cursor=encode_cursor({"k": self._key(rows[-1]), "d": "n"}),
+            previous_cursor=encode_cursor({"k": self._key(rows[0]), "d": "p"}),
+        )
+
+
+class UnionKeysetPaginator(KeysetPaginator):
+    """
+    KeysetPaginator over a UNION of ``values_list`` rows. A combined queryset
+    cannot be filtered, so ``build(condition)`` must return the union with
+    ``condition`` (a Q, or None) applied to every branch; the seek then still
+    runs as an index range scan on each side. ``columns`` names the tuple
+    positions and must include every ordering field.
+    """
+
+    def __init__(self, build, model, columns, ordering, per_page, count=None):
+        self.build = build
+        self.model = model
+        self.columns = tuple(columns)
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.count = count
+        self.fields = [self._resolve_field(name.lstrip("-")) for name in self.ordering]
+
+    def _key(self, row):
+        return [row[self.columns.index(name.lstrip("-"))] for name in self.ordering]
+
+    def _fetch(self, condition, ordering, limit):
+        return list(self.build(condition).order_by(*ordering)[:limit])
+
+    def _total(self):
+        union = self.build(None)
+        if self.count == "exact":
+            return union.count(), True
+        return limited_count(union)
+
+
+class RankedPaginator:
+    """Page through a bounded, pre-ranked list of primary keys (e.g. search hits)."""
+
+    def __init__(self, queryset, ranked_ids, per_page):
+        self.queryset = queryset
+        self.ranked_ids = ranked_ids
+        self.per_page = per_page
+
+    def get_page(self, cursor=None):
+        payload = decode_cursor(cursor) or {}
+        offset = payload.get("o")
+        if not isinstance(offset, int) or offset < 0:
+            offset = 0
+
+        allowed = set(self.queryset.filter(pk__in=self.ranked_ids).values_list("pk", flat=True))
+        ranked = [pk for pk in self.ranked_ids if pk in allowed]
+        page_ids = ranked[offset : offset + self.per_page]
+        objects = self.queryset.in_bulk(page_ids)
+        rows = [objects[pk] for pk in page_ids if pk in objects]
+
+        page = KeysetPage(
+            rows,
+            has_next=offset + self.per_page < len(ranked),
+            has_previous=offset > 0,
+            next_cursor=encode_cursor({"o": offset + self.per_page}),
+            previous_cursor=encode_cursor({"o": max(0, offset - self.per_page)}),
+        )
+        page.total = len(ranked)
+        # Search hits that hit a cap or window are a lower bound.
+        page.total_is_exact = getattr(self.ranked_ids, "complete", True)
+        return page
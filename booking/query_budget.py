@@ -0,0 +1,106 @@
+import time
+from contextlib import ExitStack
+from importlib import import_module
+
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.urls import URLPattern, reverse
+
+# Views from these packages get budgets; included third-party URLs do not.
+PROJECT_APPS = ("booking", "accounts", "custom_admin")
+
+
+class QueryLog:
+    """Record the SQL and duration of every query run in this thread while active."""
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - start) * 1000))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_ms(self):
+        return sum(ms for _, ms in self.queries)
+
+    @property
+    def slowest(self):
+        """``(sql, ms)`` of the slowest query, or None when nothing ran."""
+        return max(self.queries, key=lambda query: query[1], default=None)
+
+
+def url_names(urlconf):
+    """Names of the project views routed directly by ``urlconf``; includes are skipped."""
+    return {
+        pattern.name
+        for pattern in import_module(urlconf).urlpatterns
+        if isinstance(pattern, URLPattern)
+        and pattern.name
+        and pattern.callback.__module__.split(".")[0] in PROJECT_APPS
+    }
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin. ``query_budgets`` maps every URL name of
+    ``budget_urlconf`` to the most queries one request to it may run;
+    ``budget_requests`` (usually built in setUp) holds, per name, the
+    ``args``, ``method``, ``data`` and ``user`` to request it with. A budget
+    of None declares a route that cannot be requested; it is skipped.
+    """
+
+    budget_urlconf = None
+    query_budgets = {}
+    budget_requests = {}
+    budget_user = None
+
+    def assertQueryBudget(self, budget, method, url, data=None):
+        with QueryLog() as log:
+            response = getattr(self.client, method)(url, data)
+            if response.streaming:
+                # Streamed rows are only queried while the body is read.
+                b"".join(response.streaming_content)
+        if log.count > budget:
+            listing = "\n".join(f"{index:>3}. {sql}" for index, (sql, _) in enumerate(log.queries, 1))
+            self.fail(f"{method.upper()} {url} ran {log.count} queries, over its budget of {budget}:\n{listing}")
+        return response
+
+    def assertUrlsWithinQueryBudgets(self):
+        names = url_names(self.budget_urlconf)
+        self.assertEqual(sorted(names - set(self.query_budgets)), [], "URLs without a declared query budget")
+        namespace = getattr(import_module(self.budget_urlconf), "app_name", None)
+        for name in sorted(names):
+            if self.query_budgets[name] is None:
+                continue
+            spec = self.budget_requests.get(name, {})
+            url = reverse(f"{namespace}:{name}" if namespace else name, args=spec.get("args"))
+            # Each request starts cold and leaves nothing behind for the next.
+            with self.subTest(url=name), transaction.atomic():
+                cache.clear()
+                self.client.logout()
+                user = spec.get("user", self.budget_user)
+                if user is not None:
+                    self.client.force_login(user)
+                response = self.assertQueryBudget(
+                    self.query_budgets[name], spec.get("method", "get"), url, spec.get("data")
+                )
+                self.assertLess(response.status_code, 400, f"{url} answered {response.status_code}")
+                transaction.set_rollback(True)
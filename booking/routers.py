@@ -0,0 +1,95 @@
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+def replica_alias():
+    """The alias read-only requests are served from, or None when reads stay on default."""
+    alias = getattr(settings, "REPLICA_DATABASE", None)
+    return alias if alias in settings.DATABASES else None
+
+
+@contextmanager
+def reads_from_replica(enabled=True):
+    """
+    Send the block's reads to the replica. The first write inside it moves
+    the rest of the block back to the primary, so it reads its own writes;
+    the yielded state's ``wrote`` records whether that happened.
+    """
+    state = SimpleNamespace(replica=enabled, wrote=False)
+    previous = getattr(_state, "current", None)
+    _state.current = state
+    try:
+        yield state
+    finally:
+        _state.current = previous
+
+
+def reading_from_replica():
+    """Whether a read made here and now would be served by the replica."""
+    state = getattr(_state, "current", None)
+    if state is None or not state.replica or replica_alias() is None:
+        return False
+    return not connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+@contextmanager
+def reads_from_primary():
+    """
+    Send the block's reads to the primary. Results that go into a shared
+    cache must come from here: a row read from the lagging replica would
+    otherwise be cached under the version its invalidation just started.
+    """
+    state = getattr(_state, "current", None)
+    if state is None or not state.replica:
+        yield
+        return
+    state.replica = False
+    try:
+        yield
+    finally:
+        # A write inside the block keeps the rest of the request on the primary.
+        state.replica = not state.wrote
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes always go to the primary. Reads go to the replica only inside
+    reads_from_replica() and outside transactions; everything else, such as
+    management commands and workers, reads from the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return replica_alias() if reading_from_replica() else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = getattr(_state, "current", None)
+        if state is not None:
+            state.replica = False
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary, never from migrate.
+        return db == DEFAULT_DB_ALIAS
+
+
+def sync_replica(source=DEFAULT_DB_ALIAS, target=None):
+    """
+    Copy the whole primary database over a SQLite replica with the online
+    backup API. Stands in for replication in development and tests.
+    """
+    target = target or replica_alias()
+    source_connection, target_connection = connections[source], connections[target]
+    source_connection.ensure_connection()
+    target_connection.ensure_connection()
+    source_connection.connection.backup(target_connection.connection)
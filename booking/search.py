@@ -0,0 +1,69 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+
+from .fts import FtsIndex, build_match_expression
+
+SEARCH_RESULT_LIMIT = 500
+
+chef_index = FtsIndex(
+    "booking_chef_fts",
+    ("name", "specialty", "speciality", "dishes", "location"),
+    "SELECT c.id, c.name, c.specialty, "
+    "COALESCE(p.speciality, ''), COALESCE(p.dishes, ''), COALESCE(p.location, '') "
+    "FROM booking_chef c LEFT JOIN accounts_profile p ON p.user_id = c.user_id",
+    # Chef name matches rank above specialty, which rank above the
+    # free-form profile fields.
+    weights=(10.0, 5.0, 3.0, 3.0, 1.0),
+)
+
+
+def index_chef(chef_id, using=DEFAULT_DB_ALIAS):
+    chef_index.reindex("rowid = %s", "c.id = %s", [chef_id], using=using)
+
+
+def index_chefs_for_user(user_id, using=DEFAULT_DB_ALIAS):
+    chef_index.reindex(
+        "rowid IN (SELECT id FROM booking_chef WHERE user_id = %s)", "c.user_id = %s", [user_id], using=using
+    )
+
+
+def remove_chef(chef_id, using=DEFAULT_DB_ALIAS):
+    chef_index.remove([chef_id], using=using)
+
+
+def search_chef_ids(query, limit=SEARCH_RESULT_LIMIT, using=DEFAULT_DB_ALIAS, within=None):
+    """
+    Return chef ids ranked by relevance, or None when the index is
+    unavailable. Only chefs in the ``within`` queryset are considered.
+    """
+    if not chef_index.is_available(using):
+        return None
+    expression = build_match_expression(query)
+    if not expression:
+        return []
+    return chef_index.ranked_ids(expression, limit, using=using, within=within)
+
+
+def filter_matching(queryset, query):
+    """
+    Narrow ``queryset`` to every chef matching ``query``, with no cap and no
+    ranking, for listings sorted by another key; None when the index is
+    unavailable.
+    """
+    if not chef_index.is_available(queryset.db):
+        return None
+    expression = build_match_expression(query)
+    if not expression:
+        return queryset.none()
+    return queryset.filter(pk__in=chef_index.matching(expression))
+
+
+def like_filter(queryset, query):
+    return queryset.filter(
+        Q(name__icontains=query)
+        | Q(specialty__icontains=query)
+        | Q(user__profile__speciality__icontains=query)
+        | Q(user__profile__dishes__icontains=query)
+        | Q(user__profile__location__icontains=query)
+    )
+
@@ -0,0 +1,129 @@
+from functools import partial
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from accounts.models import Profile
+
+from . import availability, contact_search, images, search, sqlite
+from .caching import bump_blog_version_on_commit, invalidate_chef_cards, invalidate_chef_for_user
+from .models import BlogPost, Booking, Chef, ContactQuery
+
+# Sent with ``count`` after a queryset .update() soft-deletes active bookings
+# in bulk, since model signals do not fire for those writes.
+bookings_archived = Signal()
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    sqlite.apply_pragmas(connection)
+
+
+@receiver(post_save, sender=Chef)
+def index_chef_on_save(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    search.index_chef(instance.pk, using=using)
+
+
+@receiver(post_delete, sender=Chef)
+def remove_chef_from_index(sender, instance, using=None, **kwargs):
+    search.remove_chef(instance.pk, using=using)
+
+
+@receiver(post_save, sender=ContactQuery)
+def index_contact_query_on_save(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    if instance.is_deleted:
+        contact_search.remove_queries([instance.pk], using=using)
+    else:
+        contact_search.index_query(instance.pk, using=using)
+
+
+@receiver(post_delete, sender=ContactQuery)
+def remove_contact_query_from_index(sender, instance, using=None, **kwargs):
+    contact_search.remove_queries([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Chef)
+@receiver(post_delete, sender=Chef)
+def invalidate_cached_chef(sender, instance, **kwargs):
+    invalidate_chef_for_user(instance.user_id)
+
+
+def _invalidate_cards_on_commit(chef_ids):
+    # After commit, like the blog version, so a card rendered from the old
+    # rows cannot be cached under the fresh version.
+    if chef_ids:
+        transaction.on_commit(partial(invalidate_chef_cards, list(chef_ids)))
+
+
+@receiver(post_save, sender=Chef)
+@receiver(post_delete, sender=Chef)
+def invalidate_chef_card(sender, instance, **kwargs):
+    _invalidate_cards_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_chef_card_on_profile_save(sender, instance, **kwargs):
+    _invalidate_cards_on_commit(Chef.objects.filter(user_id=instance.user_id).values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_chef_card_on_user_save(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no card shows.
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    _invalidate_cards_on_commit(Chef.objects.filter(user_id=instance.pk).values_list("pk", flat=True))
+
+
+@receiver(images.variants_generated)
+def invalidate_chef_card_for_image(sender, name, **kwargs):
+    chef_ids = Chef.objects.filter(Q(image=name) | Q(user__profile__profile_image=name)).values_list("pk", flat=True)
+    _invalidate_cards_on_commit(chef_ids)
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+def invalidate_blog_pages(sender, **kwargs):
+    bump_blog_version_on_commit()
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_chef_calendar(sender, instance, signal=None, **kwargs):
+    # Soft-deleted bookings are already off the calendar, so permanently
+    # deleting them (often in bulk) changes nothing.
+    if signal is post_delete and instance.is_deleted:
+        return
+    # Deferred until the booking's transaction commits.
+    availability.invalidate_calendar(instance.chef_id, instance.date)
+
+
+@receiver(post_save, sender=Profile)
+def reindex_chef_on_profile_save(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    search.index_chefs_for_user(instance.user_id, using=using)
+
+
+_image_fields = {apps.get_model(label): field_name for label, field_name in images.IMAGE_FIELDS}
+
+
+def enqueue_image_variants(sender, instance, raw=False, **kwargs):
+    # Resizing happens in run_worker so uploads return without paying for it.
+    if raw:
+        return
+    fieldfile = getattr(instance, _image_fields[sender])
+    if fieldfile and not images.has_variants(fieldfile.name, fieldfile.storage):
+        images.enqueue_variants(fieldfile.name)
+
+
+for model in _image_fields:
+    post_save.connect(enqueue_image_variants, sender=model, dispatch_uid=f"image_variants:{model._meta.label}")
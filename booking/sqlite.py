@@ -0,0 +1,34 @@
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+_NAME_RE = re.compile(r"^[a-z_]+$")
+_VALUE_RE = re.compile(r"^-?\w+$")
+# Stored in the database file rather than per connection.
+PERSISTENT_PRAGMAS = {"journal_mode"}
+
+
+def configured_pragmas():
+    """The SQLITE_PRAGMAS setting, checked so it can be inlined into SQL."""
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    for name, value in pragmas.items():
+        if not _NAME_RE.match(name) or not _VALUE_RE.match(str(value)):
+            raise ImproperlyConfigured(f"settings.SQLITE_PRAGMAS has an invalid entry {name!r}: {value!r}.")
+    return pragmas
+
+
+def apply_pragmas(connection):
+    """Run the configured PRAGMAs on a freshly opened SQLite connection, in setting order."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in configured_pragmas().items():
+            if name in PERSISTENT_PRAGMAS:
+                # Setting these rewrites the database file, even to the mode it
+                # is already in; read first and only switch when it differs.
+                cursor.execute(f"PRAGMA {name}")
+                row = cursor.fetchone()
+                if row and str(row[0]).lower() == str(value).lower():
+                    continue
+            cursor.execute(f"PRAGMA {name} = {value}")
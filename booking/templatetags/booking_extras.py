@@ -0,0 +1,22 @@
+from django import template
+
+from booking import images
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def page_url(context, param, number):
+    params = context["request"].GET.copy()
+    params[param] = number
+    return f"?{params.urlencode()}"
+
+
+@register.simple_tag
+def image_variant(fieldfile, variant, fmt="webp"):
+    return images.variant_url(fieldfile, variant, fmt)
+
+
+@register.simple_tag
+def image_srcset(fieldfile, fmt="webp"):
+    return images.srcset(fieldfile, fmt)
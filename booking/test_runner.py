@@ -0,0 +1,41 @@
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+FILE_BASED_CACHE = "django.core.cache.backends.filebased.FileBasedCache"
+LOCMEM_CACHE = "django.core.cache.backends.locmem.LocMemCache"
+
+
+@contextmanager
+def scratch_caches(backend=FILE_BASED_CACHE):
+    """
+    Replace every configured cache with an empty one of ``backend`` for the
+    block, the way tests and benchmarks get their own database, so they never
+    read, fill or clear the caches the site is served from.
+    """
+    directory = Path(tempfile.mkdtemp(prefix="chef_booking_cache_"))
+    caches = {
+        alias: {"BACKEND": backend, "LOCATION": str(directory / alias), "OPTIONS": {"MAX_ENTRIES": 10000}}
+        for alias in settings.CACHES
+    }
+    try:
+        with override_settings(CACHES=caches):
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class ScratchCacheRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._scratch = ExitStack()
+        self._scratch.enter_context(scratch_caches())
+
+    def teardown_test_environment(self, **kwargs):
+        self._scratch.close()
+        super().teardown_test_environment(**kwargs)
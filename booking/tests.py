@@ -1,3 +1,1258 @@
-from django.test import TestCase
+import multiprocessing
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time as time_module
+import uuid
+from datetime import time, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, SuspiciousOperation
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.template import Context, Template
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from accounts.models import WorkImage
+
+from . import availability, caching, dashboard, images, jobs, outbox, routers, search, sqlite, transitions, views
+from .query_budget import QueryBudgetMixin
+from .middleware import STICKY_COOKIE
+from .models import BlogPost, Booking, Chef, Job, MaintenanceCheckpoint, OutboxMessage
+
+User = get_user_model()
+
+
+def make_chef(username, name, specialty="Italian", **kwargs):
+    user = User.objects.create_user(username=username)
+    defaults = {"experience": 5, "price_per_person": Decimal("500.00")}
+    defaults.update(kwargs)
+    return Chef.objects.create(user=user, name=name, specialty=specialty, **defaults)
+
+
+def make_booking(customer, chef, when, status="Pending", **kwargs):
+    return Booking.objects.create(
+        customer=customer,
+        chef=chef,
+        date=when.date(),
+        time=when.time().replace(microsecond=0),
+        person=kwargs.pop("person", 2),
+        total_price=kwargs.pop("total_price", Decimal("1000.00")),
+        status=status,
+        **kwargs,
+    )
+
+
+class ChefSearchTests(TestCase):
+    def setUp(self):
+        self.aman = make_chef("aman", "Aman Verma", specialty="North Indian")
+        self.priya = make_chef("priya", "Priya Nair", specialty="Kerala Seafood")
+        profile = self.priya.user.profile
+        profile.dishes = "Fish moilee, appam"
+        profile.location = "Kochi"
+        profile.save()
+
+    def test_prefix_matching_across_chef_and_profile_fields(self):
+        self.assertEqual(search.search_chef_ids("ame"), [])
+        self.assertEqual(search.search_chef_ids("am"), [self.aman.pk])
+        self.assertEqual(search.search_chef_ids("koc"), [self.priya.pk])
+        self.assertEqual(search.search_chef_ids("appam nair"), [self.priya.pk])
+
+    def test_name_matches_rank_above_profile_matches(self):
+        other = make_chef("kochi_chef", "Kochi Kitchen", specialty="Fusion")
+        self.assertEqual(search.search_chef_ids("kochi"), [other.pk, self.priya.pk])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.aman.specialty = "Mughlai"
+        self.aman.save()
+        self.assertEqual(search.search_chef_ids("mughlai"), [self.aman.pk])
+        self.assertEqual(search.search_chef_ids("north"), [])
+
+        self.aman.delete()
+        self.assertEqual(search.search_chef_ids("mughlai"), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(search.search_chef_ids('"NOT" OR *'), [])
+        self.assertEqual(search.search_chef_ids("   "), [])
+
+    def test_rebuild_command_restores_index(self):
+        Chef.objects.filter(pk=self.aman.pk).update(name="Renamed Chef")
+        self.assertEqual(search.search_chef_ids("renamed"), [])
+
+        out = StringIO()
+        call_command("rebuild_chef_search_index", stdout=out)
+        self.assertIn("Indexed 2 chef(s).", out.getvalue())
+        self.assertEqual(search.search_chef_ids("renamed"), [self.aman.pk])
+
+    def test_chef_list_view_uses_ranked_results(self):
+        self.client.force_login(make_chef("viewer", "Viewer").user)
+        response = self.client.get(reverse("chef_list"), {"q": "seafood"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["chefs"]), [self.priya])
+
+
+class ChefListPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create_user(username="viewer")
+        cls.chefs = [
+            make_chef(
+                f"chef{i}",
+                f"Chef {i}",
+                experience=i % 7,
+                team_members=2 + i % 4,
+                price_per_person=Decimal(100 + (i % 5) * 100),
+            )
+            for i in range(30)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.viewer)
+
+    def walk(self, params):
+        seen, cursor, pages = [], None, 0
+        while True:
+            response = self.client.get(reverse("chef_list"), {**params, **({"cursor": cursor} if cursor else {})})
+            page = response.context["page_obj"]
+            self.assertLessEqual(len(page), views.CHEF_PAGE_SIZE)
+            seen.extend(chef.pk for chef in page)
+            pages += 1
+            if not page.has_next:
+                return seen, pages
+            cursor = page.next_cursor
+
+    def test_keyset_pages_cover_every_chef_once_in_sort_order(self):
+        seen, pages = self.walk({"sort": "price_low"})
+        expected = [c.pk for c in sorted(self.chefs, key=lambda c: (c.price_per_person, c.pk))]
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 3)
+
+    def test_previous_cursor_returns_preceding_page(self):
+        first = self.client.get(reverse("chef_list"), {"sort": "experience"}).context["page_obj"]
+        second = self.client.get(
+            reverse("chef_list"), {"sort": "experience", "cursor": first.next_cursor}
+        ).context["page_obj"]
+        back = self.client.get(
+            reverse("chef_list"), {"sort": "experience", "cursor": second.previous_cursor}
+        ).context["page_obj"]
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous)
+
+    def test_typed_filters(self):
+        seen, _ = self.walk({"min_price": "300", "max_price": "400", "min_experience": "3", "min_team": "4"})
+        expected = {
+            c.pk
+            for c in self.chefs
+            if 300 <= c.price_per_person <= 400 and c.experience >= 3 and c.team_members >= 4
+        }
+        self.assertEqual(set(seen), expected)
+
+    def test_invalid_filter_and_cursor_are_ignored(self):
+        response = self.client.get(reverse("chef_list"), {"min_price": "cheap", "cursor": "garbage"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["page_obj"]), views.CHEF_PAGE_SIZE)
+
+    def test_search_results_are_paginated_by_rank(self):
+        seen, pages = self.walk({"q": "chef"})
+        self.assertEqual(sorted(seen), sorted(c.pk for c in self.chefs))
+        self.assertEqual(pages, 3)
+
+
+class ChefSearchBeyondRankLimitTests(TestCase):
+    """More matches than the ranked list holds, so sorts and filters must see them all."""
+
+    @classmethod
+    def setUpTestData(cls):
+        count = search.SEARCH_RESULT_LIMIT + 100
+        users = User.objects.bulk_create(User(username=f"italian{i}") for i in range(count))
+        Chef.objects.bulk_create(
+            Chef(
+                user=user,
+                name=f"Italian Chef {i}",
+                specialty="Italian",
+                experience=1,
+                price_per_person=Decimal(100 + i),
+            )
+            for i, user in enumerate(users)
+        )
+        call_command("rebuild_chef_search_index", stdout=StringIO())
+        cls.viewer = User.objects.create_user(username="viewer")
+
+    def setUp(self):
+        self.client.force_login(self.viewer)
+
+    def get_page(self, **params):
+        return self.client.get(reverse("chef_list"), {"q": "italian", **params}).context["page_obj"]
+
+    def test_sorts_cover_every_match(self):
+        top = Chef.objects.order_by("-price_per_person").first()
+        self.assertEqual(list(self.get_page(sort="price_high"))[0], top)
+
+    def test_filters_cover_every_match(self):
+        cutoff = 100 + search.SEARCH_RESULT_LIMIT + 90
+        expected = Chef.objects.filter(price_per_person__gte=cutoff).count()
+        self.assertEqual(expected, 10)
+        self.assertEqual(len(self.get_page(min_price=cutoff, sort="newest")), 10)
+        # Recommended ranks the best hits among the filtered chefs.
+        self.assertEqual(len(self.get_page(min_price=cutoff)), 10)
+
+
+class DashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = make_chef("dash_chef", "Dash Chef")
+        cls.user = cls.chef.user
+        cls.other_chef = make_chef("other_chef", "Other Chef")
+        cls.customer = User.objects.create_user(username="dash_customer")
+
+    def seed(self, count):
+        now = timezone.now()
+        for i in range(count):
+            offset = timedelta(days=i + 1)
+            make_booking(self.customer, self.chef, now + offset)
+            make_booking(self.customer, self.chef, now - offset, status="Accepted")
+            make_booking(self.user, self.other_chef, now + offset)
+            make_booking(self.user, self.other_chef, now - offset)
+
+    def dashboard_queries(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_sections_are_partitioned_by_role_and_time(self):
+        self.seed(3)
+        make_booking(self.customer, self.chef, timezone.now() + timedelta(days=9), status="Accepted")
+        response, _ = self.dashboard_queries()
+        context = response.context
+        self.assertEqual(len(context["bookings"]), 4)
+        self.assertEqual(len(context["past_bookings"]), 3)
+        self.assertEqual(len(context["cos_bookings"]), 3)
+        self.assertEqual(len(context["past_cos_bookings"]), 3)
+        self.assertEqual((context["chef_count"], context["cos_count"]), (4, 3))
+        self.assertEqual(context["pending_count"], 3)
+        self.assertTrue(all(b.chef == self.chef for b in context["bookings"]))
+        self.assertTrue(all(b.customer == self.user for b in context["past_cos_bookings"]))
+
+    def test_query_count_does_not_grow_with_booking_volume(self):
+        self.seed(1)
+        _, small = self.dashboard_queries()
+        self.seed(25)
+        response, large = self.dashboard_queries()
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.context["bookings"]), dashboard.DASHBOARD_PAGE_SIZE)
+
+    def test_sections_page_with_cursors_and_fetch_one_page_each(self):
+        self.seed(25)
+        self.client.force_login(self.user)
+        seen = []
+        cursor = None
+        while True:
+            with CaptureQueriesContext(connection) as ctx:
+                context = dashboard.build_dashboard(self.user, {"past_bookings_cursor": cursor} if cursor else {})
+            self.assertEqual(len(ctx.captured_queries), 5)
+            for sql in (query["sql"] for query in ctx.captured_queries[1:]):
+                self.assertIn(f"LIMIT {dashboard.DASHBOARD_PAGE_SIZE + 1}", sql)
+            page = context["past_bookings"]
+            seen.extend(booking.pk for booking in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+
+class ScheduledAtTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = make_chef("sched_chef", "Sched Chef")
+        cls.customer = User.objects.create_user(username="sched_customer")
+
+    def test_scheduled_at_is_maintained_from_raw_date_and_time(self):
+        booking = Booking.objects.create(
+            customer=self.customer,
+            chef=self.chef,
+            date="2030-01-02",
+            time="18:30",
+            person=2,
+            total_price=Decimal("1000.00"),
+        )
+        booking.refresh_from_db()
+        self.assertEqual(booking.scheduled_at.isoformat(), "2030-01-02T18:30:00+00:00")
+
+        booking.date = "2030-02-03"
+        booking.save(update_fields=["date"])
+        booking.refresh_from_db()
+        self.assertEqual(booking.scheduled_at.isoformat(), "2030-02-03T18:30:00+00:00")
+
+    def test_past_and_upcoming_split_on_scheduled_at(self):
+        now = timezone.now()
+        past = make_booking(self.customer, self.chef, now - timedelta(minutes=5))
+        upcoming = make_booking(self.customer, self.chef, now + timedelta(minutes=5))
+        self.assertEqual(list(Booking.objects.past(now)), [past])
+        self.assertEqual(list(Booking.objects.upcoming(now)), [upcoming])
+
+    def assertUsesScheduledAtIndex(self, queryset, index_prefix):
+        plan = queryset.explain()
+        self.assertIn("USING", plan)
+        self.assertIn(index_prefix, plan)
+        self.assertIn("scheduled_at<", plan.replace(" ", ""))
+
+    def test_customer_past_bookings_use_composite_index(self):
+        queryset = Booking.objects.filter(customer=self.customer).past()
+        self.assertUsesScheduledAtIndex(queryset, "booking_active_customer_idx")
+
+    def test_chef_past_bookings_use_composite_index(self):
+        queryset = Booking.objects.filter(chef=self.chef).past()
+        self.assertUsesScheduledAtIndex(queryset, "booking_active_chef_idx")
+
+    def test_cleanup_scan_uses_is_deleted_index(self):
+        queryset = Booking.all_objects.filter(is_deleted=False).past()
+        self.assertUsesScheduledAtIndex(queryset, "booking_active_sched_idx")
+
+
+class ChefContextTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = make_chef("ctx_chef", "Context Chef")
+        cls.admin = User.objects.create_superuser(username="ctx_admin", email="admin@example.com", password=None)
+
+    def setUp(self):
+        cache.clear()
+
+    def chef_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q["sql"] for q in ctx.captured_queries if 'FROM "booking_chef"' in q["sql"]]
+
+    def test_page_without_chef_reference_skips_lookup(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.chef_queries(reverse("custom_admin:contact_query_list")), [])
+
+    def test_chef_lookup_is_cached_per_user(self):
+        self.client.force_login(self.chef.user)
+        self.assertEqual(len(self.chef_queries(reverse("home"))), 1)
+        self.assertEqual(self.chef_queries(reverse("home")), [])
+
+    def test_cache_is_invalidated_when_chef_changes(self):
+        user = User.objects.create_user(username="soon_chef")
+        self.client.force_login(user)
+        self.assertContains(self.client.get(reverse("home")), "Become a Chef")
+
+        Chef.objects.create(user=user, name="New Chef", specialty="Thai", experience=1, price_per_person=100)
+        self.assertNotContains(self.client.get(reverse("home")), "Become a Chef")
+
+        user.chef.delete()
+        self.assertContains(self.client.get(reverse("home")), "Become a Chef")
+
+
+class CleanupPastBookingsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = make_chef("cleanup_chef", "Cleanup Chef")
+        cls.customer = User.objects.create_user(username="cleanup_customer")
+
+    def setUp(self):
+        now = timezone.now()
+        self.old = [make_booking(self.customer, self.chef, now - timedelta(days=40 + i)) for i in range(5)]
+        self.recent = make_booking(self.customer, self.chef, now - timedelta(days=2))
+
+    def run_cleanup(self, **options):
+        out = StringIO()
+        call_command("cleanup_past_bookings", retention_days=30, stdout=out, **options)
+        return out.getvalue()
+
+    def test_batches_soft_delete_only_expired_bookings(self):
+        output = self.run_cleanup(batch_size=2)
+        self.assertIn("Batch 3: 1 booking(s), 5 total", output)
+        self.assertIn("Soft-deleted 5 booking(s).", output)
+        self.assertEqual(list(Booking.objects.all()), [self.recent])
+        self.assertFalse(MaintenanceCheckpoint.objects.exists())
+
+    def test_max_runtime_stops_and_next_run_resumes_from_checkpoint(self):
+        output = self.run_cleanup(batch_size=2, max_runtime=0)
+        self.assertIn("run again to resume", output)
+        self.assertEqual(Booking.all_objects.filter(is_deleted=True).count(), 2)
+        checkpoint = MaintenanceCheckpoint.objects.get(name="cleanup_past_bookings")
+        self.assertEqual(checkpoint.state["last_id"], sorted(b.pk for b in self.old)[1])
+
+        output = self.run_cleanup(batch_size=2)
+        self.assertIn("Resuming after booking", output)
+        self.assertEqual(Booking.all_objects.filter(is_deleted=True).count(), 5)
+        self.assertFalse(MaintenanceCheckpoint.objects.exists())
+
+    def test_dry_run_changes_nothing(self):
+        self.assertIn("5 booking(s) eligible", self.run_cleanup(dry_run=True))
+        self.assertEqual(Booking.objects.count(), 6)
+
+
+def make_image_upload(name="dish.png", size=(2000, 1200), mode="RGBA"):
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 80, 40, 255) if mode == "RGBA" else (200, 80, 40)).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(self.settings_override.disable)
+
+    def test_variants_are_generated_by_the_queue(self):
+        chef = make_chef("img_chef", "Image Chef", image=make_image_upload())
+        job = Job.objects.get()
+        self.assertEqual((job.kind, job.payload), (images.IMAGE_JOB, {"name": chef.image.name}))
+        self.assertFalse(images.has_variants(chef.image.name))
+
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertFalse(Job.objects.exists())
+        for variant, (width, height, crop) in images.VARIANTS.items():
+            for fmt in images.FORMATS:
+                with default_storage.open(images.variant_name(chef.image.name, variant, fmt)) as f:
+                    rendered = Image.open(f)
+                    self.assertLessEqual(rendered.size[0], width)
+                    self.assertLessEqual(rendered.size[1], height)
+                    if crop:
+                        self.assertEqual(rendered.size, (width, height))
+
+    def test_template_tags_prefer_variants_and_fall_back_to_original(self):
+        chef = make_chef("img_chef", "Image Chef", image=make_image_upload())
+        jobs.run_pending()
+        template = Template(
+            "{% load booking_extras %}{% image_variant image 'avatar' %}|{% image_srcset image %}"
+        )
+        avatar, srcset = template.render(Context({"image": chef.image})).split("|")
+        self.assertTrue(avatar.endswith("__avatar.webp"))
+        self.assertIn("__card.webp 640w", srcset)
+        self.assertIn("__full.webp 1600w", srcset)
+
+        Chef.objects.filter(pk=chef.pk).update(image="chef_dishes/missing.png")
+        chef.refresh_from_db()
+        self.assertEqual(images.variant_url(chef.image, "card"), chef.image.url)
+
+    def test_backfill_command_processes_existing_uploads(self):
+        name = default_storage.save("chef_dishes/legacy.png", make_image_upload())
+        chef = make_chef("legacy_chef", "Legacy Chef")
+        Chef.objects.filter(pk=chef.pk).update(image=name)
+
+        out = StringIO()
+        call_command("generate_image_variants", workers=2, stdout=out)
+        self.assertIn("1 generated", out.getvalue())
+        self.assertTrue(default_storage.exists(images.variant_name(name, "card", "jpg")))
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        jobs.HANDLERS["test_flaky"] = self.flaky
+        self.addCleanup(jobs.HANDLERS.pop, "test_flaky")
+
+    def flaky(self, fail_times):
+        self.calls.append(fail_times)
+        if len(self.calls) <= fail_times:
+            raise RuntimeError("boom")
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = jobs.enqueue("test_flaky", {"fail_times": 1})
+        with self.assertLogs("booking.jobs", "WARNING"):
+            self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_PENDING, 1))
+        self.assertIn("RuntimeError: boom", job.last_error)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(jobs.run_pending(), 0)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_exhausted_job_is_dead_lettered(self):
+        job = jobs.enqueue("test_flaky", {"fail_times": 5}, max_attempts=2)
+        with self.assertLogs("booking.jobs") as logs:
+            jobs.run_pending()
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            jobs.run_pending()
+        self.assertIn("dead-letter", logs.output[-1])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_DEAD, 2))
+        self.assertIsNone(jobs.claim_next())
+
+        self.assertEqual(jobs.retry_dead(), 1)
+        self.assertEqual(jobs.claim_next().pk, job.pk)
+
+    def test_claim_is_exclusive_and_stale_locks_expire(self):
+        job = jobs.enqueue("test_flaky", {"fail_times": 0})
+        self.assertEqual(jobs.claim_next().pk, job.pk)
+        self.assertIsNone(jobs.claim_next())
+        self.assertEqual(jobs.claim_next(now=timezone.now() + jobs.LOCK_TIMEOUT * 2).pk, job.pk)
+
+    def test_job_that_keeps_killing_its_worker_is_dead_lettered(self):
+        job = jobs.enqueue("test_flaky", {"fail_times": 0}, max_attempts=2)
+        now = timezone.now()
+        # Each claim's worker dies without reporting back.
+        self.assertEqual(jobs.claim_next(now=now).pk, job.pk)
+        self.assertEqual(jobs.claim_next(now=now + jobs.LOCK_TIMEOUT * 2).pk, job.pk)
+        with self.assertLogs("booking.jobs", "ERROR"):
+            self.assertIsNone(jobs.claim_next(now=now + jobs.LOCK_TIMEOUT * 4))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_DEAD, 2))
+
+
+class RunWorkerCommandTests(TransactionTestCase):
+    def test_worker_threads_drain_committed_jobs(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root):
+            chefs = [make_chef(f"worker_chef{i}", "Chef", image=make_image_upload(size=(300, 200))) for i in range(3)]
+            Job.objects.create(kind="missing_handler", max_attempts=1)
+            out = StringIO()
+            with self.assertLogs("booking.jobs", "ERROR"):
+                call_command("run_worker", threads=2, once=True, stdout=out)
+            self.assertIn("Processed 3 job(s), 1 failed.", out.getvalue())
+            for chef in chefs:
+                self.assertTrue(images.has_variants(chef.image.name))
+        self.assertEqual(list(Job.objects.values_list("kind", "status")), [("missing_handler", Job.STATUS_DEAD)])
+
+    def test_handlers_do_not_hold_the_write_lock(self):
+        def probe():
+            other = sqlite3.connect(connection.settings_dict["NAME"], timeout=0, isolation_level=None)
+            try:
+                other.execute("BEGIN IMMEDIATE")
+                other.execute("ROLLBACK")
+            finally:
+                other.close()
+
+        jobs.HANDLERS["test_lock_probe"] = probe
+        self.addCleanup(jobs.HANDLERS.pop, "test_lock_probe")
+        jobs.enqueue("test_lock_probe")
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertFalse(Job.objects.exists())
+
+
+class AvailabilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = make_chef("slot_chef", "Slot Chef", slot_minutes=120)
+        cls.customer = User.objects.create_user(username="slot_customer")
+        cls.day = timezone.now().date() + timedelta(days=10)
+
+    def book(self, hour, minute=0, **kwargs):
+        booking, created = availability.book_slot(
+            self.chef, self.customer, self.day, time(hour, minute), person=2, total_price=Decimal("1000.00"), **kwargs
+        )
+        return booking
+
+    def test_overlapping_slots_are_rejected(self):
+        booking = self.book(18)
+        self.assertEqual(booking.ends_at - booking.scheduled_at, timedelta(minutes=120))
+        for hour, minute in [(18, 0), (17, 0), (19, 59)]:
+            with self.assertRaises(availability.SlotUnavailable):
+                self.book(hour, minute)
+        self.book(16)
+        self.book(20)
+        self.assertEqual(Booking.objects.count(), 3)
+
+    def test_rejected_and_deleted_bookings_free_the_slot(self):
+        first = self.book(12)
+        Booking.objects.filter(pk=first.pk).update(status="Rejected")
+        second = self.book(12)
+        second.soft_delete()
+        start, end = availability.slot_bounds(self.chef, self.day, time(12))
+        self.assertFalse(availability.overlapping_bookings(self.chef, start, end).exists())
+
+    def test_overlap_lookup_is_an_index_range_scan(self):
+        start, end = availability.slot_bounds(self.chef, self.day, time(18))
+        plan = availability.overlapping_bookings(self.chef, start, end).explain()
+        self.assertIn("booking_active_chef_idx", plan)
+        self.assertIn("scheduled_at>", plan.replace(" ", ""))
+
+    def test_idempotency_key_returns_original_booking(self):
+        key = uuid.uuid4()
+        booking = self.book(18, idempotency_key=key)
+        replayed, created = availability.book_slot(
+            self.chef, self.customer, self.day, time(18), idempotency_key=key, person=2, total_price=Decimal("1000.00")
+        )
+        self.assertEqual((replayed, created), (booking, False))
+
+        other = User.objects.create_user(username="slot_intruder")
+        with self.assertRaises(SuspiciousOperation):
+            availability.book_slot(self.chef, other, self.day, time(10), idempotency_key=key, person=1, total_price=1)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_view_replay_does_not_duplicate(self):
+        self.client.force_login(self.customer)
+        response = self.client.get(reverse("book_chef", args=[self.chef.pk]))
+        key = response.context["idempotency_key"]
+        self.assertContains(response, f'value="{key}"')
+        data = {"date": self.day.isoformat(), "time": "19:00", "person": "2", "idempotency_key": str(key)}
+        for _ in range(3):
+            response = self.client.post(reverse("book_chef", args=[self.chef.pk]), data)
+            self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+        self.assertEqual(Booking.objects.get().idempotency_key, key)
+
+    def test_view_reports_taken_slot(self):
+        self.book(18)
+        self.client.force_login(self.customer)
+        response = self.client.post(
+            reverse("book_chef", args=[self.chef.pk]),
+            {"date": self.day.isoformat(), "time": "19:00", "person": "2"},
+            follow=True,
+        )
+        self.assertContains(response, "already booked around that time")
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    def test_parallel_requests_for_one_slot_create_one_booking(self):
+        chef = make_chef("busy_chef", "Busy Chef")
+        customers = [User.objects.create_user(username=f"rush{i}") for i in range(8)]
+        day = (timezone.now() + timedelta(days=5)).date().isoformat()
+        barrier = threading.Barrier(len(customers))
+        statuses = []
+
+        def submit(customer):
+            client = Client()
+            client.force_login(customer)
+            barrier.wait()
+            try:
+                response = client.post(
+                    reverse("book_chef", args=[chef.pk]), {"date": day, "time": "19:00", "person": "2"}
+                )
+                statuses.append(response.headers["Location"])
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=(customer,)) for customer in customers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(Booking.objects.filter(chef=chef).count(), 1)
+        self.assertEqual(statuses.count(reverse("dashboard")), 1)
+        self.assertEqual(len(statuses), len(customers))
+
+    def test_concurrent_replays_of_one_submission_create_one_booking(self):
+        chef = make_chef("replay_chef", "Replay Chef")
+        customer = User.objects.create_user(username="double_clicker")
+        data = {
+            "date": (timezone.now() + timedelta(days=5)).date().isoformat(),
+            "time": "13:00",
+            "person": "2",
+            "idempotency_key": str(uuid.uuid4()),
+        }
+        barrier = threading.Barrier(6)
+        locations = []
+
+        def replay():
+            client = Client()
+            client.force_login(customer)
+            barrier.wait()
+            try:
+                locations.append(client.post(reverse("book_chef", args=[chef.pk]), data).headers["Location"])
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=replay) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(locations, [reverse("dashboard")] * 6)
+        self.assertEqual(Booking.objects.filter(chef=chef).count(), 1)
+
+
+class ChefAvailabilityEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = make_chef("cal_chef", "Calendar Chef")
+        cls.customer = User.objects.create_user(username="cal_customer")
+        cls.next_month = (timezone.now().date().replace(day=1) + timedelta(days=32)).replace(day=1)
+        cls.url = reverse("chef_availability", args=[cls.chef.pk])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.customer)
+
+    def book(self, day, hour, status="Pending"):
+        when = timezone.now().replace(year=day.year, month=day.month, day=day.day, hour=hour, minute=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_booking(self.customer, self.chef, when, status=status)
+
+    def get(self, **headers):
+        return self.client.get(self.url, {"month": self.next_month.strftime("%Y-%m")}, headers=headers)
+
+    def day_entry(self, response, number):
+        return response.json()["days"][number - 1]
+
+    def test_busy_days_are_aggregated_and_cached(self):
+        self.book(self.next_month, 10)
+        self.book(self.next_month, 18, status="Accepted")
+        self.book(self.next_month.replace(day=2), 12, status="Rejected")
+
+        # Two of these load the session and user for login_required.
+        with self.assertNumQueries(4):
+            response = self.get()
+        self.assertEqual(self.day_entry(response, 1), {"date": self.next_month.isoformat(), "status": "busy", "bookings": 2})
+        self.assertEqual(self.day_entry(response, 2)["status"], "free")
+        with self.assertNumQueries(2):
+            self.get()
+
+    def test_booking_changes_invalidate_the_month(self):
+        self.get()
+        booking = self.book(self.next_month.replace(day=3), 10)
+        self.assertEqual(self.day_entry(self.get(), 3)["bookings"], 1)
+
+        booking.status = "Rejected"
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save(update_fields=["status"])
+        self.assertEqual(self.day_entry(self.get(), 3)["status"], "free")
+
+    def test_the_month_is_dropped_only_after_commit(self):
+        self.get()
+        key = availability.calendar_cache_key(self.chef.pk, self.next_month.year, self.next_month.month)
+        with self.captureOnCommitCallbacks(execute=True):
+            when = timezone.now().replace(year=self.next_month.year, month=self.next_month.month, day=4, hour=10)
+            make_booking(self.customer, self.chef, when)
+            # A request racing the open transaction must not find it gone yet,
+            # or it would re-cache the month without this booking.
+            self.assertIsNotNone(cache.get(key))
+        self.assertIsNone(cache.get(key))
+
+    def test_conditional_get_returns_not_modified(self):
+        etag = self.get()["ETag"]
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        self.book(self.next_month, 10)
+        self.assertEqual(self.get(if_none_match=etag).status_code, 200)
+
+    def test_past_days_and_bad_input(self):
+        response = self.client.get(self.url, {"month": "2020-01"})
+        self.assertEqual({day["status"] for day in response.json()["days"]}, {"past"})
+        self.assertEqual(self.client.get(self.url, {"month": "2020-13"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"month": "9999-12"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("chef_availability", args=[0])).status_code, 404)
+
+    def test_anonymous_callers_are_sent_to_log_in(self):
+        self.client.logout()
+        response = self.get()
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse("login"), response["Location"])
+
+
+class ConcurrentTransitionTests(TransactionTestCase):
+    def test_racing_transitions_never_lose_updates(self):
+        chef = make_chef("race_chef", "Race Chef")
+        customer = User.objects.create_user(username="race_customer")
+        booking = make_booking(customer, chef, timezone.now() + timedelta(days=3))
+        barrier = threading.Barrier(8)
+        outcomes = []
+
+        def flip(index):
+            try:
+                barrier.wait()
+                for _ in range(25):
+                    current = Booking.objects.get(pk=booking.pk)
+                    target = "Pending" if current.status == "Accepted" else "Accepted"
+                    outcomes.append(transitions.transition(current, target).outcome)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=flip, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        booking.refresh_from_db()
+        self.assertEqual(len(outcomes), 200)
+        self.assertEqual(set(outcomes) - {transitions.APPLIED, transitions.CONFLICT}, set())
+        # Every applied transition bumped the version exactly once.
+        self.assertEqual(booking.version, outcomes.count(transitions.APPLIED))
+        self.assertEqual(booking.status, "Accepted" if booking.version % 2 else "Pending")
+
+
+class CountingEmailBackend(locmem.EmailBackend):
+    """locmem backend that tracks opens the way the SMTP backend does."""
+
+    opened = 0
+    is_open = False
+
+    def open(self):
+        if self.is_open:
+            return False
+        self.is_open = True
+        CountingEmailBackend.opened += 1
+        return True
+
+    def close(self):
+        self.is_open = False
+
+    def send_messages(self, messages):
+        if any("bounce@example.com" in message.to for message in messages):
+            raise ConnectionError("mailbox unavailable")
+        return super().send_messages(messages)
+
+
+class FlakyEmailBackend(CountingEmailBackend):
+    """Refuses the first ``outages`` connection attempts."""
+
+    outages = 0
+
+    def open(self):
+        if FlakyEmailBackend.outages:
+            FlakyEmailBackend.outages -= 1
+            raise ConnectionRefusedError("mail server down")
+        return super().open()
+
+
+@override_settings(EMAIL_BACKEND="booking.tests.CountingEmailBackend", CONTACT_NOTIFICATION_EMAILS=["ops@example.com"])
+class OutboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = make_chef("mail_chef", "Mail Chef")
+        cls.chef.user.email = "chef@example.com"
+        cls.chef.user.save(update_fields=["email"])
+        cls.customer = User.objects.create_user(username="mail_customer", email="customer@example.com")
+
+    def setUp(self):
+        CountingEmailBackend.opened = 0
+
+    def send_outbox(self, **options):
+        out = StringIO()
+        call_command("send_outbox", stdout=out, **options)
+        return out.getvalue()
+
+    def test_booking_notifications_are_queued_then_sent(self):
+        day = timezone.now().date() + timedelta(days=3)
+        booking, _ = availability.book_slot(self.chef, self.customer, day, time(12), person=2, total_price=1000)
+        transitions.transition(booking, "Accepted", source="chef")
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutboxMessage.objects.filter(status=OutboxMessage.STATUS_PENDING).count(), 2)
+
+        self.assertIn("Sent 2 message(s), 0 failed.", self.send_outbox())
+        self.assertEqual([message.to for message in mail.outbox], [["chef@example.com"], ["customer@example.com"]])
+        self.assertIn("has been accepted", mail.outbox[1].body)
+        self.assertFalse(OutboxMessage.objects.exclude(status=OutboxMessage.STATUS_SENT).exists())
+
+    def test_message_whose_sender_keeps_dying_is_dead_lettered(self):
+        message = OutboxMessage.objects.create(
+            subject="Hi", body="...", recipients=["chef@example.com"], max_attempts=2
+        )
+        now = timezone.now()
+        self.assertEqual(outbox.claim_batch(10, now=now), [message])
+        self.assertEqual(outbox.claim_batch(10, now=now + outbox.LOCK_TIMEOUT * 2), [message])
+        with self.assertLogs("booking.outbox", "ERROR"):
+            self.assertEqual(outbox.claim_batch(10, now=now + outbox.LOCK_TIMEOUT * 4), [])
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboxMessage.STATUS_DEAD, 2))
+
+    def test_contact_query_notifies_staff(self):
+        self.client.post(reverse("submit_contact_query"), {"name": "Asha", "email": "asha@example.com", "message": "Hi"})
+        self.send_outbox()
+        self.assertEqual(mail.outbox[0].to, ["ops@example.com"])
+        self.assertIn("asha@example.com", mail.outbox[0].body)
+
+    def test_batches_share_one_connection(self):
+        for index in range(5):
+            outbox.enqueue(f"Message {index}", "booking/emails/contact_query.txt", {"query": {}}, ["a@example.com"])
+        output = self.send_outbox(batch_size=2)
+        self.assertEqual(output.count("Batch:"), 3)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(CountingEmailBackend.opened, 1)
+
+    def test_failures_back_off_then_go_dead(self):
+        message = outbox.enqueue("Bounce", "booking/emails/contact_query.txt", {"query": {}}, ["bounce@example.com"])
+        message.max_attempts = 2
+        message.save(update_fields=["max_attempts"])
+
+        with self.assertLogs("booking.outbox", "WARNING"):
+            self.assertIn("0 message(s), 1 failed", self.send_outbox())
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboxMessage.STATUS_PENDING, 1))
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        self.assertIn("mailbox unavailable", message.last_error)
+        self.assertIn("Sent 0 message(s), 0 failed.", self.send_outbox())
+
+        OutboxMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+        with self.assertLogs("booking.outbox", "ERROR"):
+            self.send_outbox()
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.STATUS_DEAD)
+
+    @override_settings(EMAIL_BACKEND="booking.tests.FlakyEmailBackend")
+    def test_watch_mode_survives_a_mail_server_outage(self):
+        FlakyEmailBackend.outages = 1
+        message = outbox.enqueue("Hello", "booking/emails/contact_query.txt", {"query": {}}, ["a@example.com"])
+        naps = []
+
+        def sleep(seconds):
+            naps.append(seconds)
+            if len(naps) == 1:
+                # Skip the retry backoff instead of waiting it out.
+                OutboxMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+            else:
+                raise KeyboardInterrupt
+
+        with mock.patch("booking.management.commands.send_outbox.time.sleep", sleep), self.assertLogs("booking.outbox"):
+            output = self.send_outbox(watch=True, poll_interval=0.5)
+        self.assertIn("Could not connect to the mail server", output)
+        self.assertIn("Sent 1 message(s), 1 failed.", output)
+        self.assertEqual(naps, [0.5, 0.5])
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.STATUS_SENT)
+
+
+class BlogPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="writer")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = BlogPost.objects.create(
+                title="Monsoon menus", image="blog_images/x.jpg", content="Rainy day recipes.", author=self.author
+            )
+
+    def test_repeat_visits_are_cached_and_revalidated(self):
+        url = reverse("blog_detail", args=[self.post.pk])
+        first = self.client.get(url)
+        self.assertContains(first, "Monsoon menus")
+        self.assertIn("no-cache", first["Cache-Control"])
+        self.assertIn("Last-Modified", first)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+        self.assertEqual(cached.content, first.content)
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        since = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(since.status_code, 304)
+
+    def test_edits_and_unpublishing_bump_the_version(self):
+        list_url = reverse("blog_list")
+        etag = self.client.get(list_url)["ETag"]
+        self.post.title = "Winter menus"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        response = self.client.get(list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Winter menus")
+
+        admin = User.objects.create_superuser(username="admin", email="admin@example.com", password=None)
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("custom_admin:blog_bulk"), {"action": "unpublish", "ids": [self.post.pk]})
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("blog_detail", args=[self.post.pk])).status_code, 404)
+        self.assertNotContains(self.client.get(list_url), "Winter menus")
+
+    def test_signed_in_users_bypass_the_cache(self):
+        self.client.force_login(self.author)
+        response = self.client.get(reverse("blog_list"))
+        self.assertContains(response, "Logout")
+        self.assertNotIn("ETag", response)
+        self.client.logout()
+        self.assertNotContains(self.client.get(reverse("blog_list")), "Logout")
+
+
+class ChefCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.chef = make_chef("aman", "Aman Verma", image="chef_dishes/aman.jpg")
+        self.viewer = User.objects.create_user(username="viewer")
+        self.client.force_login(self.viewer)
+
+    def get_list(self):
+        return self.client.get(reverse("chef_list"))
+
+    def test_cards_are_reused_until_the_chef_changes(self):
+        self.assertContains(self.get_list(), "Aman Verma")
+        # update() skips signals, so the cached card still shows the old name.
+        Chef.objects.filter(pk=self.chef.pk).update(name="Renamed")
+        self.assertContains(self.get_list(), "Aman Verma")
+
+        self.chef.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chef.save()
+        self.assertContains(self.get_list(), "Renamed")
+
+    def test_profile_user_and_image_changes_refresh_the_card(self):
+        self.get_list()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chef.user.username = "aman_v"
+            self.chef.user.save()
+        self.assertContains(self.get_list(), reverse("profile_detail", kwargs={"username": "aman_v"}))
+
+        Chef.objects.filter(pk=self.chef.pk).update(specialty="Mughlai")
+        with self.captureOnCommitCallbacks(execute=True):
+            images.variants_generated.send(sender=None, name="chef_dishes/aman.jpg")
+        self.assertContains(self.get_list(), "Mughlai")
+
+        Chef.objects.filter(pk=self.chef.pk).update(specialty="Awadhi")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chef.user.profile.save()
+        self.assertContains(self.get_list(), "Awadhi")
+
+    def test_invalidation_from_another_process_is_seen(self):
+        # Image variants are generated, and cards invalidated, by run_worker.
+        self.get_list()
+        Chef.objects.filter(pk=self.chef.pk).update(specialty="Mughlai")
+        worker = multiprocessing.get_context("fork").Process(
+            target=caching.invalidate_chef_cards, args=([self.chef.pk],)
+        )
+        worker.start()
+        worker.join()
+        self.assertEqual(worker.exitcode, 0)
+        self.assertContains(self.get_list(), "Mughlai")
+
+    def test_logins_do_not_invalidate(self):
+        self.get_list()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Client().force_login(self.chef.user)
+        self.assertEqual(callbacks, [])
+
+    def test_viewer_specific_button_stays_outside_the_fragment(self):
+        self.assertContains(self.get_list(), "Book This Chef")
+        self.client.force_login(self.chef.user)
+        response = self.get_list()
+        self.assertContains(response, "Open Dashboard")
+        self.assertNotContains(response, "Book This Chef")
+
+
+class SQLiteConnectionTests(TransactionTestCase):
+    def test_new_connections_apply_the_configured_pragmas(self):
+        connection.close()
+        with connection.cursor() as cursor:
+            values = {}
+            for name in ("journal_mode", "busy_timeout", "synchronous", "mmap_size", "cache_size"):
+                cursor.execute(f"PRAGMA {name}")
+                values[name] = cursor.fetchone()[0]
+        self.assertEqual(
+            values,
+            {
+                "journal_mode": "wal",
+                "busy_timeout": 5000,
+                "synchronous": 1,
+                "mmap_size": 128 * 1024 * 1024,
+                "cache_size": -20000,
+            },
+        )
+
+    def test_pragmas_follow_the_setting(self):
+        with override_settings(SQLITE_PRAGMAS={"cache_size": -4000}):
+            sqlite.apply_pragmas(connection)
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA cache_size")
+            self.assertEqual(cursor.fetchone()[0], -4000)
+        with override_settings(SQLITE_PRAGMAS={"cache_size": "1; DROP TABLE booking_booking"}):
+            with self.assertRaises(ImproperlyConfigured):
+                sqlite.apply_pragmas(connection)
+
+    def test_journal_mode_is_only_set_when_it_differs(self):
+        with CaptureQueriesContext(connection) as queries:
+            sqlite.apply_pragmas(connection)
+        statements = [query["sql"] for query in queries.captured_queries]
+        # One read for the journal mode, one statement per per-connection PRAGMA.
+        self.assertEqual(len(statements), 5)
+        self.assertIn("PRAGMA journal_mode", statements)
+        self.assertNotIn("PRAGMA journal_mode = wal", statements)
+
+    def test_atomic_blocks_take_the_write_lock_at_begin(self):
+        other = sqlite3.connect(connection.settings_dict["NAME"], timeout=0, isolation_level=None)
+        try:
+            with transaction.atomic():
+                Chef.objects.exists()
+                with self.assertRaisesMessage(sqlite3.OperationalError, "locked"):
+                    other.execute("BEGIN IMMEDIATE")
+            other.execute("BEGIN IMMEDIATE")
+            other.execute("ROLLBACK")
+        finally:
+            other.close()
+
+
+@override_settings(REPLICA_DATABASE="replica")
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        self.chef = make_chef("replica_chef", "Replica Chef")
+        self.customer = User.objects.create_user(username="replica_customer")
+        self.client.force_login(self.customer)
+        call_command("sync_replica", stdout=StringIO())
+
+    def test_safe_requests_read_the_replica(self):
+        make_chef("late_chef", "Late Chef")
+        self.assertNotContains(self.client.get(reverse("chef_list")), "Late Chef")
+
+        call_command("sync_replica", stdout=StringIO())
+        self.assertContains(self.client.get(reverse("chef_list")), "Late Chef")
+
+    def test_a_post_keeps_the_browser_on_the_primary_for_a_while(self):
+        day = (timezone.now() + timedelta(days=3)).date().isoformat()
+        response = self.client.post(
+            reverse("book_chef", args=[self.chef.pk]), {"date": day, "time": "19:00", "person": "2"}
+        )
+        self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertContains(self.client.get(reverse("dashboard")), "Replica Chef")
+
+        # Once the window is over, reads go back to the lagging replica.
+        self.client.cookies[STICKY_COOKIE] = "0"
+        self.assertNotContains(self.client.get(reverse("dashboard")), "Replica Chef")
+        call_command("sync_replica", stdout=StringIO())
+        self.assertContains(self.client.get(reverse("dashboard")), "Replica Chef")
+
+    def test_cached_cards_are_never_filled_from_the_lagging_replica(self):
+        self.client.get(reverse("chef_list"))
+        self.chef.specialty = "Mughlai"
+        self.chef.save()
+
+        # Another browser reads the list from the replica, which still has the
+        # old specialty; the card it caches must not.
+        self.assertContains(self.client.get(reverse("chef_list")), "Mughlai")
+        chef_client = Client()
+        chef_client.force_login(self.chef.user)
+        chef_client.cookies[STICKY_COOKIE] = str(time_module.time() + 60)
+        self.assertContains(chef_client.get(reverse("chef_list")), "Mughlai")
+
+    def test_calendars_are_never_filled_from_the_lagging_replica(self):
+        when = timezone.now() + timedelta(days=40)
+        make_booking(self.customer, self.chef, when)
+        response = self.client.get(
+            reverse("chef_availability", args=[self.chef.pk]), {"month": when.strftime("%Y-%m")}
+        )
+        self.assertIn(when.date().isoformat(), {day["date"] for day in response.json()["days"] if day["status"] == "busy"})
+
+    def test_reads_after_a_write_in_the_same_block_use_the_primary(self):
+        router = routers.PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Chef), "default")
+        with routers.reads_from_replica() as state:
+            self.assertEqual(router.db_for_read(Chef), "replica")
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Chef), "default")
+            Chef.objects.filter(pk=self.chef.pk).update(experience=9)
+            self.assertEqual(router.db_for_read(Chef), "default")
+            self.assertEqual(Chef.objects.get(pk=self.chef.pk).experience, 9)
+        self.assertTrue(state.wrote)
+
+    def test_everything_stays_on_the_primary_without_a_replica(self):
+        make_chef("late_chef", "Late Chef")
+        with override_settings(REPLICA_DATABASE=None):
+            response = self.client.get(reverse("chef_list"))
+        self.assertContains(response, "Late Chef")
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Three of everything, so a per-row query shows up as a blown budget."""
+
+    budget_urlconf = "chef_booking.urls"
+    query_budgets = {
+        "about": 4,
+        "become_chef": 6,
+        "blog_detail": 1,
+        "blog_list": 1,
+        "book_chef": 5,
+        "chef_availability": 4,
+        "chef_list": 5,
+        "clear_past_bookings": 8,
+        "dashboard": 9,
+        "delete_work_image": 6,
+        "edit_profile": 4,
+        "home": 0,
+        "login": 0,
+        "profile_detail": 8,
+        # The view takes no booking or review arguments, so this route fails.
+        "profile_detail_with_review": None,
+        "remove_booking": 8,
+        "signup": 0,
+        "submit_contact_query": 14,
+        "update_booking_status": 8,
+        "update_work_image": 7,
+        "upload_work_images": 7,
+        "user_profile": 2,
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user(username="budget_customer")
+        chefs = [make_chef(f"budget_chef{i}", f"Budget Chef {i}", image=f"chef_dishes/{i}.jpg") for i in range(3)]
+        bookings = [
+            make_booking(self.customer, chef, timezone.now() + timedelta(days=days))
+            for chef in chefs
+            for days in (-40, 3)
+        ]
+        for i in range(3):
+            BlogPost.objects.create(
+                title=f"Post {i}", image=f"blog_images/{i}.jpg", content="...", author=self.customer
+            )
+            WorkImage.objects.create(profile=chefs[0].user.profile, image=f"work_images/{i}.jpg")
+        chef, booking = chefs[0], bookings[1]
+        owner = chef.user.username
+        work_image = chef.user.profile.work_images.first()
+        self.budget_user = self.customer
+        self.budget_requests = {
+            "blog_detail": {"args": [BlogPost.objects.first().pk], "user": None},
+            "blog_list": {"user": None},
+            "book_chef": {"args": [chef.pk]},
+            "chef_availability": {"args": [chef.pk]},
+            "clear_past_bookings": {"method": "post"},
+            "dashboard": {"user": chef.user},
+            "delete_work_image": {"args": [owner, work_image.pk], "method": "post", "user": chef.user},
+            "home": {"user": None},
+            "login": {"user": None},
+            "profile_detail": {"args": [owner]},
+            "remove_booking": {"args": [bookings[0].pk], "method": "post"},
+            "signup": {"user": None},
+            "submit_contact_query": {
+                "method": "post",
+                "data": {
+                    "name": "Asha",
+                    "email": "asha@example.com",
+                    "phone_number": "9999999999",
+                    "address": "1 Road",
+                    "city": "Pune",
+                    "message": "Hi",
+                },
+                "user": None,
+            },
+            "update_booking_status": {"args": [booking.pk, "Accepted"], "user": chef.user},
+            "update_work_image": {"args": [owner, work_image.pk], "method": "post", "user": chef.user},
+            "upload_work_images": {"args": [owner], "user": chef.user},
+        }
+
+    def test_every_page_stays_within_its_query_budget(self):
+        self.assertUrlsWithinQueryBudgets()
+
+    def test_going_over_budget_lists_the_queries(self):
+        self.client.force_login(self.customer)
+        with self.assertRaisesMessage(AssertionError, "GET /chefs/ ran 5 queries, over its budget of 4:"):
+            self.assertQueryBudget(4, "get", reverse("chef_list"))
+
+    def test_responses_carry_query_metrics(self):
+        self.client.force_login(self.customer)
+        response = self.client.get(reverse("chef_list"))
+        self.assertEqual(response["X-DB-Query-Count"], "5")
+        self.assertGreater(float(response["X-DB-Time-Ms"]), 0)
+        self.assertTrue(response["X-DB-Slowest-SQL"].startswith("SELECT"))
@@ -0,0 +1,77 @@
+from collections import namedtuple
+
+from django.db.models import F
+
+from . import audit, availability, outbox
+from .models import Booking, BookingEvent, Chef
+
+# Rejecting frees the slot for other customers. Reopening a rejected booking
+# (e.g. to undo a mistaken cancel) takes it back, so it is only applied while
+# the slot is still free.
+TRANSITIONS = {
+    "Pending": {"Accepted", "Rejected"},
+    "Accepted": {"Pending", "Rejected"},
+    "Rejected": {"Pending", "Accepted"},
+}
+
+APPLIED = "applied"
+UNCHANGED = "unchanged"
+CONFLICT = "conflict"
+NOT_ALLOWED = "not_allowed"
+SLOT_TAKEN = "slot_taken"
+
+
+TransitionResult = namedtuple("TransitionResult", ["outcome", "status", "version"])
+
+
+def parse_version(value):
+    try:
+        version = int(value)
+    except (TypeError, ValueError):
+        return None
+    return version if version >= 0 else None
+
+
+def transition(booking, status, expected_version=None, actor=None, source=audit.SOURCE_ADMIN):
+    """
+    Move ``booking`` to ``status`` with a single conditional UPDATE instead of
+    a locked read-modify-write. ``expected_version`` is the version the user
+    acted on (defaults to the one loaded); if anyone changed the booking
+    since, nothing is written and the result is CONFLICT with the current
+    status and version. On success the instance is updated in place, and the
+    BookingEvent and customer notification are written in the same
+    transaction. Moving a booking back onto the calendar re-checks its slot
+    under the same per-chef lock as book_slot and returns SLOT_TAKEN when
+    another booking has it by now.
+    """
+    version = booking.version if expected_version is None else expected_version
+    if version != booking.version:
+        return TransitionResult(CONFLICT, booking.status, booking.version)
+    if status == booking.status:
+        return TransitionResult(UNCHANGED, booking.status, booking.version)
+    if status not in TRANSITIONS.get(booking.status, ()):
+        return TransitionResult(NOT_ALLOWED, booking.status, booking.version)
+
+    previous = booking.status
+    reopening = status in availability.BLOCKING_STATUSES and previous not in availability.BLOCKING_STATUSES
+    with audit.batch():
+        if reopening:
+            Chef.objects.filter(pk=booking.chef_id).update(schedule_version=F("schedule_version") + 1)
+            overlapping = availability.overlapping_bookings(booking.chef_id, booking.scheduled_at, booking.ends_at)
+            if overlapping.exclude(pk=booking.pk).exists():
+                return TransitionResult(SLOT_TAKEN, booking.status, booking.version)
+        updated = Booking.all_objects.filter(
+            pk=booking.pk, version=version, status=previous, is_deleted=False
+        ).update(status=status, version=F("version") + 1)
+        if updated:
+            booking.status = status
+            booking.version = version + 1
+            audit.record(booking.pk, BookingEvent.KIND_STATUS, source, actor, previous, status)
+            outbox.booking_status_changed(booking)
+    if not updated:
+        current = Booking.all_objects.filter(pk=booking.pk).values_list("status", "version").first()
+        return TransitionResult(CONFLICT, *(current or (None, None)))
+
+    # .update() skips post_save, so clear what the signal handlers would.
+    availability.invalidate_calendar(booking.chef_id, booking.date)
+    return TransitionResult(APPLIED, booking.status, booking.version)
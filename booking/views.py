@@ -1,16 +1,25 @@
+import hashlib
+import uuid
 from datetime import date as dt_date
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
-from django.http import HttpResponseBadRequest
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
-from django.views.decorators.http import require_POST
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET, require_POST
 
 from accounts.models import Profile
-from .forms import ChefForm, ContactQueryForm
+from . import audit, availability, outbox, search, transitions
+from .caching import cached_blog_page, chef_cards
+from .dashboard import build_dashboard
+from .forms import ChefFilterForm, ChefForm, ContactQueryForm
 from .models import BlogPost, Booking, Chef
+from .pagination import KeysetPaginator, RankedPaginator
+from .signals import bookings_archived
 
 
 def home(request):
@@ -26,7 +35,8 @@ def about(request):
 def submit_contact_query(request):
     form = ContactQueryForm(request.POST)
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            outbox.contact_query_received(form.save())
         messages.success(request, "Message sent successfully.")
         return redirect("about")
 
@@ -34,11 +44,13 @@ def submit_contact_query(request):
     return render(request, "booking/about.html", {"contact_form": form}, status=400)
 
 
+@cached_blog_page
 def blog_list(request):
     posts = BlogPost.objects.select_related("author").filter(is_published=True).order_by("-created_at")
     return render(request, "booking/blog_list.html", {"posts": posts})
 
 
+@cached_blog_page
 def blog_detail(request, pk):
     post = get_object_or_404(
         BlogPost.objects.select_related("author").filter(is_published=True),
@@ -47,22 +59,51 @@ def blog_detail(request, pk):
     return render(request, "booking/blog_detail.html", {"post": post})
 
 
+CHEF_PAGE_SIZE = 12
+CHEF_SORTS = {
+    "newest": ("-id",),
+    "price_low": ("price_per_person", "id"),
+    "price_high": ("-price_per_person", "-id"),
+    "experience": ("-experience", "-id"),
+}
+
+
 @login_required
 def chef_list(request):
-    query = request.GET.get("q", "").strip()
-    chefs = Chef.objects.select_related("user", "user__profile").all()
-    if query:
-        chefs = chefs.filter(
-            Q(name__icontains=query)
-            | Q(specialty__icontains=query)
-            | Q(experience__icontains=query)
-        )
+    form = ChefFilterForm(request.GET)
+    chefs = form.filter_queryset(Chef.objects.select_related("user", "user__profile"))
+    query = form.cleaned_data.get("q", "").strip()
+    sort = form.cleaned_data.get("sort", "")
+    cursor = request.GET.get("cursor")
+
+    ranked_ids = None
+    if query and not sort:
+        # "Recommended": the best SEARCH_RESULT_LIMIT hits among the chefs
+        # that pass the filters, in rank order.
+        ranked_ids = search.search_chef_ids(query, within=chefs if chefs.query.has_filters() else None)
+        if ranked_ids is None:
+            chefs = search.like_filter(chefs, query)
+    elif query:
+        # Any other sort needs every match, not just the best-ranked ones.
+        matching = search.filter_matching(chefs, query)
+        chefs = search.like_filter(chefs, query) if matching is None else matching
+
+    if ranked_ids is not None:
+        page = RankedPaginator(chefs, ranked_ids, CHEF_PAGE_SIZE).get_page(cursor)
+    else:
+        page = KeysetPaginator(chefs, CHEF_SORTS.get(sort, CHEF_SORTS["newest"]), CHEF_PAGE_SIZE).get_page(cursor)
+
+    cards = chef_cards(page.object_list)
+    for chef in page:
+        chef.card_html = cards[chef.pk]
 
     return render(
         request,
         "booking/chef_list.html",
         {
-            "chefs": chefs,
+            "chefs": page,
+            "page_obj": page,
+            "filter_form": form,
             "query": query,
         },
     )
@@ -70,48 +111,7 @@ def chef_list(request):
 
 @login_required
 def dashboard(request):
-    now = timezone.now()
-    current_date = now.date()
-    current_time = now.time().replace(microsecond=0)
-    past_bookings_q = Q(date__lt=current_date) | Q(date=current_date, time__lt=current_time)
-
-    customer_bookings = (
-        Booking.objects.select_related("chef", "chef__user")
-        .filter(customer=request.user)
-        .exclude(past_bookings_q)
-        .order_by("-date", "-time")
-    )
-    customer_past_bookings = (
-        Booking.objects.select_related("chef", "chef__user")
-        .filter(customer=request.user)
-        .filter(past_bookings_q)
-        .order_by("-date", "-time")
-    )
-    chef_bookings = (
-        Booking.objects.select_related("customer", "chef")
-        .filter(chef__user=request.user)
-        .exclude(past_bookings_q)
-        .order_by("-date", "-time")
-    )
-    chef_past_bookings = (
-        Booking.objects.select_related("customer", "chef")
-        .filter(chef__user=request.user)
-        .filter(past_bookings_q)
-        .order_by("-date", "-time")
-    )
-    pending_count = chef_bookings.filter(status="Pending").count()
-
-    return render(
-        request,
-        "booking/dashboard.html",
-        {
-            "bookings": chef_bookings,
-            "past_bookings": chef_past_bookings,
-            "cos_bookings": customer_bookings,
-            "past_cos_bookings": customer_past_bookings,
-            "pending_count": pending_count,
-        },
-    )
+    return render(request, "booking/dashboard.html", build_dashboard(request.user, request.GET))
 
 
 @login_required
@@ -126,9 +126,21 @@ def update_booking_status(request, booking_id, status):
         messages.error(request, "Invalid booking status.")
         return redirect("dashboard")
 
-    booking.status = status
-    booking.save(update_fields=["status"])
-    messages.success(request, f"Booking marked as {status.lower()}.")
+    result = transitions.transition(
+        booking,
+        status,
+        transitions.parse_version(request.GET.get("version")),
+        actor=request.user,
+        source=audit.SOURCE_CHEF,
+    )
+    if result.outcome == transitions.CONFLICT:
+        messages.error(request, f"This booking was changed in the meantime and is now {(result.status or 'deleted').lower()}.")
+    elif result.outcome == transitions.NOT_ALLOWED:
+        messages.error(request, f"A {booking.status.lower()} booking cannot be marked as {status.lower()}.")
+    elif result.outcome == transitions.SLOT_TAKEN:
+        messages.error(request, "That time has been booked by someone else since this booking was rejected.")
+    else:
+        messages.success(request, f"Booking marked as {status.lower()}.")
     return redirect("dashboard")
 
 
@@ -143,7 +155,9 @@ def remove_booking(request, booking_id):
     if not booking.is_past:
         return HttpResponseBadRequest("Only past bookings can be removed from the list.")
 
-    booking.soft_delete(by_user=request.user)
+    with audit.batch():
+        booking.soft_delete(by_user=request.user)
+        audit.record_deleted([booking.pk], audit.SOURCE_CUSTOMER, request.user)
     messages.success(request, "Booking removed from your list.")
     return redirect("dashboard")
 
@@ -152,15 +166,13 @@ def remove_booking(request, booking_id):
 @require_POST
 def clear_past_bookings(request):
     now = timezone.now()
-    current_date = now.date()
-    current_time = now.time().replace(microsecond=0)
-    past_bookings_q = Q(date__lt=current_date) | Q(date=current_date, time__lt=current_time)
-
-    updated = (
-        Booking.objects.filter(customer=request.user)
-        .filter(past_bookings_q)
-        .update(is_deleted=True, deleted_at=now, deleted_by_id=request.user.id)
-    )
+    with audit.batch():
+        ids = list(Booking.objects.filter(customer=request.user).past(now).values_list("pk", flat=True))
+        updated = Booking.objects.filter(pk__in=ids).update(
+            is_deleted=True, deleted_at=now, deleted_by_id=request.user.id
+        )
+        audit.record_deleted(ids, audit.SOURCE_CUSTOMER, request.user)
+    bookings_archived.send(sender=Booking, count=updated)
     if updated:
         messages.success(request, f"{updated} past booking(s) removed from your list.")
     else:
@@ -176,32 +188,78 @@ def book_chef(request, chef_id):
         return redirect("chef_list")
 
     if request.method == "POST":
-        booking_date = request.POST.get("date")
-        booking_time = request.POST.get("time")
+        try:
+            booking_date = Booking._meta.get_field("date").to_python(request.POST.get("date"))
+            booking_time = Booking._meta.get_field("time").to_python(request.POST.get("time"))
+        except ValidationError:
+            booking_date = booking_time = None
+        try:
+            idempotency_key = Booking._meta.get_field("idempotency_key").to_python(
+                request.POST.get("idempotency_key") or None
+            )
+        except ValidationError:
+            idempotency_key = None
         persons = int(request.POST.get("person", "0"))
 
+        if not booking_date or not booking_time:
+            messages.error(request, "Please choose a valid date and time.")
+            return redirect("book_chef", chef_id=chef.id)
+
         if persons < 1:
             messages.error(request, "Please select at least one guest.")
             return redirect("book_chef", chef_id=chef.id)
 
-        if booking_date and booking_date < dt_date.today().isoformat():
+        if booking_date < dt_date.today():
             messages.error(request, "Booking date cannot be in the past.")
             return redirect("book_chef", chef_id=chef.id)
 
         total_price = chef.price_per_person * persons
 
-        Booking.objects.create(
-            customer=request.user,
-            chef=chef,
-            date=booking_date,
-            time=booking_time,
-            person=persons,
-            total_price=total_price,
-            status="Pending",
-        )
+        try:
+            availability.book_slot(
+                chef,
+                request.user,
+                booking_date,
+                booking_time,
+                idempotency_key=idempotency_key,
+                person=persons,
+                total_price=total_price,
+                status="Pending",
+            )
+        except availability.SlotUnavailable:
+            messages.error(request, f"{chef.name} is already booked around that time. Please choose another slot.")
+            return redirect("book_chef", chef_id=chef.id)
+        # A replayed submission lands here too, with the original booking.
         messages.success(request, "Booking request submitted successfully.")
         return redirect("dashboard")
-    return render(request, "booking/book_chef.html", {"chef": chef})
+    return render(request, "booking/book_chef.html", {"chef": chef, "idempotency_key": uuid.uuid4()})
+
+
+@login_required
+@require_GET
+def chef_availability(request, chef_id):
+    month = request.GET.get("month") or timezone.now().strftime("%Y-%m")
+    try:
+        year, month_number = (int(part) for part in month.split("-"))
+        dt_date(year, month_number, 1)
+    except ValueError:
+        return HttpResponseBadRequest("month must be YYYY-MM.")
+    if year not in availability.CALENDAR_YEARS:
+        return HttpResponseBadRequest("month is out of range.")
+
+    calendar = availability.month_calendar(chef_id, year, month_number)
+    if calendar is None:
+        raise Http404("Chef not found.")
+
+    response = JsonResponse(calendar)
+    etag = f'"{hashlib.md5(response.content, usedforsecurity=False).hexdigest()}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        response = not_modified
+    response["ETag"] = etag
+    # Let browsers keep the calendar but revalidate it on every use.
+    patch_cache_control(response, no_cache=True)
+    return response
 
 
 @login_required
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,6 +39,9 @@ ALLOWED_HOSTS = [
 # settings.py (development only)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# Addresses notified of new contact queries (delivered by `manage.py send_outbox`).
+CONTACT_NOTIFICATION_EMAILS = []
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -75,8 +79,12 @@ LOGIN_URL = 'login'
 
 
 MIDDLEWARE = [
+    # First, so the numbers include every other middleware's queries.
+    'booking.middleware.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Outside the session middleware, so saving the session counts as a write.
+    'booking.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,6 +93,21 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# X-DB-* query headers and per-request log lines (booking.middleware); they
+# expose SQL, so keep them to development.
+QUERY_METRICS = DEBUG
+# Requests running more queries than this are logged as warnings.
+QUERY_METRICS_WARN_COUNT = 30
+
+# Print the per-request query lines to the console while DEBUG is on.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {'require_debug_true': {'()': 'django.utils.log.RequireDebugTrue'}},
+    'handlers': {'dev_console': {'class': 'logging.StreamHandler', 'filters': ['require_debug_true']}},
+    'loggers': {'booking.middleware': {'handlers': ['dev_console'], 'level': 'INFO', 'propagate': False}},
+}
+
 ROOT_URLCONF = 'chef_booking.urls'
 
 TEMPLATES = [
@@ -115,10 +138,81 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # Atomic blocks take the write lock at BEGIN, so a transaction that
+        # reads before it writes cannot fail mid-way on a lock upgrade.
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        # Reuse connections across requests instead of reopening the file and
+        # re-running SQLITE_PRAGMAS for each one.
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        # A file-backed test database gives concurrency tests real SQLite
+        # locking instead of the shared in-memory cache's table locks.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    },
+    # Read-only copy for safe requests. Locally it is a second SQLite file
+    # refreshed from the primary by `python manage.py sync_replica`.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'NAME': BASE_DIR / 'test_db_replica.sqlite3'},
+    },
+}
+
+DATABASE_ROUTERS = ['booking.routers.PrimaryReplicaRouter']
+
+# Alias that safe requests read from; None keeps every query on the primary.
+# Set it to 'replica' once that database is being kept in sync.
+REPLICA_DATABASE = None
+
+# How long a browser keeps reading from the primary after it wrote something.
+# Must exceed the replica's lag for users to always see their own changes.
+REPLICA_STICKY_SECONDS = 5
+
+
+# Applied in order to every new SQLite connection (booking.sqlite). WAL lets
+# readers and the single writer proceed together; busy_timeout comes first so
+# switching the journal mode waits out other connections instead of failing.
+
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,  # ms
+    'journal_mode': 'wal',
+    'synchronous': 'normal',  # with WAL, only a power loss can lose the last commits
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,  # negative means KiB, so about 20 MB per connection
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Chef cards take two entries per chef (version + fragment), well past the
+# default 300-entry limit, which would evict them faster than they are reused.
+
+# One cache shared by every process (gunicorn workers, run_worker), so an
+# invalidation made in one is seen by all. Deployments set REDIS_URL. The
+# file-based fallback needs no server but lists its whole directory on every
+# write, so it is kept small and is meant for development only.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / '.cache' / 'default',
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        }
+    }
+
+# Tests run against an empty cache of their own, as they do a database.
+TEST_RUNNER = 'booking.test_runner.ScratchCacheRunner'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -162,3 +256,7 @@ BOOKING_RETENTION_DAYS = 30
 # Backward-compatible generic keys for cleanup modules.
 CLEANUP_ENABLED = BOOKING_CLEANUP_ENABLED
 RETENTION_DAYS = BOOKING_RETENTION_DAYS
+
+# Soft-deleted bookings older than this move to the BookingArchive table
+# (see `manage.py archive_bookings`).
+BOOKING_ARCHIVE_AFTER_DAYS = 30
@@ -20,6 +20,7 @@ urlpatterns = [
     path('chefs/', booking_views.chef_list, name='chef_list'),
     path('dashboard/', booking_views.dashboard, name='dashboard'),
     path('book/<int:chef_id>/', booking_views.book_chef, name='book_chef'),
+    path('chefs/<int:chef_id>/availability/', booking_views.chef_availability, name='chef_availability'),
     path('bookings/remove/<int:booking_id>/', booking_views.remove_booking, name='remove_booking'),
     path('bookings/clear-past/', booking_views.clear_past_bookings, name='clear_past_bookings'),
 
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CustomAdminConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'custom_admin'
+
+    def ready(self):
+        import custom_admin.signals  # noqa: F401
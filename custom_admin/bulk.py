@@ -0,0 +1,86 @@
+from django.db.models import F
+from django.utils import timezone
+
+from booking import audit, availability, contact_search, outbox
+from booking.caching import blog_version_batch, bump_blog_version_on_commit
+from booking.models import BlogPost, Booking, BookingArchive, BookingEvent, ContactQuery
+from booking.signals import bookings_archived
+
+from . import counters
+
+# Upper bound on ids per request, well under SQLite's bound-parameter limit.
+MAX_SELECTION = 1000
+CANCELLABLE_STATUSES = ("Pending", "Accepted")
+
+
+def selected_ids(request):
+    ids = []
+    for value in request.POST.getlist("ids")[:MAX_SELECTION]:
+        try:
+            ids.append(int(value))
+        except ValueError:
+            continue
+    return ids
+
+
+def cancel_bookings(ids, actor):
+    """Reject every selected active booking that is still pending or accepted."""
+    with audit.batch():
+        bookings = list(
+            Booking.all_objects.select_related("customer", "chef").filter(
+                pk__in=ids, is_deleted=False, status__in=CANCELLABLE_STATUSES
+            )
+        )
+        updated = Booking.all_objects.filter(
+            pk__in=[booking.pk for booking in bookings], is_deleted=False, status__in=CANCELLABLE_STATUSES
+        ).update(status="Rejected", version=F("version") + 1)
+        for booking in bookings:
+            audit.record(booking.pk, BookingEvent.KIND_STATUS, audit.SOURCE_ADMIN, actor, booking.status, "Rejected")
+            booking.status = "Rejected"
+        outbox.bookings_status_changed(bookings)
+    availability.invalidate_calendars(bookings)
+    return updated
+
+
+def soft_delete_bookings(ids, actor):
+    with audit.batch():
+        bookings = list(Booking.all_objects.filter(pk__in=ids, is_deleted=False).only("pk", "chef_id", "date"))
+        updated = Booking.all_objects.filter(pk__in=[booking.pk for booking in bookings], is_deleted=False).update(
+            is_deleted=True, deleted_at=timezone.now(), deleted_by=actor
+        )
+        audit.record_deleted([booking.pk for booking in bookings], audit.SOURCE_ADMIN, actor)
+        bookings_archived.send(sender=Booking, count=updated)
+    availability.invalidate_calendars(bookings)
+    return updated
+
+
+def hard_delete_bookings(ids):
+    """Permanently delete selected bookings that are soft-deleted or archived."""
+    with counters.batch():
+        deleted, _ = Booking.all_objects.filter(pk__in=ids, is_deleted=True).delete()
+        archived, _ = BookingArchive.objects.filter(pk__in=ids).delete()
+    return deleted + archived
+
+
+def set_blogs_published(ids, published):
+    with counters.batch():
+        updated = BlogPost.objects.filter(pk__in=ids, is_published=not published).update(is_published=published)
+        counters.adjust("published_blog_count", updated if published else -updated)
+    if updated:
+        bump_blog_version_on_commit()
+    return updated
+
+
+def delete_blogs(ids):
+    # Each deleted row's post_delete asks for a bump; the batch makes it one.
+    with blog_version_batch(), counters.batch():
+        deleted, _ = BlogPost.objects.filter(pk__in=ids).delete()
+    return deleted
+
+
+def delete_contact_queries(ids):
+    with counters.batch():
+        updated = ContactQuery.objects.filter(pk__in=ids, is_deleted=False).update(is_deleted=True)
+        counters.adjust("contact_queries_count", -updated)
+        contact_search.remove_queries(ids)
+    return updated
@@ -0,0 +1,78 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import Profile
+from booking.models import BlogPost, Booking, Chef, ContactQuery
+
+from .models import DashboardCounter
+
+# Counter name -> exact (slow) query used for reconciliation. Names double as
+# the dashboard template context keys.
+COUNTER_SOURCES = {
+    "chefs_count": lambda: Chef.objects.all(),
+    "bookings_count": lambda: Booking.objects.all(),
+    "users_count": lambda: Profile.objects.all(),
+    "blog_count": lambda: BlogPost.objects.all(),
+    "published_blog_count": lambda: BlogPost.objects.filter(is_published=True),
+    "contact_queries_count": lambda: ContactQuery.objects.filter(is_deleted=False),
+}
+
+
+_state = threading.local()
+
+
+@contextmanager
+def batch():
+    """
+    Collect adjust() calls made inside the block (e.g. by per-row delete
+    signals) and apply them as one UPDATE per counter when it succeeds.
+    """
+    if getattr(_state, "pending", None) is not None:
+        yield
+        return
+    _state.pending = pending = {}
+    try:
+        with transaction.atomic():
+            yield
+            _state.pending = None
+            for name, delta in pending.items():
+                adjust(name, delta)
+    finally:
+        _state.pending = None
+
+
+def adjust(name, delta):
+    if not delta:
+        return
+    pending = getattr(_state, "pending", None)
+    if pending is not None:
+        pending[name] = pending.get(name, 0) + delta
+        return
+    updated = DashboardCounter.objects.filter(name=name).update(
+        value=F("value") + delta, updated_at=timezone.now()
+    )
+    if not updated:
+        # First write since the row was lost: recompute instead of guessing.
+        reconcile([name])
+
+
+def read_all():
+    values = dict(DashboardCounter.objects.filter(name__in=COUNTER_SOURCES).values_list("name", "value"))
+    missing = [name for name in COUNTER_SOURCES if name not in values]
+    if missing:
+        values.update(reconcile(missing))
+    return values
+
+
+def reconcile(names=None):
+    """Recompute counters from their source tables and return the exact values."""
+    results = {}
+    for name in names or COUNTER_SOURCES:
+        exact = COUNTER_SOURCES[name]().count()
+        DashboardCounter.objects.update_or_create(name=name, defaults={"value": exact})
+        results[name] = exact
+    return results
@@ -0,0 +1,53 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from booking import archive
+
+CHUNK_SIZE = 2000
+# (header, lookup) for every exported column. Rows are fetched as plain
+# tuples, so the export never builds model instances.
+EXPORT_COLUMNS = [
+    ("id", "pk"),
+    ("customer", "customer__username"),
+    ("chef", "chef__name"),
+    ("scheduled_at", "scheduled_at"),
+    ("date", "date"),
+    ("time", "time"),
+    ("guests", "person"),
+    ("total_price", "total_price"),
+    ("status", "status"),
+    ("deleted_at", "deleted_at"),
+]
+HEADERS = [header for header, _ in EXPORT_COLUMNS]
+COLUMNS = [lookup for _, lookup in EXPORT_COLUMNS]
+
+
+def archived_rows(q=""):
+    return archive.archived_bookings(q, fields=COLUMNS)
+
+
+class _Echo:
+    """File-like object whose write() hands the line straight back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(HEADERS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows):
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for row in rows:
+        yield encoder.encode(dict(zip(HEADERS, row))) + "\n"
+
+
+FORMATS = {
+    "csv": ("text/csv", csv_lines),
+    "jsonl": ("application/x-ndjson", jsonl_lines),
+}
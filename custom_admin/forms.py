@@ -13,6 +13,7 @@ class ChefForm(forms.ModelForm):
             "experience",
             "team_members",
             "price_per_person",
+            "slot_minutes",
             "image",
         ]
         widgets = {
@@ -22,6 +23,7 @@ class ChefForm(forms.ModelForm):
             "experience": forms.NumberInput(attrs={"class": "form-control", "min": 0}),
             "team_members": forms.NumberInput(attrs={"class": "form-control", "min": 2}),
             "price_per_person": forms.NumberInput(attrs={"class": "form-control", "min": 0, "step": "0.01"}),
+            "slot_minutes": forms.NumberInput(attrs={"class": "form-control", "min": 30, "step": 15}),
             "image": forms.ClearableFileInput(attrs={"class": "form-control"}),
         }
 
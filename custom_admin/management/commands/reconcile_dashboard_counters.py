@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from custom_admin import counters
+from custom_admin.models import DashboardCounter
+
+
+class Command(BaseCommand):
+    help = "Recompute the admin dashboard counters from the source tables."
+
+    def handle(self, *args, **options):
+        previous = dict(DashboardCounter.objects.values_list("name", "value"))
+        for name, exact in counters.reconcile().items():
+            old = previous.get(name)
+            if old == exact:
+                self.stdout.write(f"{name}: {exact}")
+            else:
+                self.stdout.write(self.style.WARNING(f"{name}: {old} -> {exact}"))
+        self.stdout.write(self.style.SUCCESS("Dashboard counters reconciled."))
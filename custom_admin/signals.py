@@ -0,0 +1,87 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from accounts.models import Profile
+from booking.models import BlogPost, Booking, Chef, ContactQuery
+from booking.signals import bookings_archived
+
+from . import counters
+
+
+def _field_changed(instance, field, update_fields):
+    return update_fields is None or field in update_fields
+
+
+@receiver(post_save, sender=Chef)
+@receiver(post_save, sender=Profile)
+def count_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.adjust("chefs_count" if sender is Chef else "users_count", 1)
+
+
+@receiver(post_delete, sender=Chef)
+@receiver(post_delete, sender=Profile)
+def count_deleted(sender, instance, **kwargs):
+    counters.adjust("chefs_count" if sender is Chef else "users_count", -1)
+
+
+# Blog posts, bookings and contact queries are counted by a flag, so remember
+# the flag value each instance was loaded with to detect transitions on save.
+# __dict__ is read directly so deferred fields are not fetched.
+
+@receiver(post_init, sender=BlogPost)
+def remember_blog_state(sender, instance, **kwargs):
+    instance._counted_published = instance.__dict__.get("is_published")
+
+
+@receiver(post_save, sender=BlogPost)
+def count_blog_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.adjust("blog_count", 1)
+        counters.adjust("published_blog_count", 1 if instance.is_published else 0)
+    elif _field_changed(instance, "is_published", update_fields) and instance._counted_published is not None:
+        counters.adjust("published_blog_count", int(instance.is_published) - int(instance._counted_published))
+    instance._counted_published = instance.is_published
+
+
+@receiver(post_delete, sender=BlogPost)
+def count_blog_deleted(sender, instance, **kwargs):
+    counters.adjust("blog_count", -1)
+    if instance.is_published:
+        counters.adjust("published_blog_count", -1)
+
+
+@receiver(post_init, sender=Booking)
+@receiver(post_init, sender=ContactQuery)
+def remember_deleted_state(sender, instance, **kwargs):
+    instance._counted_deleted = instance.__dict__.get("is_deleted")
+
+
+def _active_counter(sender):
+    return "bookings_count" if sender is Booking else "contact_queries_count"
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_save, sender=ContactQuery)
+def count_active_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.adjust(_active_counter(sender), 0 if instance.is_deleted else 1)
+    elif _field_changed(instance, "is_deleted", update_fields) and instance._counted_deleted is not None:
+        counters.adjust(_active_counter(sender), int(instance._counted_deleted) - int(instance.is_deleted))
+    instance._counted_deleted = instance.is_deleted
+
+
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=ContactQuery)
+def count_active_deleted(sender, instance, **kwargs):
+    if not instance.is_deleted:
+        counters.adjust(_active_counter(sender), -1)
+
+
+@receiver(bookings_archived)
+def count_bookings_archived(sender, count, **kwargs):
+    counters.adjust("bookings_count", -count)
@@ -1,3 +1,632 @@
+import csv
+import json
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from booking import archive, audit, contact_search
+from booking.caching import BLOG_VERSION_KEY
+from booking.models import BlogPost, Booking, BookingArchive, BookingEvent, Chef, ContactQuery, OutboxMessage
+from booking.pagination import limited_count
+from booking.query_budget import QueryBudgetMixin
+
+from . import counters
+from .models import DashboardCounter
+
+User = get_user_model()
+
+
+class AdminTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", email="admin@example.com", password=None)
+        cls.chef_user = User.objects.create_user(username="chef")
+        cls.chef = Chef.objects.create(
+            user=cls.chef_user, name="Chef", specialty="Thai", experience=3, price_per_person=Decimal("400")
+        )
+        cls.customer = User.objects.create_user(username="customer")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def make_booking(self, days=1, **kwargs):
+        when = timezone.now() + timedelta(days=days)
+        return Booking.objects.create(
+            customer=self.customer,
+            chef=self.chef,
+            date=when.date(),
+            time=when.time().replace(microsecond=0),
+            person=2,
+            total_price=Decimal("800"),
+            **kwargs,
+        )
+
+    def assertCountersExact(self):
+        stored = counters.read_all()
+        exact = {name: source().count() for name, source in counters.COUNTER_SOURCES.items()}
+        self.assertEqual(stored, exact)
+
+
+class DashboardCounterTests(AdminTestCase):
+    def test_counters_follow_model_changes(self):
+        post = BlogPost.objects.create(title="Post", image="blog_images/x.jpg", content="...", author=self.admin)
+        booking = self.make_booking()
+        query = ContactQuery.objects.create(name="A", email="a@example.com", message="Hello")
+        self.assertCountersExact()
+
+        post.is_published = False
+        post.save(update_fields=["is_published"])
+        booking.soft_delete(by_user=self.admin)
+        query.is_deleted = True
+        query.save(update_fields=["is_deleted"])
+        self.assertCountersExact()
+
+        post.delete()
+        Booking.all_objects.get(pk=booking.pk).delete()
+        self.chef_user.delete()
+        self.assertCountersExact()
+
+    def test_bulk_soft_delete_is_counted(self):
+        self.make_booking(days=-40)
+        self.make_booking(days=-35)
+        self.make_booking(days=3)
+        call_command("cleanup_past_bookings", retention_days=30, stdout=StringIO())
+        self.assertEqual(counters.read_all()["bookings_count"], 1)
+        self.assertCountersExact()
+
+    def test_reconcile_command_fixes_drift(self):
+        counters.read_all()
+        DashboardCounter.objects.filter(name="chefs_count").update(value=99)
+        out = StringIO()
+        call_command("reconcile_dashboard_counters", stdout=out)
+        self.assertIn("chefs_count: 99 -> 1", out.getvalue())
+        self.assertCountersExact()
+
+    def test_dashboard_reads_counters_in_one_query(self):
+        counters.read_all()
+        response = self.client.get(reverse("custom_admin:dashboard"))
+        self.assertEqual(response.context["chefs_count"], 1)
+        with self.assertNumQueries(1):
+            counters.read_all()
+
+
+class BookingArchiveTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        self.active = self.make_booking(days=2)
+        self.recently_deleted = self.make_booking(days=-1)
+        self.recently_deleted.soft_delete(by_user=self.admin)
+        self.old = self.make_booking(days=-90, status="Rejected")
+        self.old.soft_delete(by_user=self.admin)
+        Booking.all_objects.filter(pk=self.old.pk).update(deleted_at=timezone.now() - timedelta(days=60))
+
+    def archive(self):
+        out = StringIO()
+        call_command("archive_bookings", older_than_days=30, stdout=out)
+        return out.getvalue()
+
+    def test_command_moves_only_old_soft_deleted_rows(self):
+        self.assertIn("Archived 1 booking(s).", self.archive())
+        self.assertFalse(Booking.all_objects.filter(pk=self.old.pk).exists())
+        archived = BookingArchive.objects.get()
+        self.assertEqual((archived.pk, archived.status, archived.deleted_by), (self.old.pk, "Rejected", self.admin))
+        self.assertEqual(set(Booking.all_objects.values_list("pk", flat=True)), {self.active.pk, self.recently_deleted.pk})
+
+    def test_archived_scope_reads_hot_and_archive_rows(self):
+        self.archive()
+        response = self.client.get(reverse("custom_admin:booking_list"), {"scope": "archived", "sort": "oldest"})
+        rows = list(response.context["bookings"])
+        self.assertEqual([b.pk for b in rows], [self.old.pk, self.recently_deleted.pk])
+        self.assertIsInstance(rows[0], BookingArchive)
+        self.assertContains(response, reverse("custom_admin:booking_hard_delete", args=[self.old.pk]))
+
+        response = self.client.get(reverse("custom_admin:booking_list"), {"scope": "archived", "q": "rejec"})
+        self.assertEqual([b.pk for b in response.context["bookings"]], [self.old.pk])
+
+    def test_view_and_hard_delete_archived_booking(self):
+        self.archive()
+        response = self.client.get(reverse("custom_admin:booking_view", args=[self.old.pk]))
+        self.assertContains(response, "Archived bookings cannot be updated.")
+
+        self.client.post(reverse("custom_admin:booking_hard_delete", args=[self.old.pk]))
+        self.assertFalse(BookingArchive.objects.exists())
+
+
+class BookingStatusTransitionTests(AdminTestCase):
+    def test_stale_form_reports_conflict_instead_of_overwriting(self):
+        booking = self.make_booking()
+        self.client.force_login(self.chef_user)
+        self.client.get(reverse("update_booking_status", args=[booking.pk, "Accepted"]), {"version": 0})
+
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse("custom_admin:booking_cancel", args=[booking.pk]), {"version": 0}, follow=True
+        )
+        self.assertContains(response, "was changed by someone else and is now Accepted")
+        booking.refresh_from_db()
+        self.assertEqual((booking.status, booking.version), ("Accepted", 1))
+
+        self.client.post(reverse("custom_admin:booking_cancel", args=[booking.pk]), {"version": 1})
+        booking.refresh_from_db()
+        self.assertEqual((booking.status, booking.version), ("Rejected", 2))
+
+    def test_a_mistaken_cancel_can_be_undone(self):
+        booking = self.make_booking()
+        self.client.post(reverse("custom_admin:booking_cancel", args=[booking.pk]), {"version": 0})
+        self.client.post(
+            reverse("custom_admin:booking_update_status", args=[booking.pk]), {"status": "Accepted", "version": 1}
+        )
+        booking.refresh_from_db()
+        self.assertEqual((booking.status, booking.version), ("Accepted", 2))
+
+    def test_reopening_is_refused_once_the_slot_is_taken(self):
+        booking = self.make_booking(status="Rejected")
+        Booking.objects.create(
+            customer=self.customer,
+            chef=self.chef,
+            date=booking.date,
+            time=booking.time,
+            person=2,
+            total_price=Decimal("800"),
+        )
+        response = self.client.post(
+            reverse("custom_admin:booking_update_status", args=[booking.pk]),
+            {"status": "Accepted", "version": 0},
+            follow=True,
+        )
+        self.assertContains(response, "another booking now holds its slot")
+        booking.refresh_from_db()
+        self.assertEqual((booking.status, booking.version), ("Rejected", 0))
+
+    def test_status_form_without_version_still_applies(self):
+        booking = self.make_booking()
+        self.client.post(reverse("custom_admin:booking_update_status", args=[booking.pk]), {"status": "Accepted"})
+        booking.refresh_from_db()
+        self.assertEqual((booking.status, booking.version), ("Accepted", 1))
+
+
+class BookingEventTests(AdminTestCase):
+    def test_status_paths_build_a_timeline(self):
+        day = (timezone.now() + timedelta(days=4)).date().isoformat()
+        self.client.force_login(self.customer)
+        self.client.post(reverse("book_chef", args=[self.chef.pk]), {"date": day, "time": "18:00", "person": "2"})
+        booking = Booking.objects.get()
+
+        self.client.force_login(self.chef_user)
+        self.client.get(reverse("update_booking_status", args=[booking.pk, "Accepted"]))
+        self.client.force_login(self.admin)
+        self.client.post(reverse("custom_admin:booking_cancel", args=[booking.pk]))
+        self.client.post(reverse("custom_admin:booking_delete", args=[booking.pk]))
+
+        with self.assertNumQueries(1):
+            events = [(e.kind, e.from_status, e.to_status, e.source, e.actor) for e in audit.timeline(booking.pk)]
+        self.assertEqual(
+            events,
+            [
+                ("created", "", "Pending", "customer", self.customer),
+                ("status", "Pending", "Accepted", "chef", self.chef_user),
+                ("status", "Accepted", "Rejected", "admin", self.admin),
+                ("deleted", "", "", "admin", self.admin),
+            ],
+        )
+        response = self.client.get(reverse("custom_admin:booking_view", args=[booking.pk]))
+        self.assertContains(response, "Pending &rarr; Accepted")
+
+    def test_cleanup_writes_events_in_one_insert_per_batch(self):
+        for days in (-40, -41, -42):
+            self.make_booking(days=days)
+        with CaptureQueriesContext(connection) as queries:
+            call_command("cleanup_past_bookings", retention_days=30, batch_size=2, stdout=StringIO())
+        inserts = [q["sql"] for q in queries.captured_queries if q["sql"].startswith('INSERT INTO "booking_bookingevent"')]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(BookingEvent.objects.filter(kind="deleted", source="cleanup").count(), 3)
+
+    def test_events_are_dropped_with_a_rolled_back_block(self):
+        booking = self.make_booking()
+        with self.assertRaises(RuntimeError), audit.batch():
+            audit.record(booking.pk, BookingEvent.KIND_DELETED, audit.SOURCE_ADMIN)
+            raise RuntimeError
+        self.assertFalse(BookingEvent.objects.exists())
+
+
+class BookingExportTests(AdminTestCase):
+    def export(self, **params):
+        response = self.client.get(reverse("custom_admin:booking_export"), params)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_csv_honours_scope_and_search(self):
+        upcoming = self.make_booking(days=2)
+        self.make_booking(days=-2, status="Accepted")
+        response, body = self.export(scope="upcoming")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn("attachment;", response["Content-Disposition"])
+        rows = list(csv.reader(body.splitlines()))
+        self.assertEqual(rows[0][:3], ["id", "customer", "chef"])
+        self.assertEqual([row[0] for row in rows[1:]], [str(upcoming.pk)])
+
+        _, body = self.export(scope="all", q="accepted", format="csv")
+        self.assertEqual(len(body.splitlines()), 2)
+
+    def test_jsonl_includes_archived_rows(self):
+        old = self.make_booking(days=-90)
+        old.soft_delete()
+        Booking.all_objects.filter(pk=old.pk).update(deleted_at=timezone.now() - timedelta(days=60))
+        call_command("archive_bookings", older_than_days=30, stdout=StringIO())
+        recent = self.make_booking(days=-1)
+        recent.soft_delete()
+
+        response, body = self.export(scope="archived", sort="oldest", format="jsonl")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row["id"] for row in rows], [old.pk, recent.pk])
+        self.assertEqual(rows[0]["customer"], "customer")
+        self.assertEqual(rows[0]["total_price"], "800.00")
+
+    def test_query_metrics_count_the_streamed_rows(self):
+        for days in range(5):
+            self.make_booking(days=days + 1)
+        with self.assertLogs("booking.middleware", "INFO") as logs:
+            response, body = self.export(scope="all", format="csv")
+        self.assertEqual(len(body.splitlines()), 6)
+        self.assertEqual(response["X-DB-Partial"], "streamed")
+        # The log line is written once the stream closes and includes the
+        # row query, which ran after the headers were sent.
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn(f"{int(response['X-DB-Query-Count']) + 1} queries", logs.output[0])
+
+    def seed(self, start, stop):
+        now = timezone.now().replace(microsecond=0)
+        Booking.objects.bulk_create(
+            [
+                Booking(
+                    customer=self.customer,
+                    chef=self.chef,
+                    date=(now + timedelta(minutes=i)).date(),
+                    time=(now + timedelta(minutes=i)).time(),
+                    scheduled_at=now + timedelta(minutes=i),
+                    ends_at=now + timedelta(minutes=i + 180),
+                    person=2,
+                    total_price=Decimal("800"),
+                )
+                for i in range(start, stop)
+            ],
+            batch_size=5000,
+        )
+
+    def traced_export(self):
+        response = self.client.get(reverse("custom_admin:booking_export"), {"scope": "all", "format": "jsonl"})
+        tracemalloc.start()
+        try:
+            lines = size = 0
+            for chunk in response.streaming_content:
+                lines += 1
+                size += len(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return lines, size, peak
+
+    def test_large_export_streams_with_flat_memory(self):
+        self.seed(0, 4_000)
+        small_lines, small_size, small_peak = self.traced_export()
+        self.seed(4_000, 16_000)
+        lines, size, peak = self.traced_export()
+
+        self.assertEqual((small_lines, lines), (4_000, 16_000))
+        # Four times the data, yet peak memory stays at roughly one chunk.
+        self.assertGreater(size, small_size * 3.5)
+        self.assertLess(peak, small_peak * 1.5)
+
+
+class BulkActionTests(AdminTestCase):
+    def counter_updates(self, queries):
+        return [
+            q["sql"] for q in queries.captured_queries if q["sql"].startswith('UPDATE "custom_admin_dashboardcounter"')
+        ]
+
+    def test_cancel_selected_bookings(self):
+        self.chef_user.email = "chef@example.com"
+        self.chef_user.save()
+        self.customer.email = "customer@example.com"
+        self.customer.save()
+        pending, accepted = self.make_booking(days=2), self.make_booking(days=3, status="Accepted")
+        rejected = self.make_booking(days=4, status="Rejected")
+        ids = [pending.pk, accepted.pk, rejected.pk]
+        response = self.client.post(reverse("custom_admin:booking_bulk"), {"action": "cancel", "ids": ids}, follow=True)
+        self.assertContains(response, "2 booking(s) canceled.")
+        self.assertEqual(
+            list(Booking.objects.filter(pk__in=ids).order_by("pk").values_list("status", "version")),
+            [("Rejected", 1), ("Rejected", 1), ("Rejected", 0)],
+        )
+        self.assertEqual(BookingEvent.objects.filter(kind="status", to_status="Rejected", actor=self.admin).count(), 2)
+        self.assertEqual(OutboxMessage.objects.filter(recipients=["customer@example.com"]).count(), 2)
+
+    def test_archive_then_hard_delete_keeps_counters_exact(self):
+        bookings = [self.make_booking(days=days) for days in (1, 2, 3)]
+        ids = [booking.pk for booking in bookings]
+        counters.read_all()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse("custom_admin:booking_bulk"), {"action": "archive", "ids": ids[:2]}, follow=True
+            )
+        self.assertContains(response, "2 booking(s) archived.")
+        self.assertEqual(len(self.counter_updates(queries)), 1)
+        self.assertEqual(BookingEvent.objects.filter(kind="deleted").count(), 2)
+        self.assertCountersExact()
+
+        response = self.client.post(
+            reverse("custom_admin:booking_bulk"), {"action": "hard_delete", "ids": ids}, follow=True
+        )
+        self.assertContains(response, "2 booking(s) permanently deleted.")
+        self.assertEqual(list(Booking.all_objects.values_list("pk", flat=True)), [ids[2]])
+        self.assertCountersExact()
+
+    def test_blog_actions_update_counters_once(self):
+        posts = [
+            BlogPost.objects.create(title=f"Post {n}", image="blog_images/x.jpg", content="...", author=self.admin)
+            for n in range(4)
+        ]
+        ids = [post.pk for post in posts]
+        counters.read_all()
+        response = self.client.post(
+            reverse("custom_admin:blog_bulk"), {"action": "unpublish", "ids": ids[:3]}, follow=True
+        )
+        self.assertContains(response, "3 blog post(s) unpublished.")
+        self.assertCountersExact()
+
+        with (
+            mock.patch("booking.caching.cache.set") as cache_set,
+            CaptureQueriesContext(connection) as queries,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            response = self.client.post(
+                reverse("custom_admin:blog_bulk"), {"action": "delete", "ids": ids[1:]}, follow=True
+            )
+        self.assertContains(response, "3 blog post(s) deleted.")
+        # blog_count and published_blog_count, regardless of how many rows went.
+        self.assertEqual(len(self.counter_updates(queries)), 2)
+        self.assertCountersExact()
+        # And one blog version bump for the whole batch.
+        bumps = [call for call in cache_set.call_args_list if call.args[0] == BLOG_VERSION_KEY]
+        self.assertEqual(len(bumps), 1)
+
+    def test_contact_query_delete_and_bad_requests(self):
+        queries = [ContactQuery.objects.create(name=f"Q{n}", email="q@example.com", message="Hi") for n in range(3)]
+        counters.read_all()
+        url = reverse("custom_admin:contact_query_bulk")
+        response = self.client.post(url, {"action": "delete", "ids": [q.pk for q in queries[:2]] + ["x"]}, follow=True)
+        self.assertContains(response, "2 contact query(s) deleted.")
+        self.assertCountersExact()
+
+        self.assertContains(self.client.post(url, {"action": "delete"}, follow=True), "Select at least one contact query.")
+        self.assertContains(self.client.post(url, {"action": "drop", "ids": [queries[2].pk]}, follow=True), "Unknown bulk action.")
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+
+class AdminPaginationTests(AdminTestCase):
+    def walk(self, url_name, context_name, params):
+        seen, cursor = [], None
+        while True:
+            response = self.client.get(reverse(url_name), {**params, **({"cursor": cursor} if cursor else {})})
+            page = response.context[context_name]
+            seen.extend(row.pk for row in page)
+            if not page.has_next:
+                return seen, page
+            cursor = page.next_cursor
+
+    def test_archived_scope_pages_across_hot_and_archive_rows(self):
+        bookings = [self.make_booking(days=-days) for days in range(1, 41)]
+        for booking in bookings:
+            booking.soft_delete(by_user=self.admin)
+        moved = bookings[::3]
+        BookingArchive.objects.bulk_create([BookingArchive.from_booking(b) for b in moved])
+        Booking.all_objects.filter(pk__in=[b.pk for b in moved]).delete()
+        # Same scheduled_at on two rows: the pk tie-breaker keeps both.
+        Booking.all_objects.filter(pk=bookings[1].pk).update(scheduled_at=bookings[0].scheduled_at)
+
+        seen, last = self.walk("custom_admin:booking_list", "bookings", {"scope": "archived", "sort": "oldest"})
+        self.assertEqual(sorted(seen), sorted(b.pk for b in bookings))
+        expected = sorted(
+            [(b.scheduled_at, b.pk) for b in BookingArchive.objects.all()]
+            + [(b.scheduled_at, b.pk) for b in Booking.all_objects.filter(is_deleted=True)]
+        )
+        self.assertEqual(seen, [pk for _, pk in expected])
+        self.assertEqual((last.total, last.total_is_exact), (40, True))
+
+        params = {"scope": "archived", "sort": "oldest", "cursor": last.previous_cursor}
+        back = self.client.get(reverse("custom_admin:booking_list"), params).context["bookings"]
+        self.assertEqual([b.pk for b in back], seen[15:30])
+
+    def test_list_views_walk_every_row_once(self):
+        base = timezone.now()
+        for n in range(25):
+            query = ContactQuery.objects.create(name=f"Q{n}", email="q@example.com", message="Hi")
+            # Rows a few microseconds apart must not collapse into one cursor value.
+            ContactQuery.objects.filter(pk=query.pk).update(created_at=base + timedelta(microseconds=n % 3))
+        seen, last = self.walk("custom_admin:contact_query_list", "queries", {})
+        self.assertEqual(seen, list(ContactQuery.objects.order_by("-created_at", "-id").values_list("pk", flat=True)))
+        self.assertEqual(last.total, 25)
+
+        seen, _ = self.walk("custom_admin:user_list", "users", {"sort": "username"})
+        self.assertEqual(len(seen), User.objects.count())
+
+    def test_deep_page_does_not_count_or_offset(self):
+        for days in range(1, 21):
+            self.make_booking(days=days)
+        first = self.client.get(reverse("custom_admin:booking_list"), {"scope": "upcoming"}).context["bookings"]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("custom_admin:booking_list"), {"scope": "upcoming", "cursor": first.next_cursor})
+        self.assertFalse([q for q in queries.captured_queries if "OFFSET" in q["sql"]])
+
+    def test_limited_count_caps_large_results(self):
+        for days in range(1, 6):
+            self.make_booking(days=days)
+        self.assertEqual(limited_count(Booking.objects.all(), limit=3), (3, False))
+        self.assertEqual(limited_count(Booking.objects.all(), limit=5), (5, True))
+        self.assertEqual(limited_count(archive.archived_bookings(), limit=3), (0, True))
+        response = self.client.get(reverse("custom_admin:booking_list"), {"scope": "upcoming"})
+        self.assertContains(response, "5 results")
+
+
+class ContactQuerySearchTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        self.kochi = ContactQuery.objects.create(
+            name="Asha Menon", email="asha@example.com", city="Kochi", message="Need a chef for <b>Onam</b> sadya."
+        )
+        self.pune = ContactQuery.objects.create(
+            name="Ravi", email="ravi@example.com", phone_number="98765 43210", city="Pune",
+            message="Looking for a Kochi style seafood dinner for twelve guests next weekend.",
+        )
+
+    def test_ranked_by_field_weight_with_prefix_matching(self):
+        self.assertEqual(contact_search.search_query_ids("kochi"), [self.kochi.pk, self.pune.pk])
+        self.assertEqual(contact_search.search_query_ids("987"), [self.pune.pk])
+        self.assertEqual(contact_search.search_query_ids("asha@exam"), [self.kochi.pk])
+        self.assertEqual(contact_search.search_query_ids('"NOT" OR *'), [])
+
+    def test_list_view_highlights_message_snippets(self):
+        response = self.client.get(reverse("custom_admin:contact_query_list"), {"q": "onam"})
+        self.assertEqual([item.pk for item in response.context["queries"]], [self.kochi.pk])
+        self.assertContains(response, "Need a chef for &lt;b&gt;<mark>Onam</mark>&lt;/b&gt; sadya.")
+        self.assertContains(response, "1 result")
+
+    def test_matches_outside_the_rank_window_are_reported(self):
+        self.assertTrue(contact_search.search_query_ids("kochi").complete)
+        with mock.patch("booking.contact_search.RANK_WINDOW", 1):
+            hits = contact_search.search_query_ids("kochi")
+            response = self.client.get(reverse("custom_admin:contact_query_list"), {"q": "kochi"})
+        self.assertEqual((hits, hits.complete), ([self.pune.pk], False))
+        self.assertFalse(response.context["queries"].total_is_exact)
+        self.assertContains(response, "More than 1 results")
+        self.assertContains(response, "Older matches are not searched")
+
+    def test_snippet_windows_long_messages(self):
+        text = " ".join(f"w{n}" for n in range(40)) + " Crème brûlée please"
+        self.assertEqual(
+            contact_search.snippet(text, "creme bru", size=6),
+            "…w37 w38 w39 <mark>Crème</mark> <mark>brûlée</mark> please",
+        )
+        self.assertIsNone(contact_search.snippet(text, "pasta"))
+
+    def test_soft_deleted_queries_leave_the_index(self):
+        self.client.post(reverse("custom_admin:contact_query_delete", args=[self.kochi.pk]))
+        self.assertEqual(contact_search.search_query_ids("kochi"), [self.pune.pk])
+        self.client.post(reverse("custom_admin:contact_query_bulk"), {"action": "delete", "ids": [self.pune.pk]})
+        self.assertEqual(contact_search.search_query_ids("kochi"), [])
+
+    def test_rebuild_command_restores_index(self):
+        ContactQuery.objects.filter(pk=self.pune.pk).update(city="Goa")
+        ContactQuery.objects.filter(pk=self.kochi.pk).update(is_deleted=True)
+        out = StringIO()
+        call_command("rebuild_contact_search_index", stdout=out)
+        self.assertIn("Indexed 1 contact query(s).", out.getvalue())
+        self.assertEqual(contact_search.search_query_ids("goa"), [self.pune.pk])
+        self.assertEqual(contact_search.search_query_ids("asha"), [])
+
+
+class AdminQueryBudgetTests(QueryBudgetMixin, AdminTestCase):
+    """Three rows per list, so a per-row query shows up as a blown budget."""
+
+    budget_urlconf = "custom_admin.urls"
+    query_budgets = {
+        "blog_add": 2,
+        "blog_bulk": 6,
+        "blog_delete": 6,
+        "blog_edit": 3,
+        "blog_list": 4,
+        "blog_toggle_publish": 6,
+        "booking_bulk": 7,
+        "booking_cancel": 9,
+        "booking_delete": 8,
+        "booking_export": 3,
+        "booking_hard_delete": 4,
+        "booking_list": 4,
+        "booking_update_status": 9,
+        "booking_view": 4,
+        "chef_add": 3,
+        "chef_delete": 8,
+        "chef_edit": 4,
+        "chef_list": 4,
+        "contact_query_bulk": 7,
+        "contact_query_delete": 6,
+        "contact_query_list": 4,
+        "contact_query_view": 3,
+        "dashboard": 4,
+        "login": 0,
+        "logout": 4,
+        "user_delete": 22,
+        "user_edit": 3,
+        "user_list": 4,
+        "user_toggle_active": 5,
+        "user_view": 4,
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.budget_user = self.admin
+        chefs = [self.chef] + [
+            Chef.objects.create(
+                user=User.objects.create_user(username=f"budget_chef{i}"),
+                name=f"Budget Chef {i}",
+                specialty="Thai",
+                experience=2,
+                price_per_person=Decimal("300"),
+            )
+            for i in range(2)
+        ]
+        bookings = [self.make_booking(days=days) for days in (1, 2, 3)]
+        archived = self.make_booking(days=9)
+        archived.soft_delete(by_user=self.admin)
+        posts = [
+            BlogPost.objects.create(
+                title=f"Post {i}", image=f"blog_images/{i}.jpg", content="...", author=self.admin
+            )
+            for i in range(3)
+        ]
+        queries = [
+            ContactQuery.objects.create(name=f"Asha {i}", email="asha@example.com", message="Hello") for i in range(3)
+        ]
+        profile = self.customer.profile
+        booking = bookings[0]
+        self.budget_requests = {
+            "blog_bulk": {"method": "post", "data": {"action": "unpublish", "ids": [post.pk for post in posts]}},
+            "blog_delete": {"args": [posts[0].pk], "method": "post"},
+            "blog_edit": {"args": [posts[0].pk]},
+            "blog_toggle_publish": {"args": [posts[0].pk], "method": "post"},
+            "booking_bulk": {"method": "post", "data": {"action": "cancel", "ids": [b.pk for b in bookings]}},
+            "booking_cancel": {"args": [booking.pk], "method": "post", "data": {"version": booking.version}},
+            "booking_delete": {"args": [booking.pk], "method": "post"},
+            "booking_hard_delete": {"args": [archived.pk], "method": "post"},
+            "booking_update_status": {
+                "args": [booking.pk],
+                "method": "post",
+                "data": {"status": "Accepted", "version": booking.version},
+            },
+            "booking_view": {"args": [booking.pk]},
+            "chef_delete": {"args": [chefs[1].pk], "method": "post"},
+            "chef_edit": {"args": [self.chef.pk]},
+            "contact_query_bulk": {"method": "post", "data": {"action": "delete", "ids": [q.pk for q in queries]}},
+            "contact_query_delete": {"args": [queries[0].pk], "method": "post"},
+            "contact_query_view": {"args": [queries[0].pk]},
+            "login": {"user": None},
+            "logout": {"method": "post"},
+            "user_delete": {"args": [profile.pk], "method": "post"},
+            "user_edit": {"args": [profile.pk]},
+            "user_toggle_active": {"args": [profile.pk], "method": "post"},
+            "user_view": {"args": [profile.pk]},
+        }
 
-# Create your tests here.
+    def test_every_page_stays_within_its_query_budget(self):
+        self.assertUrlsWithinQueryBudgets()
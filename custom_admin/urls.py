@@ -15,6 +15,8 @@ urlpatterns = [
     path("chefs/delete/<int:pk>/", views.chef_delete, name="chef_delete"),
 
     path("bookings/", views.booking_list, name="booking_list"),
+    path("bookings/export/", views.booking_export, name="booking_export"),
+    path("bookings/bulk/", views.booking_bulk, name="booking_bulk"),
     path("bookings/view/<int:pk>/", views.booking_view, name="booking_view"),
     path("bookings/update-status/<int:pk>/", views.booking_update_status, name="booking_update_status"),
     path("bookings/cancel/<int:pk>/", views.booking_cancel, name="booking_cancel"),
@@ -23,6 +25,7 @@ urlpatterns = [
 
     path("blogs/", views.blog_list, name="blog_list"),
     path("blogs/add/", views.blog_add, name="blog_add"),
+    path("blogs/bulk/", views.blog_bulk, name="blog_bulk"),
     path("blogs/edit/<int:pk>/", views.blog_edit, name="blog_edit"),
     path("blogs/toggle-publish/<int:pk>/", views.blog_toggle_publish, name="blog_toggle_publish"),
     path("blogs/delete/<int:pk>/", views.blog_delete, name="blog_delete"),
@@ -34,6 +37,7 @@ urlpatterns = [
     path("users/delete/<int:pk>/", views.user_delete, name="user_delete"),
 
     path("contact-queries/", views.contact_query_list, name="contact_query_list"),
+    path("contact-queries/bulk/", views.contact_query_bulk, name="contact_query_bulk"),
     path("contact-queries/view/<int:pk>/", views.contact_query_view, name="contact_query_view"),
     path("contact-queries/delete/<int:pk>/", views.contact_query_delete, name="contact_query_delete"),
 ]
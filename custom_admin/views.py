@@ -2,17 +2,19 @@ from functools import wraps
 from django.contrib import messages
 from django.contrib.auth import get_user_model, login, logout
 from django.contrib.auth.forms import AuthenticationForm
-from django.core.paginator import Paginator
 from django.db.models import Q
-from django.http import HttpResponseForbidden
+from django.http import Http404, HttpResponseForbidden, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 
 from accounts.models import Profile
-from booking.models import BlogPost, Booking, Chef, ContactQuery
+from booking import archive, audit, contact_search, transitions
+from booking.models import BlogPost, Booking, BookingArchive, Chef, ContactQuery
+from booking.pagination import KeysetPaginator, RankedPaginator, UnionKeysetPaginator
 
+from . import bulk, counters, exports
 from .forms import BlogPostForm, BookingStatusForm, ChefForm
 
 User = get_user_model()
@@ -35,13 +37,6 @@ def _safe_sort(value, allowed, default):
     return value if value in allowed else default
 
 
-def _past_booking_q():
-    now = timezone.now()
-    current_date = now.date()
-    current_time = now.time().replace(microsecond=0)
-    return Q(date__lt=current_date) | Q(date=current_date, time__lt=current_time)
-
-
 def admin_login(request):
     if request.user.is_authenticated and request.user.is_superuser:
         return redirect("custom_admin:dashboard")
@@ -68,16 +63,9 @@ def admin_logout(request):
 
 @admin_required
 def dashboard(request):
-    recent_bookings = Booking.objects.select_related("customer", "chef").order_by("-date", "-time")[:8]
-    context = {
-        "chefs_count": Chef.objects.count(),
-        "bookings_count": Booking.objects.count(),
-        "users_count": Profile.objects.count(),
-        "blog_count": BlogPost.objects.count(),
-        "published_blog_count": BlogPost.objects.filter(is_published=True).count(),
-        "contact_queries_count": ContactQuery.objects.filter(is_deleted=False).count(),
-        "recent_bookings": recent_bookings,
-    }
+    recent_bookings = Booking.objects.select_related("customer", "chef").order_by("-scheduled_at")[:8]
+    context = counters.read_all()
+    context["recent_bookings"] = recent_bookings
     return render(request, "custom_admin/dashboard.html", context)
 
 
@@ -86,10 +74,10 @@ def chef_list(request):
     q = request.GET.get("q", "").strip()
     sort = _safe_sort(request.GET.get("sort", "newest"), {"newest", "oldest", "name", "price"}, "newest")
     order_map = {
-        "newest": "-id",
-        "oldest": "id",
-        "name": "name",
-        "price": "-price_per_person",
+        "newest": ("-id",),
+        "oldest": ("id",),
+        "name": ("name", "id"),
+        "price": ("-price_per_person", "-id"),
     }
 
     chefs_qs = Chef.objects.select_related("user")
@@ -100,8 +88,7 @@ def chef_list(request):
             | Q(user__username__icontains=q)
         )
 
-    paginator = Paginator(chefs_qs.order_by(order_map[sort]), 12)
-    chefs = paginator.get_page(request.GET.get("page"))
+    chefs = KeysetPaginator(chefs_qs, order_map[sort], 12, count="exact").get_page(request.GET.get("cursor"))
     return render(
         request,
         "custom_admin/chef_list.html",
@@ -145,27 +132,26 @@ def chef_delete(request, pk):
     return redirect("custom_admin:chef_list")
 
 
-@admin_required
-def booking_list(request):
+BOOKING_ORDERINGS = {
+    "newest": ("-scheduled_at", "-pk"),
+    "oldest": ("scheduled_at", "pk"),
+    "status": ("status", "-scheduled_at", "-pk"),
+}
+
+
+def _booking_list_params(request):
     q = request.GET.get("q", "").strip()
     scope = _safe_sort(request.GET.get("scope", "upcoming"), {"upcoming", "past", "archived", "all"}, "upcoming")
-    sort = _safe_sort(request.GET.get("sort", "newest"), {"newest", "oldest", "status"}, "newest")
-    order_map = {
-        "newest": "-date",
-        "oldest": "date",
-        "status": "status",
-    }
+    sort = _safe_sort(request.GET.get("sort", "newest"), set(BOOKING_ORDERINGS), "newest")
+    return q, scope, sort
 
-    bookings_qs = Booking.all_objects.select_related("customer", "chef")
-    past_q = _past_booking_q()
+
+def _active_bookings(q, scope):
+    bookings_qs = Booking.all_objects.filter(is_deleted=False)
     if scope == "upcoming":
-        bookings_qs = bookings_qs.filter(is_deleted=False).exclude(past_q)
+        bookings_qs = bookings_qs.upcoming()
     elif scope == "past":
-        bookings_qs = bookings_qs.filter(is_deleted=False).filter(past_q)
-    elif scope == "archived":
-        bookings_qs = bookings_qs.filter(is_deleted=True)
-    else:
-        bookings_qs = bookings_qs.filter(is_deleted=False)
+        bookings_qs = bookings_qs.past()
 
     if q:
         bookings_qs = bookings_qs.filter(
@@ -173,9 +159,29 @@ def booking_list(request):
             | Q(chef__name__icontains=q)
             | Q(status__icontains=q)
         )
+    return bookings_qs
 
-    paginator = Paginator(bookings_qs.order_by(order_map[sort], "-time"), 15)
-    bookings = paginator.get_page(request.GET.get("page"))
+
+@admin_required
+def booking_list(request):
+    q, scope, sort = _booking_list_params(request)
+    cursor = request.GET.get("cursor")
+    if scope == "archived":
+        # Archived rows live partly in the hot table and partly in
+        # BookingArchive; page over the union and load only the visible rows.
+        paginator = UnionKeysetPaginator(
+            lambda condition: archive.archived_bookings(q, condition=condition),
+            Booking,
+            archive.ARCHIVE_LIST_FIELDS,
+            BOOKING_ORDERINGS[sort],
+            15,
+            count="estimate",
+        )
+        bookings = paginator.get_page(cursor)
+        bookings.object_list = archive.hydrate(bookings.object_list)
+    else:
+        bookings_qs = _active_bookings(q, scope).select_related("customer", "chef")
+        bookings = KeysetPaginator(bookings_qs, BOOKING_ORDERINGS[sort], 15, count="estimate").get_page(cursor)
     return render(
         request,
         "custom_admin/booking_list.html",
@@ -189,21 +195,81 @@ def booking_list(request):
     )
 
 
+@admin_required
+def booking_export(request):
+    q, scope, sort = _booking_list_params(request)
+    export_format = _safe_sort(request.GET.get("format", "csv"), set(exports.FORMATS), "csv")
+    if scope == "archived":
+        rows = exports.archived_rows(q)
+    else:
+        rows = _active_bookings(q, scope).values_list(*exports.COLUMNS)
+    rows = rows.order_by(*BOOKING_ORDERINGS[sort]).iterator(chunk_size=exports.CHUNK_SIZE)
+
+    content_type, render_rows = exports.FORMATS[export_format]
+    response = StreamingHttpResponse(render_rows(rows), content_type=content_type)
+    filename = f"bookings-{scope}-{timezone.now():%Y%m%d-%H%M}.{export_format}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@admin_required
+@require_POST
+def booking_bulk(request):
+    ids = bulk.selected_ids(request)
+    action = request.POST.get("action")
+    if not ids:
+        messages.error(request, "Select at least one booking.")
+    elif action == "cancel":
+        messages.success(request, f"{bulk.cancel_bookings(ids, request.user)} booking(s) canceled.")
+    elif action == "archive":
+        messages.success(request, f"{bulk.soft_delete_bookings(ids, request.user)} booking(s) archived.")
+    elif action == "hard_delete":
+        messages.success(request, f"{bulk.hard_delete_bookings(ids)} booking(s) permanently deleted.")
+    else:
+        messages.error(request, "Unknown bulk action.")
+    return redirect(request.POST.get("next") or "custom_admin:booking_list")
+
+
 @admin_required
 def booking_view(request, pk):
-    booking = get_object_or_404(Booking.all_objects.select_related("customer", "chef"), pk=pk)
-    status_form = BookingStatusForm(instance=booking)
-    return render(request, "custom_admin/booking_view.html", {"booking": booking, "status_form": status_form})
+    booking = archive.get_any_booking(pk)
+    if booking is None:
+        raise Http404("Booking not found.")
+    status_form = BookingStatusForm(instance=booking) if isinstance(booking, Booking) else None
+    return render(
+        request,
+        "custom_admin/booking_view.html",
+        {"booking": booking, "status_form": status_form, "events": audit.timeline(pk)},
+    )
+
+
+def _report_transition(request, booking, result, success_message):
+    if result.outcome == transitions.CONFLICT:
+        messages.error(
+            request,
+            f"Booking #{booking.pk} was changed by someone else and is now {result.status or 'deleted'}. Review it and try again.",
+        )
+    elif result.outcome == transitions.NOT_ALLOWED:
+        messages.error(request, f"{result.status} bookings cannot be moved to that status.")
+    elif result.outcome == transitions.SLOT_TAKEN:
+        messages.error(request, f"Booking #{booking.pk} cannot be reopened: another booking now holds its slot.")
+    else:
+        messages.success(request, success_message)
 
 
 @admin_required
 @require_POST
 def booking_update_status(request, pk):
     booking = get_object_or_404(Booking.all_objects, pk=pk, is_deleted=False)
-    form = BookingStatusForm(request.POST, instance=booking)
+    form = BookingStatusForm(request.POST)
     if form.is_valid():
-        form.save(update_fields=["status"])
-        messages.success(request, "Booking status updated.")
+        result = transitions.transition(
+            booking,
+            form.cleaned_data["status"],
+            transitions.parse_version(request.POST.get("version")),
+            actor=request.user,
+        )
+        _report_transition(request, booking, result, "Booking status updated.")
     else:
         messages.error(request, "Invalid status update request.")
     return redirect(request.POST.get("next") or "custom_admin:booking_list")
@@ -213,9 +279,10 @@ def booking_update_status(request, pk):
 @require_POST
 def booking_cancel(request, pk):
     booking = get_object_or_404(Booking.all_objects, pk=pk, is_deleted=False)
-    booking.status = "Rejected"
-    booking.save(update_fields=["status"])
-    messages.success(request, "Booking canceled successfully.")
+    result = transitions.transition(
+        booking, "Rejected", transitions.parse_version(request.POST.get("version")), actor=request.user
+    )
+    _report_transition(request, booking, result, "Booking canceled successfully.")
     return redirect(request.POST.get("next") or "custom_admin:booking_list")
 
 
@@ -223,7 +290,9 @@ def booking_cancel(request, pk):
 @require_POST
 def booking_delete(request, pk):
     booking = get_object_or_404(Booking.all_objects, pk=pk, is_deleted=False)
-    booking.soft_delete(by_user=request.user)
+    with audit.batch():
+        booking.soft_delete(by_user=request.user)
+        audit.record_deleted([booking.pk], audit.SOURCE_ADMIN, request.user)
     messages.success(request, "Booking archived successfully.")
     return redirect("custom_admin:booking_list")
 
@@ -231,7 +300,7 @@ def booking_delete(request, pk):
 @admin_required
 @require_POST
 def booking_hard_delete(request, pk):
-    booking = get_object_or_404(Booking.all_objects, pk=pk, is_deleted=True)
+    booking = Booking.all_objects.filter(pk=pk, is_deleted=True).first() or get_object_or_404(BookingArchive, pk=pk)
     booking.delete()
     messages.success(request, "Booking permanently deleted.")
     return redirect("custom_admin:booking_list")
@@ -242,17 +311,16 @@ def blog_list(request):
     q = request.GET.get("q", "").strip()
     sort = _safe_sort(request.GET.get("sort", "newest"), {"newest", "oldest", "title"}, "newest")
     order_map = {
-        "newest": "-created_at",
-        "oldest": "created_at",
-        "title": "title",
+        "newest": ("-created_at", "-id"),
+        "oldest": ("created_at", "id"),
+        "title": ("title", "id"),
     }
 
     blogs_qs = BlogPost.objects.select_related("author")
     if q:
         blogs_qs = blogs_qs.filter(Q(title__icontains=q) | Q(content__icontains=q))
 
-    paginator = Paginator(blogs_qs.order_by(order_map[sort]), 10)
-    posts = paginator.get_page(request.GET.get("page"))
+    posts = KeysetPaginator(blogs_qs, order_map[sort], 10, count="exact").get_page(request.GET.get("cursor"))
     return render(request, "custom_admin/blog_list.html", {"posts": posts, "q": q, "sort": sort})
 
 
@@ -305,14 +373,31 @@ def blog_delete(request, pk):
     return redirect("custom_admin:blog_list")
 
 
+@admin_required
+@require_POST
+def blog_bulk(request):
+    ids = bulk.selected_ids(request)
+    action = request.POST.get("action")
+    if not ids:
+        messages.error(request, "Select at least one blog post.")
+    elif action in ("publish", "unpublish"):
+        updated = bulk.set_blogs_published(ids, action == "publish")
+        messages.success(request, f"{updated} blog post(s) {action}ed.")
+    elif action == "delete":
+        messages.success(request, f"{bulk.delete_blogs(ids)} blog post(s) deleted.")
+    else:
+        messages.error(request, "Unknown bulk action.")
+    return redirect(request.POST.get("next") or "custom_admin:blog_list")
+
+
 @admin_required
 def user_list(request):
     q = request.GET.get("q", "").strip()
     sort = _safe_sort(request.GET.get("sort", "newest"), {"newest", "oldest", "username"}, "newest")
     order_map = {
-        "newest": "-id",
-        "oldest": "id",
-        "username": "user__username",
+        "newest": ("-id",),
+        "oldest": ("id",),
+        "username": ("user__username", "id"),
     }
 
     users_qs = Profile.objects.select_related("user")
@@ -324,8 +409,7 @@ def user_list(request):
             | Q(user__email__icontains=q)
         )
 
-    paginator = Paginator(users_qs.order_by(order_map[sort]), 20)
-    users = paginator.get_page(request.GET.get("page"))
+    users = KeysetPaginator(users_qs, order_map[sort], 20, count="exact").get_page(request.GET.get("cursor"))
     return render(request, "custom_admin/user_list.html", {"users": users, "q": q, "sort": sort})
 
 
@@ -335,7 +419,7 @@ def user_view(request, pk):
     recent_bookings = (
         Booking.objects.select_related("chef")
         .filter(customer=profile.user)
-        .order_by("-date", "-time")[:8]
+        .order_by("-scheduled_at")[:8]
     )
     return render(request, "custom_admin/user_view.html", {"profile": profile, "recent_bookings": recent_bookings})
 
@@ -391,21 +475,27 @@ def user_delete(request, pk):
 @admin_required
 def contact_query_list(request):
     q = request.GET.get("q", "").strip()
+    cursor = request.GET.get("cursor")
     queries_qs = ContactQuery.objects.filter(is_deleted=False)
-    if q:
-        queries_qs = queries_qs.filter(
-            Q(name__icontains=q)
-            | Q(email__icontains=q)
-            | Q(phone_number__icontains=q)
-            | Q(city__icontains=q)
-            | Q(message__icontains=q)
-        )
-    paginator = Paginator(queries_qs, 20)
-    queries = paginator.get_page(request.GET.get("page"))
+    ranked_ids = contact_search.search_query_ids(q) if q else None
+    if ranked_ids is not None:
+        queries = RankedPaginator(queries_qs, ranked_ids, 20).get_page(cursor)
+        for item in queries:
+            item.snippet = contact_search.snippet(item.message, q)
+    else:
+        if q:
+            queries_qs = contact_search.like_filter(queries_qs, q)
+        paginator = KeysetPaginator(queries_qs, ("-created_at", "-id"), 20, count="estimate")
+        queries = paginator.get_page(cursor)
     return render(
         request,
         "custom_admin/contact_query_list.html",
-        {"queries": queries, "q": q},
+        {
+            "queries": queries,
+            "q": q,
+            "search_truncated": ranked_ids is not None and not ranked_ids.complete,
+            "rank_window": contact_search.RANK_WINDOW,
+        },
     )
 
 
@@ -423,3 +513,16 @@ def contact_query_delete(request, pk):
     query.save(update_fields=["is_deleted"])
     messages.success(request, "Contact query deleted successfully.")
     return redirect("custom_admin:contact_query_list")
+
+
+@admin_required
+@require_POST
+def contact_query_bulk(request):
+    ids = bulk.selected_ids(request)
+    if not ids:
+        messages.error(request, "Select at least one contact query.")
+    elif request.POST.get("action") == "delete":
+        messages.success(request, f"{bulk.delete_contact_queries(ids)} contact query(s) deleted.")
+    else:
+        messages.error(request, "Unknown bulk action.")
+    return redirect(request.POST.get("next") or "custom_admin:contact_query_list")